@@ -70,7 +70,13 @@ import curses
 import socket
 import subprocess
 import math
+import hashlib
+import marshal
+import bisect
+import operator
 import random as py_random
+import array as py_array
+from collections import OrderedDict
 
 # =============================================================================
 #                              IMPORT OPZIONALI
@@ -91,6 +97,13 @@ except ImportError:
     filedialog = None
     simpledialog = None
 
+# NumPy accelera l'algebra matriciale (matmul, madd, ...); senza si usa
+# il percorso Python puro, quindi nessun avviso
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # ==========================================
 #  ASCENSION VM v12
 # ==========================================
@@ -106,6 +119,890 @@ class AscensionException(Exception):
         super().__init__(message)
 
 
+class VMHalt(Exception):
+    """Segnala la fine dell'esecuzione (HALT o RET fuori da una funzione)."""
+    pass
+
+
+# =============================================================================
+#                              TABELLA OPCODE
+# =============================================================================
+# Il compilatore produce opcode simbolici; load_program li codifica come
+# interi piccoli (indice in questa tabella) per il dispatch a tabella.
+# L'ordine ricalca la vecchia catena if/elif, usata dal motore 'legacy'.
+
+OPCODES = (
+    # Stack
+    'PUSH', 'POP', 'DUP', 'PUSH_DICT', 'PUSH_NULL', 'DICT_SET',
+    # Variabili (locali per slot, globali per nome)
+    'LOAD_FAST', 'STORE_FAST', 'STORE_GLOBAL', 'LOAD_GLOBAL',
+    # Struct
+    'NEW_STRUCT', 'GET_ATTR', 'SET_ATTR',
+    # Array e matrici
+    'STORE_IDX', 'LOAD_IDX', 'LOAD_IDX_2D', 'STORE_IDX_2D',
+    'CREATE_MATRIX', 'MATRIX_ROWS', 'MATRIX_COLS', 'MATRIX_DIM',
+    # Funzioni
+    'CALL', 'RET', 'RET_VAL',
+    # Built-in
+    'READ', 'LEN', 'KEYS', 'TO_INT', 'TO_FLOAT', 'SUBSTR', 'CHR',
+    'SYSTEM', 'EXEC',
+    # File I/O
+    'FILE_OPEN', 'FILE_WRITE', 'FILE_READLINE', 'FILE_READALL', 'FILE_CLOSE',
+    # Curses
+    'CURSES_INIT', 'CURSES_END', 'CURSES_CLEAR', 'CURSES_REFRESH',
+    'CURSES_MOVE', 'CURSES_WRITE', 'CURSES_READ_KEY',
+    # HTTP
+    'HTTP_GET', 'HTTP_POST', 'RESP_STATUS', 'RESP_BODY',
+    # Tkinter
+    'TK_ROOT', 'TK_WIDGET', 'TK_PACK', 'TK_GRID', 'TK_CONFIG', 'TK_GET',
+    'TK_MSGBOX', 'TK_MAINLOOP', 'TK_COMMAND', 'TK_BIND', 'TK_AFTER',
+    'TK_AFTER_CANCEL', 'TK_UPDATE', 'TK_DESTROY', 'TK_SET', 'TK_CLEAR',
+    'TK_FOCUS', 'TK_GEOMETRY', 'TK_TITLE', 'TK_RESIZABLE', 'TK_TEXT_GET',
+    'TK_TEXT_INSERT', 'TK_LISTBOX_ADD', 'TK_LISTBOX_GET', 'TK_LISTBOX_INDEX',
+    'TK_FILEDIALOG_OPEN', 'TK_FILEDIALOG_SAVE', 'TK_ASKSTRING', 'TK_ASKYESNO',
+    'TK_CANVAS_LINE', 'TK_CANVAS_RECT', 'TK_CANVAS_OVAL', 'TK_CANVAS_TEXT',
+    'TK_CANVAS_CLEAR', 'TK_CANVAS_DELETE', 'TK_CANVAS_MOVE',
+    # Socket
+    'GET_IP', 'SOCKET_OPEN', 'SOCKET_BIND', 'SOCKET_LISTEN', 'SOCKET_ACCEPT',
+    'SOCKET_CONNECT', 'SOCKET_SEND', 'SOCKET_RECV', 'SOCKET_CLOSE',
+    # Try / catch
+    'TRY_START', 'TRY_END', 'THROW',
+    # Aritmetica e logica
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'GT', 'LT', 'EQ', 'NEQ', 'GTE', 'LTE',
+    'AND', 'OR', 'NOT',
+    # Matematica (v12.7)
+    'RANDOM', 'RANDOM_MAX', 'RANDOM_RANGE', 'SQRT', 'POW', 'EXP', 'LOG',
+    'ABS', 'FLOOR', 'CEIL', 'SIN', 'COS', 'TAN', 'ASIN', 'ACOS', 'ATAN', 'ATAN2',
+    # Controllo di flusso
+    'JMP', 'JZ', 'JNZ', 'PRINT',
+    # Sentinella di fine programma
+    'HALT',
+    # Chiamata con risoluzione ritardata (funzione definita dopo il caricamento)
+    'CALL_NAME',
+    # Superistruzioni generate da AscensionCompiler.fuse_superinstructions
+    'INC', 'LOAD_LOAD_OP', 'STORE_LOAD',
+    'JZ_EQ', 'JZ_NEQ', 'JZ_GT', 'JZ_LT', 'JZ_GTE', 'JZ_LTE',
+    # Prologo di funzione: crea il frame a slot con i parametri
+    'ENTER',
+    # Aritmetica specializzata per tipo (quickening, vedi SPECIALIZED)
+    'ADD_INT', 'ADD_FLOAT', 'ADD_STR', 'SUB_INT', 'SUB_FLOAT',
+    'MUL_INT', 'MUL_FLOAT', 'DIV_INT', 'DIV_FLOAT', 'MOD_INT',
+    # Chiamata in coda (return f(...)): riusa il frame del chiamante
+    'TAIL_CALL', 'TAIL_CALL_NAME',
+    # Funzioni memo: prologo/ritorno con cache LRU e relativi built-in
+    'MEMO_ENTER', 'MEMO_RET', 'MEMO_CLEAR', 'MEMO_SIZE', 'MEMO_RESIZE', 'MEMO_STATS',
+    # Letterale di array [a, b, c]
+    'BUILD_ARRAY',
+    # Array tipizzati (farray/iarray), viste e riempimento
+    'FARRAY', 'IARRAY', 'AVIEW', 'AFILL',
+    # Algebra matriciale nativa
+    'MATMUL', 'TRANSPOSE', 'MADD', 'MSUB', 'MSCALE', 'HADAMARD', 'MAPPLY',
+    # Reti neurali native (MLP sigmoid)
+    'NN_CREATE', 'NN_FORWARD', 'NN_TRAIN', 'NN_PREDICT_BATCH', 'NN_WEIGHTS', 'NN_BIAS',
+    # foreach: iteratore sul contenitore e passo successivo (salta a fine ciclo)
+    'ITER_INIT', 'ITER_NEXT',
+    # String builder e s = s + a + ... riscritto in accodamento sul posto
+    'SB_NEW', 'SB_APPEND', 'SB_STR', 'ADD_STORE',
+    # Libreria stringhe nativa
+    'FIND', 'RFIND', 'SPLIT', 'JOIN', 'REPLACE', 'TRIM', 'UPPER', 'LOWER',
+    'STARTS_WITH', 'ENDS_WITH', 'REPEAT',
+    # Espressioni regolari
+    'RE_MATCH', 'RE_SEARCH', 'RE_FINDALL', 'RE_SUB', 'RE_SPLIT',
+    # Ordinamento nativo
+    'SORT', 'SORT_DESC', 'SORT_BY', 'BSEARCH',
+)
+
+OP = {name: code for code, name in enumerate(OPCODES)}
+
+# Pseudo-istruzioni eliminate dal codice eseguibile in fase di link
+LINK_NOOPS = ('LABEL', 'CATCH_START', 'CATCH_END')
+
+# Opcode il cui argomento è una label, risolta in indirizzo al caricamento
+JUMP_OPCODES = ('JMP', 'JZ', 'JNZ', 'TRY_START', 'TRY_END',
+                'JZ_EQ', 'JZ_NEQ', 'JZ_GT', 'JZ_LT', 'JZ_GTE', 'JZ_LTE', 'ITER_NEXT')
+
+# Operatori binari (due operandi dallo stack, un risultato)
+BINARY_OPCODES = ('ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'GT', 'LT',
+                  'EQ', 'NEQ', 'GTE', 'LTE', 'AND', 'OR')
+
+# Built-in di libreria (algebra matriciale, testo, regex, ordinamento):
+# nome -> (argomenti obbligatori, letterali di default per quelli
+# facoltativi). L'opcode è il nome in maiuscolo. Una funzione utente con
+# lo stesso nome ha la precedenza.
+LIBRARY_BUILTINS = {
+    # Array tipizzati
+    'farray': (1, ()), 'iarray': (1, ()), 'aview': (2, (None,)), 'afill': (2, ()),
+    # Algebra matriciale
+    'matmul': (2, ()), 'madd': (2, ()), 'msub': (2, ()), 'mscale': (2, ()),
+    'hadamard': (2, ()), 'mapply': (2, ()), 'transpose': (1, ()),
+    # Reti neurali
+    'nn_create': (1, ()), 'nn_forward': (2, ()), 'nn_predict_batch': (2, ()),
+    'nn_weights': (2, ()), 'nn_bias': (2, ()), 'nn_train': (5, (1,)),
+    # String builder (sb_new e sb_append in LIBRARY_VARIANTS)
+    'sb_str': (1, ()),
+    # Cache delle funzioni memo (memo_size in LIBRARY_VARIANTS)
+    'memo_clear': (1, ()), 'memo_stats': (1, ()),
+    # Testo
+    'find': (2, (0,)), 'rfind': (2, ()), 'split': (1, (None,)), 'join': (1, ('""',)),
+    'replace': (3, ()), 'trim': (1, ()), 'upper': (1, ()), 'lower': (1, ()),
+    'starts_with': (2, ()), 'ends_with': (2, ()), 'repeat': (2, ()),
+    # Espressioni regolari: l'ultimo argomento facoltativo sono i flag ("i", "ms", ...)
+    're_match': (2, ('""',)), 're_search': (2, ('""',)), 're_findall': (2, ('""',)),
+    're_sub': (3, ('""',)), 're_split': (2, ('""',)),
+    # Ordinamento sul posto e ricerca binaria
+    'sort': (1, ()), 'sort_desc': (1, ()), 'sort_by': (2, (0,)), 'bsearch': (2, ()),
+}
+
+# Flag delle espressioni regolari accettati come lettere
+REGEX_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+
+# Opcode senza effetti collaterali e loro effetto netto sullo stack: le
+# espressioni fatte solo di questi si possono valutare in anticipo (ADD_STORE)
+PURE_STACK_EFFECT = {'PUSH': 1, 'LOAD_FAST': 1, 'LOAD_GLOBAL': 1,
+                     'LOAD_IDX': 0, 'LOAD_IDX_2D': -1, 'GET_ATTR': 0, 'NOT': 0,
+                     'LEN': 0, 'TO_INT': 0, 'TO_FLOAT': 0, 'CHR': 0, 'SUBSTR': -2}
+PURE_STACK_EFFECT.update((name, -1) for name in BINARY_OPCODES)
+
+# Opcode puri che con -O si valutano a tempo di compilazione quando gli
+# operandi sono letterali: opcode -> numero di operandi
+FOLDABLE_OPCODES = dict.fromkeys(BINARY_OPCODES + ('POW', 'ATAN2'), 2)
+FOLDABLE_OPCODES.update(dict.fromkeys(('NOT', 'SQRT', 'EXP', 'LOG', 'ABS', 'FLOOR', 'CEIL',
+                                       'SIN', 'COS', 'TAN', 'ASIN', 'ACOS', 'ATAN'), 1))
+
+# Opcode che possono eseguire codice utente: chiamate e Tkinter (i callback
+# registrati partono dentro mainloop, update e le finestre di dialogo)
+USER_CODE_OPCODES = frozenset(('CALL', 'CALL_NAME', 'TAIL_CALL', 'TAIL_CALL_NAME')
+                              + tuple(name for name in OPCODES if name.startswith('TK_')))
+
+# Opcode che accedono a un array per nome: l'argomento diventa un
+# riferimento (slot, nome), con slot None per le variabili globali
+VAR_REF_OPCODES = ('STORE_IDX', 'LOAD_IDX', 'LOAD_IDX_2D', 'STORE_IDX_2D')
+
+# Valore di uno slot locale non ancora assegnato: la lettura ricade sul
+# globale omonimo e la prima scrittura aggiorna il globale se esiste
+UNSET = object()
+
+# Operatori adattivi: alla prima esecuzione l'istruzione si riscrive nella
+# variante specializzata per il tipo (comune) dei due operandi
+ADAPTIVE_OPCODES = ('ADD', 'SUB', 'MUL', 'DIV', 'MOD')
+
+SPECIALIZED = {
+    ('ADD', int): 'ADD_INT', ('ADD', float): 'ADD_FLOAT', ('ADD', str): 'ADD_STR',
+    ('SUB', int): 'SUB_INT', ('SUB', float): 'SUB_FLOAT',
+    ('MUL', int): 'MUL_INT', ('MUL', float): 'MUL_FLOAT',
+    ('DIV', int): 'DIV_INT', ('DIV', float): 'DIV_FLOAT',
+    ('MOD', int): 'MOD_INT',
+}
+
+# Confronto seguito da JZ -> salto condizionale fuso
+COMPARE_BRANCH = {'EQ': 'JZ_EQ', 'NEQ': 'JZ_NEQ', 'GT': 'JZ_GT',
+                  'LT': 'JZ_LT', 'GTE': 'JZ_GTE', 'LTE': 'JZ_LTE'}
+
+
+class StructInstance:
+    """
+    Base delle istanze di struct. make_struct_class genera per ogni struct
+    una sottoclasse con uno slot per campo, al posto del vecchio dict
+    {'__type__': nome, campo: valore, ...}. I campi non dichiarati finiscono
+    in __extra__, creato solo al primo uso. Iterazione, stampa e confronto
+    si comportano come il dict di una volta.
+    """
+    __slots__ = ('__extra__',)
+    __type__ = None
+    __fields__ = ()
+
+    def __init__(self):
+        for f in self.__fields__: setattr(self, f, 0)
+
+    def __iter__(self):
+        # Stesso ordine delle chiavi del vecchio dict
+        yield '__type__'
+        yield from self.__fields__
+        yield from getattr(self, '__extra__', ())
+
+    def __repr__(self):
+        return repr(dict(struct_items(self)))
+
+    def __eq__(self, other):
+        return type(other) is type(self) and struct_items(other) == struct_items(self)
+
+
+def make_struct_class(name, fields):
+    """
+    Genera la classe a slot di una struct. Ritorna None se i campi non
+    possono diventare slot (duplicati o nomi non validi): in quel caso
+    le istanze restano dict.
+    """
+    fields = tuple(fields)
+    if len(set(fields)) != len(fields): return None
+    if not all(f.isidentifier() and not f.startswith('__') for f in fields): return None
+    return type(name, (StructInstance,), {'__slots__': fields, '__type__': name, '__fields__': fields})
+
+
+def struct_get(inst, key, default=0):
+    """Legge un campo (dichiarato o aggiunto) di un'istanza di struct."""
+    if type(key) is str:
+        val = getattr(inst, key, UNSET)
+        if val is not UNSET: return val
+    extra = getattr(inst, '__extra__', None)
+    return extra.get(key, default) if extra else default
+
+
+def struct_set(inst, key, val):
+    """Scrive un campo; quelli non dichiarati vanno in __extra__."""
+    if type(key) is str:
+        try:
+            setattr(inst, key, val)
+            return
+        except AttributeError: pass
+    extra = getattr(inst, '__extra__', None)
+    if extra is None: extra = inst.__extra__ = {}
+    extra[key] = val
+
+
+def struct_items(inst):
+    """Coppie (chiave, valore) di un'istanza, '__type__' compreso."""
+    return [(k, struct_get(inst, k)) for k in inst]
+
+
+class AscArray(list):
+    """
+    Array denso indicizzato 0..n-1: una lista Python, quindi len, accodamento
+    (a[len(a)] = x) e accesso per indice costano O(1).
+    Alla prima chiave sparsa, negativa o non intera l'array passa alla forma
+    dict nello stesso oggetto: la lista si svuota e gli elementi vanno in
+    self.sparse, così chi condivide il riferimento vede ancora i dati.
+    Stampa e confronto sono quelli del vecchio array-dict.
+    """
+    __slots__ = ('sparse',)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.sparse = None
+
+    def __bool__(self):
+        return bool(self.sparse) if self.sparse is not None else list.__len__(self) > 0
+
+    def __repr__(self):
+        return repr(array_dict(self))
+
+    def __eq__(self, other):
+        if isinstance(other, AscArray): other = array_dict(other)
+        return isinstance(other, dict) and array_dict(self) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def array_get(arr, idx):
+    """Elemento idx di un AscArray, 0 se assente (come dict.get)."""
+    if arr.sparse is not None: return arr.sparse.get(idx, 0)
+    if type(idx) is not int:
+        if type(idx) is not float or not idx.is_integer(): return 0
+        idx = int(idx)
+    return arr[idx] if 0 <= idx < len(arr) else 0
+
+
+def array_set(arr, idx, val):
+    """Scrive l'elemento idx, passando alla forma sparsa se serve."""
+    if arr.sparse is None:
+        if type(idx) is float and idx.is_integer(): idx = int(idx)
+        if type(idx) is int:
+            n = len(arr)
+            if 0 <= idx < n:
+                arr[idx] = val
+                return
+            if idx == n:
+                arr.append(val)
+                return
+        array_sparse(arr)
+    arr.sparse[idx] = val
+
+
+def array_sparse(arr):
+    """Porta l'array nella forma dict (se non lo è già) e ritorna il dict."""
+    if arr.sparse is None:
+        arr.sparse = dict(enumerate(arr))
+        del arr[:]
+    return arr.sparse
+
+
+def array_len(arr):
+    return len(arr.sparse) if arr.sparse is not None else len(arr)
+
+
+def array_dict(arr):
+    """Vista dict {indice: valore} dell'array (copia per la forma densa)."""
+    return arr.sparse if arr.sparse is not None else dict(enumerate(arr))
+
+
+class Matrix:
+    """
+    Matrice rows x cols in una lista piatta row-major: la cella (r, c) sta
+    in data[r * cols + c]. Nasce da matrix(r, c, v) o dal primo m[r, c] = v
+    e cresce se si scrive oltre le dimensioni (le celle nuove valgono 0).
+    La stampa riproduce il vecchio dict con chiavi "r,c".
+    """
+    __slots__ = ('rows', 'cols', 'data')
+
+    def __init__(self, rows=0, cols=0, init=0):
+        self.rows = rows
+        self.cols = cols
+        self.data = [init] * (rows * cols)
+
+    def __repr__(self):
+        cells = {'__matrix__': True, '__rows__': self.rows, '__cols__': self.cols}
+        for r in range(self.rows):
+            for c in range(self.cols):
+                cells[f"{r},{c}"] = self.data[r * self.cols + c]
+        return repr(cells)
+
+    def __eq__(self, other):
+        return (type(other) is Matrix and self.rows == other.rows
+                and self.cols == other.cols and self.data == other.data)
+
+
+def matrix_set(m, r, c, val):
+    """Scrive la cella (r, c), allargando la matrice se necessario."""
+    r = int(r); c = int(c)
+    if r < 0 or c < 0:
+        raise AscensionException(f"Indice di matrice negativo: [{r}, {c}]", "IndexError")
+    if c >= m.cols:
+        # Nuove colonne: ogni riga si allunga, ricostruendo il layout
+        pad = [0] * (c + 1 - m.cols)
+        m.data = [x for i in range(m.rows) for x in m.data[i * m.cols:(i + 1) * m.cols] + pad]
+        m.cols = c + 1
+    if r >= m.rows:
+        m.data.extend([0] * ((r + 1 - m.rows) * m.cols))
+        m.rows = r + 1
+    m.data[r * m.cols + c] = val
+
+def matrix_key(idx):
+    """
+    Cella (r, c) di un indice singolo su una matrice: le chiavi "r,c" del
+    vecchio dict-matrice, le stesse ritornate da keys(m). Qualsiasi altra
+    chiave è un errore, la matrice non cambia forma.
+    """
+    if type(idx) is str:
+        r, sep, c = idx.partition(',')
+        try:
+            if sep: return int(r), int(c)
+        except ValueError: pass
+    raise AscensionException(f"Indice di matrice non valido: {idx!r} (usa m[r, c] o m[\"r,c\"])", "TypeError")
+
+
+# Array tipizzati: farray -> array('d'), iarray -> array('q'), 8 byte per
+# elemento. Le viste di aview() sono memoryview sullo stesso buffer, quindi
+# la dimensione resta fissa: scrivere fuori dai limiti è un errore.
+TYPED_ARRAYS = (py_array.array, memoryview)
+
+
+def typed_kind(arr):
+    """Codice di tipo ('d' o 'q') di un array tipizzato o di una sua vista."""
+    return arr.typecode if type(arr) is py_array.array else arr.format
+
+
+def typed_array(kind, src):
+    """Nuovo array tipizzato: n zeri, oppure copia di array, matrice o vista."""
+    if isinstance(src, (int, float)):
+        # bytes a zero -> frombytes: nessun ciclo Python
+        return py_array.array(kind, bytes(8 * max(0, int(src))))
+    if type(src) is AscArray: values = src.sparse.values() if src.sparse is not None else src
+    elif type(src) is Matrix: values = src.data
+    elif isinstance(src, TYPED_ARRAYS): values = src.tolist()
+    else: raise AscensionException(f"Impossibile creare un array tipizzato da '{src}'", "TypeError")
+    try: return py_array.array(kind, map(float if kind == 'd' else int, values))
+    except (TypeError, ValueError, OverflowError):
+        raise AscensionException("Array tipizzato: elementi non numerici", "TypeError")
+
+
+def typed_index(arr, idx):
+    """Indice intero valido per l'array tipizzato, -1 se fuori dai limiti."""
+    if type(idx) is not int:
+        if type(idx) is not float or not idx.is_integer(): return -1
+        idx = int(idx)
+    return idx if 0 <= idx < len(arr) else -1
+
+
+def typed_value(kind, val):
+    """Converte val nel tipo dell'elemento (troncando i float per iarray)."""
+    if type(val) is float: return val if kind == 'd' else int(val)
+    if type(val) is int: return val
+    raise AscensionException(f"Valore non numerico per array tipizzato: '{val}'", "TypeError")
+
+
+def typed_set(arr, idx, val):
+    i = typed_index(arr, idx)
+    if i < 0:
+        raise AscensionException(f"Indice {idx} fuori dai limiti (len {len(arr)})", "IndexError")
+    try: arr[i] = typed_value(typed_kind(arr), val)
+    except (OverflowError, ValueError):
+        raise AscensionException(f"Valore {val} fuori dall'intervallo di iarray", "OverflowError")
+
+
+def typed_fill(arr, val):
+    """Riempie tutto l'array (o la vista) con val in un'unica copia di buffer."""
+    kind = typed_kind(arr)
+    try: arr[:] = py_array.array(kind, [typed_value(kind, val)]) * len(arr)
+    except (OverflowError, ValueError):
+        raise AscensionException(f"Valore {val} fuori dall'intervallo di iarray", "OverflowError")
+
+
+# Algebra matriciale: operandi convertiti in Matrix, risultati sempre
+# Matrix nuove. Con NumPy disponibile (e matrici non troppo piccole, dove
+# la conversione costerebbe più del calcolo) si usa np, altrimenti liste.
+NUMPY_MIN_CELLS = 64
+
+
+def _sigmoid(x):
+    # Forma con tanh: non va in overflow per x molto negativi
+    return 0.5 * (1.0 + math.tanh(0.5 * x))
+
+
+# nome -> (versione scalare, versione NumPy)
+MATRIX_FUNCS = {
+    'sigmoid': (_sigmoid, lambda a: 0.5 * (1.0 + np.tanh(0.5 * a))),
+    'sigmoid_derivative': (lambda y: y * (1.0 - y), lambda a: a * (1.0 - a)),
+    'relu': (lambda x: x if x > 0 else 0, lambda a: np.where(a > 0, a, 0)),
+    'relu_derivative': (lambda x: 1 if x > 0 else 0, lambda a: np.where(a > 0, 1, 0)),
+    'step': (lambda x: 1 if x >= 0 else 0, lambda a: np.where(a >= 0, 1, 0)),
+    'tanh': (math.tanh, lambda a: np.tanh(a)),
+    'exp': (math.exp, lambda a: np.exp(a)),
+    'log': (math.log, lambda a: np.log(a)),
+    'sqrt': (math.sqrt, lambda a: np.sqrt(a)),
+    'abs': (abs, lambda a: np.abs(a)),
+    'square': (lambda x: x * x, lambda a: a * a),
+}
+
+
+def matrix_from(rows, cols, data):
+    """Matrix rows x cols che adotta la lista data senza copiarla."""
+    m = Matrix()
+    m.rows = rows; m.cols = cols; m.data = data
+    return m
+
+
+def as_matrix(val, name):
+    """
+    Operando matriciale: Matrix, vecchio dict-matrice, array di array
+    (righe) oppure array semplice / tipizzato come vettore riga 1 x n.
+    """
+    if type(val) is Matrix: return val
+    if isinstance(val, dict) and val.get('__matrix__'):
+        rows = val.get('__rows__', 0); cols = val.get('__cols__', 0)
+        return matrix_from(rows, cols, [val.get(f"{r},{c}", 0) for r in range(rows) for c in range(cols)])
+    if isinstance(val, TYPED_ARRAYS): return matrix_from(1, len(val), val.tolist())
+    if type(val) is AscArray:
+        items = list(val.sparse.values()) if val.sparse is not None else val
+        if items and all(type(row) is AscArray for row in items):
+            rows = [list(row.sparse.values()) if row.sparse is not None else row for row in items]
+            cols = len(rows[0])
+            if any(len(row) != cols for row in rows):
+                raise AscensionException(f"{name}: le righe hanno lunghezze diverse", "MathError")
+            return matrix_from(len(rows), cols, [x for row in rows for x in row])
+        return matrix_from(1 if items else 0, len(items), list(items))
+    raise AscensionException(f"{name}: operando non matriciale '{val}'", "TypeError")
+
+
+def _to_numpy(m):
+    """ndarray della matrice, o None se non conviene o non è numerica."""
+    if np is None or m.rows * m.cols < NUMPY_MIN_CELLS: return None
+    a = np.array(m.data)
+    # Stringhe o interi oltre 64 bit restano al percorso Python
+    if a.dtype.kind not in 'iuf': return None
+    return a.reshape(m.rows, m.cols)
+
+
+def _from_numpy(a):
+    rows, cols = a.shape
+    return matrix_from(rows, cols, a.ravel().tolist())
+
+
+def matrix_mul(a, b):
+    """Prodotto righe per colonne."""
+    a = as_matrix(a, 'matmul'); b = as_matrix(b, 'matmul')
+    if a.cols != b.rows:
+        raise AscensionException(
+            f"matmul: dimensioni incompatibili {a.rows}x{a.cols} e {b.rows}x{b.cols}", "MathError")
+    na = _to_numpy(a)
+    nb = _to_numpy(b) if na is not None else None
+    if nb is not None: return _from_numpy(na @ nb)
+    n, k, m = a.rows, a.cols, b.cols
+    adata = a.data
+    bcols = [b.data[j::m] for j in range(m)]
+    data = []
+    for i in range(n):
+        row = adata[i * k:(i + 1) * k]
+        data.extend([sum(map(operator.mul, row, col)) for col in bcols])
+    return matrix_from(n, m, data)
+
+
+def matrix_transpose(a):
+    a = as_matrix(a, 'transpose')
+    c = a.cols
+    return matrix_from(c, a.rows, [x for j in range(c) for x in a.data[j::c]])
+
+
+def matrix_elementwise(op, a, b, name):
+    """
+    op cella per cella. b può essere uno scalare, una matrice delle stesse
+    dimensioni, una riga 1 x cols (es. bias) o una colonna rows x 1.
+    """
+    a = as_matrix(a, name)
+    if isinstance(b, (int, float)):
+        na = _to_numpy(a)
+        if na is not None: return _from_numpy(op(na, b))
+        return matrix_from(a.rows, a.cols, [op(x, b) for x in a.data])
+    b = as_matrix(b, name)
+    if b.rows == a.rows and b.cols == a.cols: other = b.data
+    elif b.rows == 1 and b.cols == a.cols: other = b.data * a.rows
+    elif b.cols == 1 and b.rows == a.rows: other = [x for x in b.data for _ in range(a.cols)]
+    else:
+        raise AscensionException(
+            f"{name}: dimensioni incompatibili {a.rows}x{a.cols} e {b.rows}x{b.cols}", "MathError")
+    na = _to_numpy(a)
+    nb = np.array(b.data).reshape(b.rows, b.cols) if na is not None else None
+    if nb is not None and nb.dtype.kind in 'iuf': return _from_numpy(op(na, nb))
+    try: return matrix_from(a.rows, a.cols, list(map(op, a.data, other)))
+    except TypeError:
+        raise AscensionException(f"{name}: celle non numeriche", "TypeError")
+
+
+def matrix_apply(a, fname):
+    """Applica una funzione di MATRIX_FUNCS a ogni cella."""
+    a = as_matrix(a, 'mapply')
+    funcs = MATRIX_FUNCS.get(fname)
+    if funcs is None:
+        raise AscensionException(f"mapply: funzione sconosciuta '{fname}'", "NameError")
+    na = _to_numpy(a)
+    try:
+        if na is not None:
+            with np.errstate(all='raise'): return _from_numpy(funcs[1](na))
+        f = funcs[0]
+        return matrix_from(a.rows, a.cols, [f(x) for x in a.data])
+    except (ValueError, OverflowError, ArithmeticError):
+        raise AscensionException(f"mapply: '{fname}' fuori dominio", "MathError")
+    except TypeError:
+        raise AscensionException("mapply: celle non numeriche", "TypeError")
+
+
+class NeuralNet:
+    """
+    Percettrone multistrato con sigmoid su ogni layer. weights[l] è la lista
+    delle righe (una per neurone, pesi verso il layer precedente), biases[l]
+    la lista dei bias. L'inizializzazione e l'ordine delle operazioni sono
+    quelli della vecchia libreria scalare, quindi a parità di seme random
+    una rete 2-2-1 produce gli stessi numeri.
+    """
+    __slots__ = ('sizes', 'weights', 'biases')
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.weights = []
+        self.biases = []
+        for n_in, n_out in zip(sizes, sizes[1:]):
+            self.weights.append([[py_random.random() * 2 - 1 for _ in range(n_in)] for _ in range(n_out)])
+            self.biases.append([py_random.random() * 0.5 - 0.25 for _ in range(n_out)])
+
+    def __repr__(self):
+        return "<nn " + "-".join(str(n) for n in self.sizes) + ">"
+
+
+def _nn_sigmoid(x):
+    try: return 1.0 / (1.0 + math.exp(-x))
+    except OverflowError: return 0.0
+
+
+def _nn_forward(net, x):
+    """Attivazioni di tutti i layer per un campione, input compreso."""
+    acts = [x]
+    for W, b in zip(net.weights, net.biases):
+        x = [_nn_sigmoid(sum(map(operator.mul, row, x)) + bj) for row, bj in zip(W, b)]
+        acts.append(x)
+    return acts
+
+
+def _nn_deltas(net, acts, target):
+    """Delta di ogni layer (backpropagation) ed errore quadratico del campione."""
+    out = acts[-1]
+    errors = [t - o for t, o in zip(target, out)]
+    delta = [e * (o * (1.0 - o)) for e, o in zip(errors, out)]
+    deltas = [delta]
+    for l in range(len(net.weights) - 1, 0, -1):
+        W = net.weights[l]
+        delta = [sum(map(operator.mul, delta, col)) * (a * (1.0 - a))
+                 for col, a in zip(zip(*W), acts[l])]
+        deltas.append(delta)
+    deltas.reverse()
+    return deltas, sum(e * e for e in errors)
+
+
+def _nn_train_py(net, X, Y, epochs, lr, batch):
+    loss = 0.0
+    n = len(X)
+    for _ in range(epochs):
+        sq = 0.0
+        for start in range(0, n, batch):
+            # I delta del batch si calcolano tutti con i pesi di partenza
+            step = lr / min(batch, n - start)
+            grads = []
+            for x, t in zip(X[start:start + batch], Y[start:start + batch]):
+                acts = _nn_forward(net, x)
+                deltas, err = _nn_deltas(net, acts, t)
+                sq += err
+                grads.append((acts, deltas))
+            for acts, deltas in grads:
+                for W, b, a, d in zip(net.weights, net.biases, acts, deltas):
+                    for j, dj in enumerate(d):
+                        g = step * dj
+                        W[j] = [w + g * ai for w, ai in zip(W[j], a)]
+                        b[j] = b[j] + g
+        loss = sq / (n * net.sizes[-1])
+    return loss
+
+
+def _nn_train_np(net, X, Y, epochs, lr, batch):
+    Ws = [np.array(W, dtype=float) for W in net.weights]
+    bs = [np.array(b, dtype=float) for b in net.biases]
+    X = np.array(X, dtype=float); Y = np.array(Y, dtype=float)
+    n = len(X); loss = 0.0
+    with np.errstate(over='ignore'):
+        for _ in range(epochs):
+            sq = 0.0
+            for start in range(0, n, batch):
+                acts = [X[start:start + batch]]
+                for W, b in zip(Ws, bs):
+                    acts.append(1.0 / (1.0 + np.exp(-(acts[-1] @ W.T + b))))
+                out = acts[-1]
+                E = Y[start:start + batch] - out
+                sq += float((E * E).sum())
+                D = E * (out * (1.0 - out))
+                deltas = [D]
+                for l in range(len(Ws) - 1, 0, -1):
+                    D = (D @ Ws[l]) * (acts[l] * (1.0 - acts[l]))
+                    deltas.append(D)
+                deltas.reverse()
+                step = lr / len(out)
+                for l, D in enumerate(deltas):
+                    Ws[l] += step * (D.T @ acts[l])
+                    bs[l] += step * D.sum(axis=0)
+            loss = sq / (n * net.sizes[-1])
+    net.weights = [W.tolist() for W in Ws]
+    net.biases = [b.tolist() for b in bs]
+    return loss
+
+
+def _nn_rows(net, val, width, name):
+    """Campioni come liste di righe (una per riga di matrice)."""
+    m = as_matrix(val, name)
+    # Vettore di target 1 x n per una rete a un'uscita: una colonna n x 1
+    if m.rows == 1 and width == 1 and m.cols != 1: m = matrix_from(m.cols, 1, m.data)
+    if m.cols != width:
+        raise AscensionException(f"{name}: attese {width} colonne per {net!r}, trovate {m.cols}", "MathError")
+    c = m.cols
+    return [m.data[i * c:(i + 1) * c] for i in range(m.rows)]
+
+
+def nn_create(layers):
+    """Nuova rete da un array di dimensioni, es. [2, 4, 1]."""
+    if isinstance(layers, TYPED_ARRAYS): sizes = layers.tolist()
+    elif isinstance(layers, AscArray): sizes = list(array_dict(layers).values())
+    else: sizes = []
+    if len(sizes) < 2 or not all(isinstance(k, (int, float)) and k >= 1 for k in sizes):
+        raise AscensionException("nn_create: serve un array di almeno due dimensioni di layer positive", "TypeError")
+    return NeuralNet([int(k) for k in sizes])
+
+
+def _nn_check(net, name):
+    if type(net) is not NeuralNet:
+        raise AscensionException(f"{name}: '{net}' non è una rete creata con nn_create", "TypeError")
+
+
+def nn_train(net, X, Y, epochs, lr, batch=1):
+    """
+    Discesa del gradiente sull'errore quadratico. batch=1 è lo SGD campione
+    per campione della vecchia libreria; con batch più grandi e NumPy
+    disponibile ogni batch diventa un prodotto tra matrici.
+    Ritorna l'errore quadratico medio dell'ultima epoca.
+    """
+    _nn_check(net, 'nn_train')
+    X = _nn_rows(net, X, net.sizes[0], 'nn_train')
+    Y = _nn_rows(net, Y, net.sizes[-1], 'nn_train')
+    if len(X) != len(Y):
+        raise AscensionException(f"nn_train: {len(X)} campioni ma {len(Y)} target", "MathError")
+    if not X: return 0
+    epochs = int(epochs); batch = max(1, int(batch))
+    if np is not None and batch > 1 and min(batch, len(X)) * max(net.sizes) >= NUMPY_MIN_CELLS:
+        return _nn_train_np(net, X, Y, epochs, lr, batch)
+    return _nn_train_py(net, X, Y, epochs, lr, batch)
+
+
+def nn_predict_batch(net, X):
+    """Uscite della rete per ogni riga di X, come matrice n x uscite."""
+    _nn_check(net, 'nn_predict_batch')
+    X = _nn_rows(net, X, net.sizes[0], 'nn_predict_batch')
+    if np is not None and len(X) * max(net.sizes) >= NUMPY_MIN_CELLS:
+        A = np.array(X, dtype=float)
+        with np.errstate(over='ignore'):
+            for W, b in zip(net.weights, net.biases):
+                A = 1.0 / (1.0 + np.exp(-(A @ np.array(W).T + np.array(b))))
+        return _from_numpy(A)
+    data = []
+    for x in X: data.extend(_nn_forward(net, x)[-1])
+    return matrix_from(len(X), net.sizes[-1], data)
+
+
+class StringBuilder:
+    """
+    Stringa costruita a pezzi (sb_new/sb_append/sb_str): i frammenti si
+    accumulano in una lista e vengono uniti una volta sola, quando serve
+    la stringa.
+    """
+    __slots__ = ('parts', 'length')
+
+    def __init__(self, init=""):
+        self.parts = [init] if init else []
+        self.length = len(init)
+
+    def append(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def __str__(self):
+        if len(self.parts) > 1: self.parts[:] = [''.join(self.parts)]
+        return self.parts[0] if self.parts else ""
+
+    __repr__ = __str__
+
+
+def sort_key(val):
+    """
+    Chiave di ordinamento per valori eterogenei: NULL, poi numeri, poi
+    stringhe, poi il resto per rappresentazione testuale.
+    """
+    if val is None: return (0, 0)
+    if isinstance(val, (int, float)): return (1, val)
+    if type(val) is str: return (2, val)
+    return (3, str(val))
+
+
+def sort_values(values, key=None, reverse=False):
+    """
+    Timsort sul posto di una lista: confronto nativo quando i tipi lo
+    permettono, sort_key solo se la lista mescola tipi non confrontabili.
+    """
+    try: values.sort(key=key, reverse=reverse)
+    except TypeError:
+        if key is None: values.sort(key=sort_key, reverse=reverse)
+        else: values.sort(key=lambda v: sort_key(key(v)), reverse=reverse)
+
+
+def as_text(val):
+    """Valore come stringa per le funzioni di testo (NULL per None)."""
+    if type(val) is str: return val
+    return "NULL" if val is None else str(val)
+
+
+def sorted_keys(keys):
+    """Chiavi in ordine (per stringa se i tipi non sono confrontabili)."""
+    keys = list(keys)
+    try: keys.sort()
+    except TypeError: keys.sort(key=str)
+    return keys
+
+
+def iter_pairs(container, ordered=False):
+    """
+    Coppie (chiave, valore) per foreach, prodotte una alla volta senza
+    copiare il contenitore. Array, stringhe e array tipizzati vanno per
+    indice, le matrici per righe (ogni riga è un AscArray nuovo); dict e
+    struct seguono l'ordine di inserimento, o quello di keys() con ordered.
+    """
+    if type(container) is AscArray:
+        if container.sparse is None: return enumerate(container)
+        container = container.sparse
+    elif isinstance(container, str) or isinstance(container, TYPED_ARRAYS):
+        return enumerate(container)
+    elif type(container) is Matrix:
+        m = container
+        return ((r, AscArray(m.data[r * m.cols:(r + 1) * m.cols])) for r in range(m.rows))
+    if isinstance(container, StructInstance):
+        inst = container
+        keys = (k for k in inst if k != '__type__')
+        if ordered: keys = sorted_keys(keys)
+        return ((k, struct_get(inst, k)) for k in keys)
+    if isinstance(container, dict):
+        d = container
+        if ordered: return ((k, d[k]) for k in sorted_keys(k for k in d if k != '__type__'))
+        return ((k, v) for k, v in d.items() if k != '__type__')
+    return iter(())
+
+
+def as_dict(val):
+    """Converte struct e array nel dict equivalente (per config, payload)."""
+    if isinstance(val, StructInstance): return dict(struct_items(val))
+    if isinstance(val, AscArray): return dict(array_dict(val))
+    return val
+
+
+# Argomenti con cui una funzione memo usa la cache: solo valori immutabili.
+# Gli oggetti confrontati per identità (string builder, reti, handle, ...)
+# possono cambiare tra due chiamate e darebbero risultati vecchi.
+MEMO_KEY_TYPES = frozenset((int, float, str, type(None)))
+
+
+class MemoCache:
+    """
+    Cache LRU limitata dei risultati di una funzione memo, indicizzata
+    dalla tupla degli argomenti, con contatori di hit e miss.
+    """
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Ritorna il risultato memorizzato per key, UNSET se assente."""
+        try: val = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return UNSET
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return val
+
+    def put(self, key, val):
+        self.entries[key] = val
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity: self.entries.popitem(last=False)
+
+    def resize(self, capacity):
+        """Cambia la capienza, scartando le voci meno usate di recente."""
+        self.capacity = max(0, capacity)
+        while len(self.entries) > self.capacity: self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _build_legacy_dispatch():
+    """
+    Genera la catena if/elif di confronti tra stringhe usata dal motore
+    'legacy' (stesso costo per opcode del vecchio loop di run()).
+    """
+    lines = ["def legacy_dispatch(handlers, op, arg):"]
+    for code, name in enumerate(OPCODES):
+        lines.append(f"    {'if' if code == 0 else 'elif'} op == {name!r}: handlers[{code}](arg)")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace['legacy_dispatch']
+
+legacy_dispatch = _build_legacy_dispatch()
+
+
 # =============================================================================
 #                              VIRTUAL MACHINE
 # =============================================================================
@@ -121,20 +1018,35 @@ class AscensionVM:
     - Gestione eccezioni (try/catch)
     - I/O su file, GUI (Tkinter), TUI (Curses), Networking (HTTP/Socket)
     """
-    def __init__(self):
+    def __init__(self, engine='fast'):
         """Inizializza la VM con tutti i suoi componenti."""
 
         # Stack principale per operazioni aritmetiche e logiche
         self.stack = []
         self.global_memory = {}
-        self.local_frames = [{}]
+        # Frame locali a slot (liste); il frame 0 è quello del main
+        self.local_frames = [[]]
         self.structs = {}
+        # Classi a slot generate dalle struct: nome -> classe (None = dict)
+        self.struct_classes = {}
         self.call_stack = []
         self.try_stack = []
         self.ip = 0
         self.program = []
+        self.code = []
         self.labels = {}
+        self.unresolved_calls = []
+        # Motore di esecuzione: 'fast' (tabella) o 'legacy' (catena di stringhe)
+        self.engine = engine
+        self.handlers = [getattr(self, '_op_' + name.lower()) for name in OPCODES]
+        # Pool delle costanti: i letterali vengono decodificati una sola volta
+        self.constants = []
+        self.constant_index = {}
         self.return_value = None
+        # Cache delle funzioni memo: nome -> MemoCache
+        self.memo_caches = {}
+        # Pattern re compilati, chiave (pattern, flag)
+        self.regex_cache = MemoCache(256)
         self.file_handles = {}
         self.current_screen = None
 
@@ -156,1659 +1068,2180 @@ class AscensionVM:
     def memory(self):
         return self.local_frames[-1]
 
-    def get_var(self, name):
+    def load_ref(self, ref):
         """
-        Recupera il valore di una variabile.
-        Cerca prima nel frame locale, poi in quello globale.
-        Ritorna 0 se non trovata.
+        Recupera il valore di una variabile dal suo riferimento (slot, nome).
+        Slot None indica una globale; uno slot locale non ancora assegnato
+        ricade sul globale omonimo. Ritorna 0 se non trovata.
         """
-        if name in self.local_frames[-1]:
-            return self.local_frames[-1][name]
+        slot, name = ref
+        if slot is not None:
+            val = self.local_frames[-1][slot]
+            if val is not UNSET: return val
         return self.global_memory.get(name, 0)
 
-    def set_var(self, name, value, force_global=False):
+    def store_ref(self, ref, value):
         """
-        Imposta il valore di una variabile.
-        Gestisce lo scoping locale/globale automaticamente.
+        Imposta il valore di una variabile dal suo riferimento (slot, nome).
+        Un locale non ancora assegnato aggiorna il globale omonimo, se esiste.
         """
-        if force_global or len(self.local_frames) == 1:
-            self.global_memory[name] = value
-        else:
-            if name in self.global_memory and name not in self.local_frames[-1]:
-                self.global_memory[name] = value
-            else:
-                self.local_frames[-1][name] = value
+        slot, name = ref
+        if slot is not None:
+            frame = self.local_frames[-1]
+            if frame[slot] is not UNSET or name not in self.global_memory:
+                frame[slot] = value
+                return
+        self.global_memory[name] = value
+
+    @staticmethod
+    def decode_literal(val):
+        """
+        Converte un letterale del bytecode nel valore Python corrispondente.
+        Le stringhe "..." perdono le virgolette e processano gli escape,
+        le stringhe numeriche diventano int/float.
+        """
+        if isinstance(val, str):
+            if val.startswith('"'):
+                val = val[1:-1]
+                # Processa escape sequences
+                val = val.replace('\\n', '\n')
+                val = val.replace('\\t', '\t')
+                val = val.replace('\\r', '\r')
+                val = val.replace('\\"', '"')
+                val = val.replace('\\\\', '\\')
+            elif val.replace('.','',1).lstrip('-').isdigit():
+                val = float(val) if '.' in val else int(val)
+        return val
+
+    def add_constant(self, val):
+        """Inserisce un valore nel pool delle costanti e ne ritorna l'indice."""
+        # Il tipo fa parte della chiave: 1, 1.0 e True restano distinti
+        key = (type(val), val)
+        idx = self.constant_index.get(key)
+        if idx is None:
+            idx = len(self.constants)
+            self.constants.append(val)
+            self.constant_index[key] = idx
+        return idx
 
     def load_program(self, program_code, struct_defs):
         """
         Carica un programma compilato nella VM.
         Costruisce la mappa delle label per salti veloci.
         """
-        self.program = program_code
-        self.structs = struct_defs
-        for idx, op in enumerate(self.program):
-            if op[0] == 'LABEL':
-                self.labels[op[1]] = idx
+        self.program = []
+        self.code = []
+        self.labels = {}
+        self.unresolved_calls = []
+        self.structs = {}
+        self.struct_classes = {}
+        self.extend_program(program_code, struct_defs)
+
+    def extend_program(self, program_code, struct_defs):
+        """
+        Accoda bytecode al programma già caricato (usato anche dalla shell).
+        I letterali di PUSH vengono decodificati una volta sola e sostituiti
+        dall'indice nel pool delle costanti; ogni opcode viene codificato
+        come intero in self.code. Il programma termina sempre con HALT.
+
+        Fase di link: le pseudo-istruzioni (LABEL, CATCH_START, CATCH_END)
+        spariscono dal codice eseguibile e i salti puntano direttamente
+        all'indice dell'istruzione. self.labels resta solo per il debug e
+        per gli ingressi dei callback.
+        Gli operatori adattivi ricevono in self.code il proprio indice, che
+        serve a riscriversi nella variante specializzata (quickening);
+        self.program mantiene la forma generica usata dal motore legacy.
+        Ritorna l'indice della prima istruzione aggiunta.
+        """
+        # Rimuove la sentinella HALT del caricamento precedente
+        if self.program and self.program[-1][0] == 'HALT':
+            self.program.pop(); self.code.pop()
+        start = len(self.program)
+        self.structs.update(struct_defs)
+        for name, fields in struct_defs.items():
+            self.struct_classes[name] = make_struct_class(name, fields)
+        ops = list(program_code) + [('HALT', None)]
+
+        # Primo passaggio: indirizzo di ogni label nel codice senza no-op
+        addr = start
+        for op in ops:
+            if op[0] == 'LABEL': self.labels[op[1]] = addr
+            elif op[0] not in LINK_NOOPS: addr += 1
+
+        # Secondo passaggio: costanti, risoluzione dei salti, codifica
+        for op in ops:
+            name, arg = op[0], op[1]
+            if name in LINK_NOOPS: continue
+            if name == 'PUSH':
+                arg = self.add_constant(self.decode_literal(arg))
+            elif name in JUMP_OPCODES:
+                if arg not in self.labels:
+                    raise AscensionException(f"Label non definita: '{arg}'", "LinkerError")
+                arg = self.labels[arg]
+            elif name == 'LOAD_LOAD_OP':
+                arg = (arg[0], arg[1], OP[arg[2]])
+            elif name == 'MEMO_ENTER':
+                # Funzione (ri)definita: i risultati memorizzati non valgono più
+                self.memo_caches.pop(arg[2], None)
+            elif name in ('CALL', 'TAIL_CALL'):
+                if arg in self.labels: arg = self.labels[arg]
+                else:
+                    # Funzione non (ancora) definita: risolta in ritardo
+                    name += '_NAME'
+                    self.unresolved_calls.append(len(self.code))
+            if name not in OP:
+                raise AscensionException(f"Opcode sconosciuto: '{name}'", "LinkerError")
+            self.program.append((name, arg))
+            if name in ADAPTIVE_OPCODES: arg = len(self.code)
+            self.code.append((OP[name], arg))
+
+        # Le chiamate rimaste in sospeso possono ora trovare la loro funzione
+        pending = []
+        for idx in self.unresolved_calls:
+            func_name = self.program[idx][1]
+            if func_name in self.labels: self._patch_call(idx, self.labels[func_name])
+            else: pending.append(idx)
+        self.unresolved_calls = pending
+        return start
+
+    def _patch_call(self, idx, target):
+        """Trasforma un (TAIL_)CALL_NAME in una chiamata diretta a target."""
+        name = 'TAIL_CALL' if self.program[idx][0] == 'TAIL_CALL_NAME' else 'CALL'
+        self.program[idx] = (name, target)
+        self.code[idx] = (OP[name], target)
 
     def run(self):
         """
         Esegue il programma caricato.
         Loop principale che processa ogni opcode fino alla fine.
+        Il motore di dispatch si sceglie con engine='fast' (default) o 'legacy'.
         """
-        while self.ip < len(self.program):
-            opcode = self.program[self.ip]
-            op = opcode[0]
+        self._execute()
 
+    def _execute(self, try_base=0):
+        """
+        Esegue da self.ip fino a HALT. È rientrante: i callback Tk lo
+        richiamano mentre il loop principale è sospeso in un handler.
+        Solo i blocchi try aperti sopra try_base possono catturare le
+        eccezioni di questa esecuzione.
+        Ritorna False se l'esecuzione si è interrotta per un errore.
+        """
+        loop = self._run_legacy if self.engine == 'legacy' else self._run_fast
+        while True:
             try:
-                # ----- OPERAZIONI SULLO STACK -----
-                if op == 'PUSH':
-                    val = opcode[1]
-                    if isinstance(val, str):
-                        if val.startswith('"'):
-                            val = val[1:-1]
-                            # Processa escape sequences
-                            val = val.replace('\\n', '\n')
-                            val = val.replace('\\t', '\t')
-                            val = val.replace('\\r', '\r')
-                            val = val.replace('\\"', '"')
-                            val = val.replace('\\\\', '\\')
-                        elif val.replace('.','',1).lstrip('-').isdigit():
-                            val = float(val) if '.' in val else int(val)
-                    self.stack.append(val)
-
-                elif op == 'POP':
-                    if self.stack: self.stack.pop()
-
-                elif op == 'DUP':
-                    if self.stack: self.stack.append(self.stack[-1])
-
-                elif op == 'PUSH_DICT':
-                    self.stack.append({})
-
-                elif op == 'PUSH_NULL':
-                    # NULL come valore speciale per indicare assenza/errore
-                    self.stack.append(None)
-
-                elif op == 'DICT_SET':
-                    key = self.stack.pop()
-                    val = self.stack.pop()
-                    d = self.stack[-1]
-                    if isinstance(key, str) and key.startswith('"') and key.endswith('"'):
-                        key = key[1:-1]
-                    if isinstance(d, dict):
-                        d[key] = val
-
-                # ----- OPERAZIONI SU VARIABILI -----
-                elif op == 'LOAD':
-                    var_name = opcode[1]
-                    self.stack.append(self.get_var(var_name))
-
-                elif op == 'STORE':
-                    var_name = opcode[1]
-                    self.set_var(var_name, self.stack.pop())
-
-                elif op == 'STORE_GLOBAL':
-                    var_name = opcode[1]
-                    self.set_var(var_name, self.stack.pop(), force_global=True)
-
-                elif op == 'LOAD_GLOBAL':
-                    var_name = opcode[1]
-                    self.stack.append(self.global_memory.get(var_name, 0))
-
-                # ----- OPERAZIONI SU STRUCT -----
-                elif op == 'NEW_STRUCT':
-                    name = opcode[1]
-                    inst = {'__type__': name}
-                    for f in self.structs.get(name, []): inst[f] = 0
-                    self.stack.append(inst)
-
-                elif op == 'GET_ATTR':
-                    field = opcode[1]; obj = self.stack.pop()
-                    self.stack.append(obj.get(field, 0) if isinstance(obj, dict) else 0)
-
-                elif op == 'SET_ATTR':
-                    field = opcode[1]; obj = self.stack.pop(); val = self.stack.pop()
-                    if isinstance(obj, dict): obj[field] = val
-
-                # ----- OPERAZIONI SU ARRAY -----
-                elif op == 'STORE_IDX':
-                    idx = self.stack.pop(); name = opcode[1]; val = self.stack.pop()
-                    arr_ref = None
-                    # Prima cerca nel frame locale corrente
-                    if name in self.local_frames[-1]:
-                        arr_ref = self.local_frames[-1]
-                    # Poi cerca in global_memory
-                    elif name in self.global_memory:
-                        arr_ref = self.global_memory
-                    else:
-                        # Se siamo nel main (un solo frame), crea in global_memory
-                        # Altrimenti crea nel frame locale
-                        if len(self.local_frames) == 1:
-                            arr_ref = self.global_memory
-                        else:
-                            arr_ref = self.local_frames[-1]
-                        arr_ref[name] = {}
-
-                    arr = arr_ref.get(name)
-                    if not isinstance(arr, dict):
-                        arr_ref[name] = {}
-                        arr = arr_ref[name]
-                    arr[idx] = val
-
-                elif op == 'LOAD_IDX':
-                    idx = self.stack.pop(); name = opcode[1]
-                    arr = self.get_var(name)
-                    if isinstance(arr, str):
-                        try:
-                            idx = int(idx)
-                            if 0 <= idx < len(arr): self.stack.append(arr[idx])
-                            else: self.stack.append("")
-                        except: self.stack.append("")
-                    elif isinstance(arr, dict):
-                        self.stack.append(arr.get(idx, 0))
-                    else:
-                        self.stack.append(0)
-
-                # ----- OPERAZIONI SU ARRAY MULTIDIMENSIONALI (v12.3) -----
-                elif op == 'LOAD_IDX_2D':
-                    # Stack: [col, row] -> pop col, pop row
-                    col = self.stack.pop()
-                    row = self.stack.pop()
-                    name = opcode[1]
-                    arr = self.get_var(name)
-                    if isinstance(arr, dict):
-                        # Array 2D memorizzato come dict con chiavi "row,col"
-                        key = f"{int(row)},{int(col)}"
-                        self.stack.append(arr.get(key, 0))
-                    else:
-                        self.stack.append(0)
-
-                elif op == 'STORE_IDX_2D':
-                    # Stack: [value, col, row] -> pop col, pop row, pop value
-                    col = self.stack.pop()
-                    row = self.stack.pop()
-                    val = self.stack.pop()
-                    name = opcode[1]
-                    # Trova o crea l'array
-                    arr_ref = None
-                    if name in self.local_frames[-1]:
-                        arr_ref = self.local_frames[-1]
-                    elif name in self.global_memory:
-                        arr_ref = self.global_memory
-                    else:
-                        if len(self.local_frames) == 1:
-                            arr_ref = self.global_memory
-                        else:
-                            arr_ref = self.local_frames[-1]
-                        arr_ref[name] = {'__matrix__': True, '__rows__': 0, '__cols__': 0}
-                    
-                    arr = arr_ref.get(name)
-                    if not isinstance(arr, dict):
-                        arr_ref[name] = {'__matrix__': True, '__rows__': 0, '__cols__': 0}
-                        arr = arr_ref[name]
-                    
-                    key = f"{int(row)},{int(col)}"
-                    arr[key] = val
-                    # Aggiorna dimensioni se necessario
-                    r, c = int(row), int(col)
-                    if arr.get('__rows__', 0) <= r:
-                        arr['__rows__'] = r + 1
-                    if arr.get('__cols__', 0) <= c:
-                        arr['__cols__'] = c + 1
-
-                elif op == 'CREATE_MATRIX':
-                    # Crea una matrice rows x cols inizializzata con un valore
-                    init_val = self.stack.pop()
-                    cols = int(self.stack.pop())
-                    rows = int(self.stack.pop())
-                    matrix = {'__matrix__': True, '__rows__': rows, '__cols__': cols}
-                    for r in range(rows):
-                        for c in range(cols):
-                            matrix[f"{r},{c}"] = init_val
-                    self.stack.append(matrix)
-
-                elif op == 'MATRIX_ROWS':
-                    # Ritorna il numero di righe della matrice
-                    arr = self.stack.pop()
-                    if isinstance(arr, dict) and arr.get('__matrix__'):
-                        self.stack.append(arr.get('__rows__', 0))
-                    else:
-                        # Per array 1D, ritorna il numero di elementi
-                        self.stack.append(len([k for k in arr if not str(k).startswith('__')]) if isinstance(arr, dict) else 0)
-
-                elif op == 'MATRIX_COLS':
-                    # Ritorna il numero di colonne della matrice
-                    arr = self.stack.pop()
-                    if isinstance(arr, dict) and arr.get('__matrix__'):
-                        self.stack.append(arr.get('__cols__', 0))
-                    else:
-                        # Per array 1D, ritorna 1
-                        self.stack.append(1 if isinstance(arr, dict) else 0)
-
-                elif op == 'MATRIX_DIM':
-                    # Ritorna la dimensionalità (1 o 2)
-                    arr = self.stack.pop()
-                    if isinstance(arr, dict):
-                        if arr.get('__matrix__'):
-                            self.stack.append(2)
-                        else:
-                            self.stack.append(1)
-                    else:
-                        self.stack.append(0)
-
-                # ----- CHIAMATE A FUNZIONE -----
-                elif op == 'CALL':
-                    if opcode[1] not in self.labels:
-                        raise AscensionException(f"Funzione non definita: '{opcode[1]}'", "LinkerError")
-                    self.call_stack.append((self.ip + 1, len(self.local_frames)))
-                    self.local_frames.append({})
-                    self.ip = self.labels[opcode[1]]
-                    continue
+                loop()
 
-                elif op == 'RET':
-                    if self.call_stack:
-                        ret_ip, _ = self.call_stack.pop()
-                        self.local_frames.pop()
-                        self.ip = ret_ip
-                        continue
-                    else: break
-
-                elif op == 'RET_VAL':
-                    ret_val = self.stack.pop() if self.stack else 0
-                    if self.call_stack:
-                        ret_ip, _ = self.call_stack.pop()
-                        self.local_frames.pop()
-                        self.stack.append(ret_val)
-                        self.ip = ret_ip
-                        continue
-                    else:
-                        self.return_value = ret_val
-                        break
-
-                # ----- INPUT/OUTPUT E FUNZIONI BUILT-IN -----
-                elif op == 'READ':
-                    try: self.stack.append(input("INPUT > "))
-                    except EOFError: self.stack.append("")
-
-                elif op == 'LEN':
-                    target = self.stack.pop()
-                    length = 0
-                    if isinstance(target, str): length = len(target)
-                    elif isinstance(target, dict): length = len([k for k in target if k != '__type__'])
-                    self.stack.append(length)
-
-                elif op == 'KEYS':
-                    container = self.stack.pop()
-                    if not isinstance(container, dict): self.stack.append({})
-                    else:
-                        keys_list = [k for k in container if k != '__type__']
-                        try: keys_list.sort()
-                        except: keys_list.sort(key=str)
-                        result_array = {i: key for i, key in enumerate(keys_list)}
-                        self.stack.append(result_array)
-
-                elif op == 'TO_INT':
-                    val = self.stack.pop()
-                    try:
-                        if isinstance(val, str):
-                            if val.lstrip('-').replace('.','',1).isdigit(): self.stack.append(int(float(val)))
-                            elif len(val) == 1: self.stack.append(ord(val))
-                            else: raise ValueError
-                        else: self.stack.append(int(float(val)))
-                    except: raise AscensionException(f"Impossibile convertire '{val}' in intero.", "ConversionError")
-
-                elif op == 'TO_FLOAT':
-                    val = self.stack.pop()
-                    try: self.stack.append(float(val))
-                    except: raise AscensionException(f"Impossibile convertire '{val}' in float.", "ConversionError")
-
-                elif op == 'SUBSTR':
-                    # substr(string, start, length) - estrae sottostringa
-                    length = int(self.stack.pop())
-                    start = int(self.stack.pop())
-                    string = self.stack.pop()
-                    if isinstance(string, str):
-                        if start < 0: start = 0
-                        if start >= len(string):
-                            self.stack.append("")
-                        else:
-                            end = start + length
-                            if end > len(string): end = len(string)
-                            self.stack.append(string[start:end])
-                    else:
-                        self.stack.append("")
-
-                elif op == 'CHR':
-                    # chr(code) - converte codice ASCII in carattere
-                    code = int(self.stack.pop())
-                    try:
-                        if 0 <= code <= 127:
-                            self.stack.append(chr(code))
-                        else:
-                            self.stack.append("")
-                    except:
-                        self.stack.append("")
-
-                # ----- SYSTEM COMMANDS (v12.4) -----
-                elif op == 'SYSTEM':
-                    # Esegue comando shell, ritorna exit code
-                    cmd = self.stack.pop()
-                    if isinstance(cmd, str) and cmd.startswith('"') and cmd.endswith('"'):
-                        cmd = cmd[1:-1]
-                    try:
-                        result = subprocess.run(cmd, shell=True)
-                        self.stack.append(result.returncode)
-                    except Exception as e:
-                        self.stack.append(-1)
-
-                elif op == 'EXEC':
-                    # Esegue comando shell, ritorna output come stringa
-                    cmd = self.stack.pop()
-                    if isinstance(cmd, str) and cmd.startswith('"') and cmd.endswith('"'):
-                        cmd = cmd[1:-1]
-                    try:
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                        self.stack.append(result.stdout)
-                    except Exception as e:
-                        self.stack.append("")
-
-                # ----- FILE I/O -----
-                elif op == 'FILE_OPEN':
-                    mode = self.stack.pop(); filename = self.stack.pop()
-                    try:
-                        f = open(filename, mode); hid = id(f); self.file_handles[hid] = f; self.stack.append(hid)
-                    except: self.stack.append(None)  # NULL se fallisce
-
-                elif op == 'FILE_WRITE':
-                    content = self.stack.pop(); hid = self.stack.pop()
-                    if hid is not None and hid in self.file_handles:
-                        try: self.file_handles[hid].write(str(content)); self.file_handles[hid].flush(); self.stack.append(1)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'FILE_READLINE':
-                    hid = self.stack.pop()
-                    if hid is not None and hid in self.file_handles:
-                        try: self.stack.append(self.file_handles[hid].readline())
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'FILE_READALL':
-                    hid = self.stack.pop()
-                    if hid is not None and hid in self.file_handles:
-                        try: self.stack.append(self.file_handles[hid].read())
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'FILE_CLOSE':
-                    hid = self.stack.pop()
-                    if hid is not None and hid in self.file_handles:
-                        try: self.file_handles.pop(hid).close(); self.stack.append(1)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                # ----- CURSES (TUI) -----
-                elif op == 'CURSES_INIT':
-                    try:
-                        if curses is None: raise ImportError
-                        self.current_screen = curses.initscr()
-                        curses.noecho(); curses.cbreak(); self.current_screen.keypad(True); self.stack.append(1)
-                    except: self.stack.append(0)
-                elif op == 'CURSES_END':
-                    if self.current_screen:
-                        try: curses.nocbreak(); curses.echo(); curses.endwin(); self.current_screen = None; self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-                elif op == 'CURSES_CLEAR':
-                    if self.current_screen: self.current_screen.clear(); self.stack.append(1)
-                    else: self.stack.append(0)
-                elif op == 'CURSES_REFRESH':
-                    if self.current_screen: self.current_screen.refresh(); self.stack.append(1)
-                    else: self.stack.append(0)
-                elif op == 'CURSES_MOVE':
-                    x = int(self.stack.pop()); y = int(self.stack.pop())
-                    if self.current_screen: self.current_screen.move(y, x); self.stack.append(1)
-                    else: self.stack.append(0)
-                elif op == 'CURSES_WRITE':
-                    s = str(self.stack.pop())
-                    if self.current_screen: self.current_screen.addstr(s); self.stack.append(1)
-                    else: self.stack.append(0)
-                elif op == 'CURSES_READ_KEY':
-                    if self.current_screen:
-                        try: self.stack.append(self.current_screen.getch())
-                        except: self.stack.append(-1)
-                    else: self.stack.append(-1)
-
-                # --- NETWORK (HTTP) ---
-                elif op == 'HTTP_GET':
-                    url = str(self.stack.pop())
-                    if requests:
-                        try:
-                            r = requests.get(url, timeout=10)
-                            self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
-                        except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
-                    else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
-
-                elif op == 'HTTP_POST':
-                    data = self.stack.pop(); url = str(self.stack.pop())
-                    payload = {k:v for k,v in data.items() if k!='__type__'} if isinstance(data, dict) else str(data)
-                    if requests:
-                        try:
-                            r = requests.post(url, data=payload, timeout=10)
-                            self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
-                        except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
-                    else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
-
-                elif op == 'RESP_STATUS':
-                    r = self.stack.pop(); self.stack.append(r.get('status', 0) if isinstance(r, dict) else 0)
-                elif op == 'RESP_BODY':
-                    r = self.stack.pop(); self.stack.append(r.get('body', "") if isinstance(r, dict) else "")
-
-                # --- TKINTER GUI (v11.0) ---
-                elif op == 'TK_ROOT':
-                    if tk is None: raise AscensionException("Tkinter missing")
-                    title = self.stack.pop()
-                    if not self.tk_root:
-                        self.tk_root = tk.Tk(); self.tk_root.title(str(title))
-                        self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = self.tk_root
-                        self.stack.append(self.tk_ref_counter)
-                    else: self.stack.append(1)
-
-                elif op == 'TK_WIDGET':
-                    config = self.stack.pop(); w_type = self.stack.pop(); parent_id = self.stack.pop()
-                    if not isinstance(config, dict): config = {}
-                    clean_conf = {k:v for k,v in config.items() if k!='__type__'}
-                    if 'command' in clean_conf: del clean_conf['command']
-                    # Converti parent_id a int se è float
-                    if isinstance(parent_id, float):
-                        parent_id = int(parent_id)
-                    if parent_id in self.tk_refs:
-                        try:
-                            cls = getattr(tk, str(w_type))
-                            w = cls(self.tk_refs[parent_id], **clean_conf)
-                            self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = w
-                            self.stack.append(self.tk_ref_counter)
-                        except Exception as e:
-                            self.stack.append(0)
-                    else:
-                        self.stack.append(0)
-
-                elif op == 'TK_PACK':
-                    config = self.stack.pop(); wid = self.stack.pop()
-                    clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-                    if wid in self.tk_refs: self.tk_refs[wid].pack(**clean_conf); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_GRID':
-                    config = self.stack.pop(); wid = self.stack.pop()
-                    clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-                    if wid in self.tk_refs: self.tk_refs[wid].grid(**clean_conf); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CONFIG':
-                    config = self.stack.pop(); wid = self.stack.pop()
-                    clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-                    if wid in self.tk_refs: self.tk_refs[wid].config(**clean_conf); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_GET':
-                    wid = self.stack.pop()
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].get())
-                        except: self.stack.append("")
-                    else: self.stack.append("")
-
-                elif op == 'TK_MSGBOX':
-                    msg = self.stack.pop(); title = self.stack.pop()
-                    if tk: messagebox.showinfo(str(title), str(msg)); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_MAINLOOP':
-                    if self.tk_root:
-                        try: self.tk_root.mainloop(); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                # --- TKINTER EXTENDED (v11.2) ---
-                elif op == 'TK_COMMAND':
-                    func_name = str(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        callback = self._make_tk_callback(func_name)
-                        self.tk_refs[wid].config(command=callback)
-                        self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_BIND':
-                    func_name = str(self.stack.pop())
-                    event = str(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        callback = self._make_tk_event_callback(func_name)
-                        self.tk_refs[wid].bind(event, callback)
-                        self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_AFTER':
-                    func_name = str(self.stack.pop())
-                    ms = int(self.stack.pop())
-                    if self.tk_root:
-                        callback = self._make_tk_callback(func_name)
-                        after_id = self.tk_root.after(ms, callback)
-                        self.tk_after_counter += 1
-                        self.tk_after_ids[self.tk_after_counter] = after_id
-                        self.stack.append(self.tk_after_counter)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_AFTER_CANCEL':
-                    aid = int(self.stack.pop())
-                    if aid in self.tk_after_ids and self.tk_root:
-                        self.tk_root.after_cancel(self.tk_after_ids[aid])
-                        del self.tk_after_ids[aid]
-                        self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_UPDATE':
-                    if self.tk_root:
-                        self.tk_root.update()
-                        self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_DESTROY':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try:
-                            self.tk_refs[wid].destroy()
-                            del self.tk_refs[wid]
-                            self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_SET':
-                    value = str(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        w = self.tk_refs[wid]
-                        try:
-                            if isinstance(w, tk.Entry):
-                                w.delete(0, tk.END); w.insert(0, value)
-                            elif isinstance(w, tk.Text):
-                                w.delete('1.0', tk.END); w.insert('1.0', value)
-                            self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CLEAR':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        w = self.tk_refs[wid]
-                        try:
-                            if isinstance(w, tk.Entry): w.delete(0, tk.END)
-                            elif isinstance(w, tk.Text): w.delete('1.0', tk.END)
-                            elif isinstance(w, tk.Listbox): w.delete(0, tk.END)
-                            self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_FOCUS':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        self.tk_refs[wid].focus_set()
-                        self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_GEOMETRY':
-                    geom = str(self.stack.pop())
-                    if self.tk_root:
-                        self.tk_root.geometry(geom); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_TITLE':
-                    title = str(self.stack.pop())
-                    if self.tk_root:
-                        self.tk_root.title(title); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_RESIZABLE':
-                    h = int(self.stack.pop()); w = int(self.stack.pop())
-                    if self.tk_root:
-                        self.tk_root.resizable(w, h); self.stack.append(1)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_TEXT_GET':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].get('1.0', tk.END).rstrip('\n'))
-                        except: self.stack.append("")
-                    else: self.stack.append("")
-
-                elif op == 'TK_TEXT_INSERT':
-                    text = str(self.stack.pop())
-                    pos = str(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.tk_refs[wid].insert(pos, text); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_LISTBOX_ADD':
-                    item = str(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.tk_refs[wid].insert(tk.END, item); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_LISTBOX_GET':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try:
-                            sel = self.tk_refs[wid].curselection()
-                            self.stack.append(self.tk_refs[wid].get(sel[0]) if sel else "")
-                        except: self.stack.append("")
-                    else: self.stack.append("")
-
-                elif op == 'TK_LISTBOX_INDEX':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try:
-                            sel = self.tk_refs[wid].curselection()
-                            self.stack.append(sel[0] if sel else -1)
-                        except: self.stack.append(-1)
-                    else: self.stack.append(-1)
-
-                elif op == 'TK_FILEDIALOG_OPEN':
-                    title = str(self.stack.pop())
-                    if filedialog:
-                        path = filedialog.askopenfilename(title=title)
-                        self.stack.append(path if path else "")
-                    else: self.stack.append("")
-
-                elif op == 'TK_FILEDIALOG_SAVE':
-                    title = str(self.stack.pop())
-                    if filedialog:
-                        path = filedialog.asksaveasfilename(title=title)
-                        self.stack.append(path if path else "")
-                    else: self.stack.append("")
-
-                elif op == 'TK_ASKSTRING':
-                    prompt = str(self.stack.pop())
-                    title = str(self.stack.pop())
-                    if simpledialog:
-                        result = simpledialog.askstring(title, prompt)
-                        self.stack.append(result if result else "")
-                    else: self.stack.append("")
-
-                elif op == 'TK_ASKYESNO':
-                    msg = str(self.stack.pop())
-                    title = str(self.stack.pop())
-                    if messagebox:
-                        result = messagebox.askyesno(title, msg)
-                        self.stack.append(1 if result else 0)
-                    else: self.stack.append(0)
-
-                # --- CANVAS (v11.2) ---
-                elif op == 'TK_CANVAS_LINE':
-                    color = str(self.stack.pop())
-                    y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-                    y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].create_line(x1,y1,x2,y2,fill=color))
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_RECT':
-                    color = str(self.stack.pop())
-                    y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-                    y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].create_rectangle(x1,y1,x2,y2,fill=color))
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_OVAL':
-                    color = str(self.stack.pop())
-                    y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-                    y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].create_oval(x1,y1,x2,y2,fill=color))
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_TEXT':
-                    color = str(self.stack.pop())
-                    text = str(self.stack.pop())
-                    y = int(self.stack.pop()); x = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.stack.append(self.tk_refs[wid].create_text(x,y,text=text,fill=color))
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_CLEAR':
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.tk_refs[wid].delete("all"); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_DELETE':
-                    item_id = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.tk_refs[wid].delete(item_id); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                elif op == 'TK_CANVAS_MOVE':
-                    dy = int(self.stack.pop()); dx = int(self.stack.pop())
-                    item_id = int(self.stack.pop())
-                    wid = int(self.stack.pop())
-                    if wid in self.tk_refs:
-                        try: self.tk_refs[wid].move(item_id, dx, dy); self.stack.append(1)
-                        except: self.stack.append(0)
-                    else: self.stack.append(0)
-
-                # --- NEW: DNS Resolution (GET_IP) v11.1 ---
-                elif op == 'GET_IP':
-                    hostname = str(self.stack.pop())
-                    try:
-                        ip_addr = socket.gethostbyname(hostname)
-                        self.stack.append(ip_addr)
-                    except:
-                        # Restituisce stringa vuota in caso di errore di risoluzione
-                        self.stack.append("")
-
-                # --- SOCKETS (TCP/IP) v11.0 ---
-                elif op == 'SOCKET_OPEN':
-                    proto = str(self.stack.pop()); sock_type = str(self.stack.pop())
-                    try:
-                        family = socket.AF_INET
-                        type_map = {"TCP": socket.SOCK_STREAM, "UDP": socket.SOCK_DGRAM}
-                        if sock_type not in type_map: raise ValueError("Invalid socket type")
-
-                        s = socket.socket(family, type_map[sock_type])
-                        self.socket_id_counter += 1
-                        hid = self.socket_id_counter
-                        self.socket_handles[hid] = s
-                        self.stack.append(hid)
-                    except Exception as e:
-                        self.stack.append(None)  # NULL se fallisce
-
-                elif op == 'SOCKET_BIND':
-                    port = int(self.stack.pop()); ip = str(self.stack.pop()); sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            self.socket_handles[sid].bind((ip, port))
-                            self.stack.append(1)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_LISTEN':
-                    backlog = int(self.stack.pop()); sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            self.socket_handles[sid].listen(backlog)
-                            self.stack.append(1)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_ACCEPT':
-                    sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            conn, addr = self.socket_handles[int(sid)].accept()
-                            self.socket_id_counter += 1
-                            new_sid = self.socket_id_counter
-                            self.socket_handles[new_sid] = conn
-                            self.stack.append(new_sid)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_CONNECT':
-                    port = int(self.stack.pop()); ip = str(self.stack.pop()); sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            # Aggiungiamo un timeout per evitare che socket_connect blocchi il VM indefinitamente
-                            self.socket_handles[int(sid)].settimeout(5)
-                            self.socket_handles[int(sid)].connect((ip, port))
-                            self.stack.append(1)
-                        except:
-                            self.stack.append(None)
-                        finally:
-                             # Resetta il timeout per il socket
-                             if sid in self.socket_handles: self.socket_handles[int(sid)].settimeout(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_SEND':
-                    data = str(self.stack.pop()); sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            sent = self.socket_handles[int(sid)].send(data.encode('utf-8'))
-                            self.stack.append(sent)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_RECV':
-                    max_b = int(self.stack.pop()); sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            data = self.socket_handles[int(sid)].recv(max_b)
-                            self.stack.append(data.decode('utf-8'))
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-                elif op == 'SOCKET_CLOSE':
-                    sid = self.stack.pop()
-                    if sid is not None and sid in self.socket_handles:
-                        try:
-                            self.socket_handles.pop(int(sid)).close()
-                            self.stack.append(1)
-                        except: self.stack.append(None)
-                    else: self.stack.append(None)
-
-
-                # --- TRY / CATCH ---
-                elif op == 'TRY_START':
-                    catch_label = opcode[1]
-                    self.try_stack.append((catch_label, len(self.local_frames), len(self.call_stack)))
-                elif op == 'TRY_END':
-                    if self.try_stack: self.try_stack.pop()
-                    end_label = opcode[1]; self.ip = self.labels[end_label]; continue
-                elif op == 'THROW':
-                    msg = self.stack.pop() if self.stack else "Unknown error"
-                    raise AscensionException(str(msg))
-                elif op == 'CATCH_START': pass
-                elif op == 'CATCH_END': pass
-
-                # --- MATH ---
-                elif op in ['ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'GT', 'LT', 'EQ', 'NEQ', 'GTE', 'LTE', 'AND', 'OR']:
-                    b = self.stack.pop(); a = self.stack.pop()
-                    # Gestione NULL nei confronti
-                    if op == 'EQ': 
-                        self.stack.append(1 if a == b else 0)
-                    elif op == 'NEQ': 
-                        self.stack.append(1 if a != b else 0)
-                    elif op == 'AND': 
-                        # NULL è considerato falsy
-                        self.stack.append(1 if a and b else 0)
-                    elif op == 'OR': 
-                        self.stack.append(1 if a or b else 0)
-                    elif a is None or b is None:
-                        # Operazioni matematiche con NULL danno NULL
-                        self.stack.append(None)
-                    elif op == 'ADD' and (isinstance(a, str) or isinstance(b, str)): 
-                        self.stack.append(str(a) + str(b))
-                    else:
-                        try: a = float(a); b = float(b)
-                        except: raise AscensionException(f"Op illegale: {a} {op} {b}", "TypeError")
-                        if op == 'ADD': r = a + b
-                        elif op == 'SUB': r = a - b
-                        elif op == 'MUL': r = a * b
-                        elif op == 'DIV':
-                            if b==0: raise AscensionException("DivZero")
-                            r = a / b
-                        elif op == 'MOD': r = a % b
-                        elif op == 'GT': r = 1 if a > b else 0
-                        elif op == 'LT': r = 1 if a < b else 0
-                        elif op == 'GTE': r = 1 if a >= b else 0
-                        elif op == 'LTE': r = 1 if a <= b else 0
-                        if isinstance(r, float) and r.is_integer(): r = int(r)
-                        self.stack.append(r)
-
-                elif op == 'NOT': 
-                    val = self.stack.pop()
-                    # NULL è considerato falsy, quindi !NULL = 1
-                    self.stack.append(1 if not val else 0)
-
-                # ----- FUNZIONI MATEMATICHE (v12.7) -----
-                elif op == 'RANDOM':
-                    # Nessun argomento: float tra 0.0 e 1.0
-                    self.stack.append(py_random.random())
-                
-                elif op == 'RANDOM_MAX':
-                    # Un argomento: int tra 0 e max-1
-                    max_val = int(self.stack.pop())
-                    self.stack.append(py_random.randint(0, max_val - 1))
-                
-                elif op == 'RANDOM_RANGE':
-                    # Due argomenti: int tra min e max-1
-                    max_val = int(self.stack.pop())
-                    min_val = int(self.stack.pop())
-                    self.stack.append(py_random.randint(min_val, max_val - 1))
-                
-                elif op == 'SQRT':
-                    val = float(self.stack.pop())
-                    if val < 0:
-                        raise AscensionException("sqrt di numero negativo", "MathError")
-                    self.stack.append(math.sqrt(val))
-                
-                elif op == 'POW':
-                    exp = float(self.stack.pop())
-                    base = float(self.stack.pop())
-                    self.stack.append(math.pow(base, exp))
-                
-                elif op == 'EXP':
-                    val = float(self.stack.pop())
-                    self.stack.append(math.exp(val))
-                
-                elif op == 'LOG':
-                    val = float(self.stack.pop())
-                    if val <= 0:
-                        raise AscensionException("log di numero non positivo", "MathError")
-                    self.stack.append(math.log(val))
-                
-                elif op == 'ABS':
-                    val = self.stack.pop()
-                    if isinstance(val, (int, float)):
-                        self.stack.append(abs(val))
-                    else:
-                        self.stack.append(abs(float(val)))
-                
-                elif op == 'FLOOR':
-                    val = float(self.stack.pop())
-                    self.stack.append(int(math.floor(val)))
-                
-                elif op == 'CEIL':
-                    val = float(self.stack.pop())
-                    self.stack.append(int(math.ceil(val)))
-                
-                elif op == 'SIN':
-                    val = float(self.stack.pop())
-                    self.stack.append(math.sin(val))
-                
-                elif op == 'COS':
-                    val = float(self.stack.pop())
-                    self.stack.append(math.cos(val))
-                
-                elif op == 'TAN':
-                    val = float(self.stack.pop())
-                    self.stack.append(math.tan(val))
-                
-                elif op == 'ASIN':
-                    val = float(self.stack.pop())
-                    if val < -1 or val > 1:
-                        raise AscensionException("asin fuori range [-1, 1]", "MathError")
-                    self.stack.append(math.asin(val))
-                
-                elif op == 'ACOS':
-                    val = float(self.stack.pop())
-                    if val < -1 or val > 1:
-                        raise AscensionException("acos fuori range [-1, 1]", "MathError")
-                    self.stack.append(math.acos(val))
-                
-                elif op == 'ATAN':
-                    val = float(self.stack.pop())
-                    self.stack.append(math.atan(val))
-                
-                elif op == 'ATAN2':
-                    x = float(self.stack.pop())
-                    y = float(self.stack.pop())
-                    self.stack.append(math.atan2(y, x))
-
-                # ----- CONTROLLO DI FLUSSO -----
-                elif op == 'JMP': self.ip = self.labels[opcode[1]]; continue
-                elif op == 'JZ':
-                    val = self.stack.pop()
-                    # NULL è considerato come 0 (falsy) per i salti condizionali
-                    if val == 0 or val is None: self.ip = self.labels[opcode[1]]; continue
-                elif op == 'JNZ':
-                    val = self.stack.pop()
-                    if val != 0 and val is not None: self.ip = self.labels[opcode[1]]; continue
-                elif op == 'PRINT':
-                    count = opcode[1]; args = []
-                    for _ in range(count):
-                        val = self.stack.pop()
-                        if val is None:
-                            args.append("NULL")
-                        elif isinstance(val, float) and val.is_integer(): 
-                            args.append(str(int(val)))
-                        else:
-                            args.append(str(val))
-                    print("OUTPUT > " + " ".join(reversed(args)))
-                elif op == 'LABEL': pass
-
-                self.ip += 1
+            except VMHalt:
+                return True
 
             except AscensionException as e:
-                handled = False
-                while self.try_stack:
-                    catch_label, frame_depth, call_depth = self.try_stack.pop()
+                if len(self.try_stack) > try_base:
+                    catch_ip, frame_depth, call_depth = self.try_stack.pop()
                     while len(self.local_frames) > frame_depth: self.local_frames.pop()
                     while len(self.call_stack) > call_depth: self.call_stack.pop()
                     self.stack.append(e.message)
-                    self.ip = self.labels[catch_label]
-                    handled = True; break
-                if not handled:
-                    print(f"Uncaught Ex @ IP {self.ip}: {e.message}")
-                    if self.current_screen: curses.nocbreak(); curses.echo(); curses.endwin()
-                    break
+                    self.ip = catch_ip
+                    continue
+                print(f"Uncaught Ex @ IP {self.ip - 1}: {e.message}")
+                if self.current_screen: curses.nocbreak(); curses.echo(); curses.endwin()
+                return False
 
             except Exception as e:
-                print(f"Runtime Error @ IP {self.ip}: {e}")
+                print(f"Runtime Error @ IP {self.ip - 1}: {e}")
                 if self.current_screen: curses.nocbreak(); curses.echo(); curses.endwin()
-                break
-
-    # --- CALLBACK HELPERS (v11.2) ---
-    def _make_tk_callback(self, func_name):
-        """Crea closure per callback senza argomenti (bottoni, after)"""
-        vm = self
-        def callback():
-            vm._call_ascension_func(func_name, [])
-        return callback
+                return False
 
-    def _make_tk_event_callback(self, func_name):
-        """Crea closure per callback con evento (bind)"""
-        vm = self
-        def callback(event):
-            event_dict = {
-                '__type__': 'EVENT',
-                'x': getattr(event, 'x', 0),
-                'y': getattr(event, 'y', 0),
-                'key': getattr(event, 'keysym', ''),
-                'keycode': getattr(event, 'keycode', 0),
-                'char': getattr(event, 'char', ''),
-                'button': getattr(event, 'num', 0),
-            }
-            vm._call_ascension_func(func_name, [event_dict])
-        return callback
+    def _run_fast(self):
+        """
+        Dispatch tramite tabella: l'opcode intero indicizza direttamente
+        il suo handler. self.ip punta già all'istruzione successiva quando
+        l'handler viene eseguito, i salti lo sovrascrivono.
+        """
+        code = self.code
+        handlers = self.handlers
+        while True:
+            op, arg = code[self.ip]
+            self.ip += 1
+            handlers[op](arg)
+
+    def _run_legacy(self):
+        """
+        Dispatch storico per confronti A/B: il nome dell'opcode viene
+        confrontato con le stringhe una alla volta, nell'ordine della
+        vecchia catena if/elif. Gli handler sono gli stessi di _run_fast.
+        """
+        program = self.program
+        dispatch = legacy_dispatch
+        handlers = self.handlers
+        while True:
+            opcode = program[self.ip]
+            self.ip += 1
+            dispatch(handlers, opcode[0], opcode[1])
+
+    # =========================================================================
+    #                         HANDLER DEGLI OPCODE
+    # =========================================================================
+    # Ogni handler riceve l'argomento dell'istruzione. Il nome segue la
+    # convenzione _op_<opcode> ed è associato al codice intero in OPCODES.
+
+
+    # ----- OPERAZIONI SULLO STACK -----
+
+    def _op_push(self, arg):
+        # Costante già decodificata da load_program
+        self.stack.append(self.constants[arg])
+
+    def _op_pop(self, arg):
+        if self.stack: self.stack.pop()
+
+    def _op_dup(self, arg):
+        if self.stack: self.stack.append(self.stack[-1])
+
+    def _op_push_dict(self, arg):
+        self.stack.append({})
+
+    def _op_push_null(self, arg):
+        # NULL come valore speciale per indicare assenza/errore
+        self.stack.append(None)
+
+    def _op_dict_set(self, arg):
+        key = self.stack.pop()
+        val = self.stack.pop()
+        d = self.stack[-1]
+        if isinstance(d, dict):
+            d[key] = val
+
+    # ----- OPERAZIONI SU VARIABILI -----
+
+    def _op_load_fast(self, arg):
+        # arg = (slot, nome) risolto dal compilatore
+        val = self.local_frames[-1][arg[0]]
+        if val is UNSET: val = self.global_memory.get(arg[1], 0)
+        self.stack.append(val)
+
+    def _op_store_fast(self, arg):
+        frame = self.local_frames[-1]
+        if frame[arg[0]] is UNSET and arg[1] in self.global_memory:
+            self.global_memory[arg[1]] = self.stack.pop()
+        else:
+            frame[arg[0]] = self.stack.pop()
 
-    def _call_ascension_func(self, func_name, args):
-        """Chiama una funzione Ascension dal codice Python (callback)"""
-        if func_name not in self.labels:
-            print(f"Warning: Callback function '{func_name}' not defined")
-            return
+    def _op_store_global(self, arg):
+        var_name = arg
+        self.global_memory[var_name] = self.stack.pop()
 
-        # Pusha argomenti in ordine inverso
-        for arg in reversed(args):
-            self.stack.append(arg)
+    def _op_load_global(self, arg):
+        var_name = arg
+        self.stack.append(self.global_memory.get(var_name, 0))
 
-        # Setup call frame - usiamo un IP fittizio alto per indicare "ritorna a mainloop"
-        self.call_stack.append((-999, len(self.local_frames)))
-        self.local_frames.append({})
-        self.ip = self.labels[func_name]
+    # ----- OPERAZIONI SU STRUCT -----
 
-        # Esegui la funzione usando la stessa logica di run()
-        try:
-            while self.ip < len(self.program):
-                opcode = self.program[self.ip]
-                op = opcode[0]
-
-                # Gestiamo manualmente RET per uscire dal callback
-                if op == 'RET':
-                    if self.call_stack:
-                        ret_ip, _ = self.call_stack.pop()
-                        self.local_frames.pop()
-                        if ret_ip == -999:  # Era un callback, esci
-                            break
-                        self.ip = ret_ip
-                        continue
-                    else:
-                        break
-
-                if op == 'RET_VAL':
-                    ret_val = self.stack.pop() if self.stack else 0
-                    if self.call_stack:
-                        ret_ip, _ = self.call_stack.pop()
-                        self.local_frames.pop()
-                        if ret_ip == -999:  # Era un callback, esci
-                            break
-                        self.stack.append(ret_val)
-                        self.ip = ret_ip
-                        continue
-                    else:
-                        break
+    def _op_new_struct(self, arg):
+        name = arg
+        cls = self.struct_classes.get(name)
+        if cls is not None:
+            self.stack.append(cls())
+            return
+        # Struct non definita o con campi non validi come slot
+        inst = {'__type__': name}
+        for f in self.structs.get(name, []): inst[f] = 0
+        self.stack.append(inst)
+
+    def _op_get_attr(self, arg):
+        field = arg; obj = self.stack.pop()
+        if isinstance(obj, StructInstance):
+            # Accesso diretto allo slot; i campi aggiunti passano da struct_get
+            val = getattr(obj, field, UNSET)
+            self.stack.append(struct_get(obj, field) if val is UNSET else val)
+        elif isinstance(obj, AscArray):
+            self.stack.append(array_get(obj, field))
+        else:
+            self.stack.append(obj.get(field, 0) if isinstance(obj, dict) else 0)
 
-                # Esegui l'istruzione
-                self._exec_opcode(opcode)
-                self.ip += 1
+    def _op_set_attr(self, arg):
+        field = arg; obj = self.stack.pop(); val = self.stack.pop()
+        if isinstance(obj, StructInstance): struct_set(obj, field, val)
+        elif isinstance(obj, AscArray): array_set(obj, field, val)
+        elif isinstance(obj, dict): obj[field] = val
 
-        except Exception as e:
-            print(f"Error in callback '{func_name}': {e}")
-            import traceback
-            traceback.print_exc()
+    def _op_build_array(self, arg):
+        # [a, b, c]: gli elementi sono sullo stack nell'ordine del letterale
+        if arg:
+            items = self.stack[-arg:]
+            del self.stack[-arg:]
+        else: items = ()
+        self.stack.append(AscArray(items))
+
+    def _op_farray(self, arg):
+        self.stack.append(typed_array('d', self.stack.pop()))
+
+    def _op_iarray(self, arg):
+        self.stack.append(typed_array('q', self.stack.pop()))
+
+    def _op_aview(self, arg):
+        # aview(a, start, end): memoryview sugli stessi dati, nessuna copia
+        end = self.stack.pop(); start = self.stack.pop(); arr = self.stack.pop()
+        if not isinstance(arr, TYPED_ARRAYS):
+            raise AscensionException("aview richiede un farray o un iarray", "TypeError")
+        n = len(arr)
+        start = min(max(0, int(start)), n)
+        end = n if end is None else min(max(start, int(end)), n)
+        self.stack.append(memoryview(arr)[start:end])
+
+    def _op_afill(self, arg):
+        val = self.stack.pop(); arr = self.stack.pop()
+        if not isinstance(arr, TYPED_ARRAYS):
+            raise AscensionException("afill richiede un farray o un iarray", "TypeError")
+        typed_fill(arr, val)
+        self.stack.append(arr)
+
+    # ----- OPERAZIONI SU ARRAY -----
+
+    def _op_store_idx(self, arg):
+        idx = self.stack.pop(); val = self.stack.pop()
+        # Se la variabile non esiste (o non è un array) la crea dove
+        # verrebbe assegnata: globale nel main, locale nelle funzioni
+        arr = self.load_ref(arg)
+        if type(arr) is AscArray:
+            # Percorso veloce: scrittura o accodamento nella forma densa
+            if arr.sparse is None and type(idx) is int and 0 <= idx < len(arr): arr[idx] = val
+            else: array_set(arr, idx, val)
+        elif isinstance(arr, TYPED_ARRAYS):
+            typed_set(arr, idx, val)
+        elif type(arr) is Matrix:
+            r, c = matrix_key(idx)
+            matrix_set(arr, r, c, val)
+        elif isinstance(arr, dict):
+            arr[idx] = val
+        elif isinstance(arr, StructInstance):
+            struct_set(arr, idx, val)
+        else:
+            arr = AscArray()
+            self.store_ref(arg, arr)
+            array_set(arr, idx, val)
+
+    def _op_load_idx(self, arg):
+        idx = self.stack.pop()
+        arr = self.load_ref(arg)
+        if type(arr) is AscArray:
+            if arr.sparse is None and type(idx) is int and 0 <= idx < len(arr): self.stack.append(arr[idx])
+            else: self.stack.append(array_get(arr, idx))
+        elif isinstance(arr, TYPED_ARRAYS):
+            i = typed_index(arr, idx)
+            self.stack.append(arr[i] if i >= 0 else 0)
+        elif type(arr) is Matrix:
+            r, c = matrix_key(idx)
+            self.stack.append(arr.data[r * arr.cols + c] if 0 <= r < arr.rows and 0 <= c < arr.cols else 0)
+        elif isinstance(arr, str):
+            try:
+                idx = int(idx)
+                if 0 <= idx < len(arr): self.stack.append(arr[idx])
+                else: self.stack.append("")
+            except: self.stack.append("")
+        elif isinstance(arr, dict):
+            self.stack.append(arr.get(idx, 0))
+        elif isinstance(arr, StructInstance):
+            self.stack.append(struct_get(arr, idx))
+        else:
+            self.stack.append(0)
+
+    # ----- OPERAZIONI SU ARRAY MULTIDIMENSIONALI (v12.3) -----
+
+    def _op_load_idx_2d(self, arg):
+        # Stack: [col, row] -> pop col, pop row
+        col = self.stack.pop()
+        row = self.stack.pop()
+        arr = self.load_ref(arg)
+        if type(arr) is Matrix:
+            if type(row) is not int or type(col) is not int: row = int(row); col = int(col)
+            if 0 <= row < arr.rows and 0 <= col < arr.cols: self.stack.append(arr.data[row * arr.cols + col])
+            else: self.stack.append(0)
+            return
+        if isinstance(arr, AscArray):
+            # Array di array: a[i][j] indicizza la riga i
+            inner = array_get(arr, row)
+            if isinstance(inner, AscArray):
+                self.stack.append(array_get(inner, col)); return
+            arr = array_dict(arr)
+        if isinstance(arr, dict):
+            # Array 2D memorizzato come dict con chiavi "row,col"
+            key = f"{int(row)},{int(col)}"
+            self.stack.append(arr.get(key, 0))
+        else:
+            self.stack.append(0)
+
+    def _op_store_idx_2d(self, arg):
+        # Stack: [value, col, row] -> pop col, pop row, pop value
+        col = self.stack.pop()
+        row = self.stack.pop()
+        val = self.stack.pop()
+        # Trova o crea la matrice
+        arr = self.load_ref(arg)
+        if type(arr) is Matrix:
+            if (type(row) is int and type(col) is int and 0 <= row < arr.rows
+                    and 0 <= col < arr.cols): arr.data[row * arr.cols + col] = val
+            else: matrix_set(arr, row, col, val)
+            return
+        if isinstance(arr, AscArray):
+            inner = array_get(arr, row)
+            if isinstance(inner, AscArray):
+                array_set(inner, col, val); return
+            arr = array_sparse(arr)
+        if not isinstance(arr, dict):
+            arr = Matrix()
+            self.store_ref(arg, arr)
+            matrix_set(arr, row, col, val)
+            return
+        # Dict usato come matrice (chiavi "r,c")
+        key = f"{int(row)},{int(col)}"
+        arr[key] = val
+        # Aggiorna dimensioni se necessario
+        r, c = int(row), int(col)
+        if arr.get('__rows__', 0) <= r:
+            arr['__rows__'] = r + 1
+        if arr.get('__cols__', 0) <= c:
+            arr['__cols__'] = c + 1
+
+    def _op_create_matrix(self, arg):
+        # Crea una matrice rows x cols inizializzata con un valore
+        init_val = self.stack.pop()
+        cols = int(self.stack.pop())
+        rows = int(self.stack.pop())
+        self.stack.append(Matrix(max(0, rows), max(0, cols), init_val))
+
+    def _op_matrix_rows(self, arg):
+        # Ritorna il numero di righe della matrice
+        arr = self.stack.pop()
+        if type(arr) is Matrix:
+            self.stack.append(arr.rows)
+        elif isinstance(arr, dict) and arr.get('__matrix__'):
+            self.stack.append(arr.get('__rows__', 0))
+        else:
+            # Per array 1D, ritorna il numero di elementi
+            if isinstance(arr, AscArray): self.stack.append(array_len(arr))
+            elif isinstance(arr, TYPED_ARRAYS): self.stack.append(len(arr))
+            else: self.stack.append(len([k for k in arr if not str(k).startswith('__')]) if isinstance(arr, (dict, StructInstance)) else 0)
+
+    def _op_matrix_cols(self, arg):
+        # Ritorna il numero di colonne della matrice
+        arr = self.stack.pop()
+        if type(arr) is Matrix:
+            self.stack.append(arr.cols)
+        elif isinstance(arr, dict) and arr.get('__matrix__'):
+            self.stack.append(arr.get('__cols__', 0))
+        else:
+            # Per array 1D, ritorna 1
+            self.stack.append(1 if isinstance(arr, (dict, StructInstance, AscArray) + TYPED_ARRAYS) else 0)
+
+    def _op_matrix_dim(self, arg):
+        # Ritorna la dimensionalità (1 o 2)
+        arr = self.stack.pop()
+        if type(arr) is Matrix:
+            self.stack.append(2)
+        elif isinstance(arr, (StructInstance, AscArray) + TYPED_ARRAYS):
+            self.stack.append(1)
+        elif isinstance(arr, dict):
+            if arr.get('__matrix__'):
+                self.stack.append(2)
+            else:
+                self.stack.append(1)
+        else:
+            self.stack.append(0)
+
+    # ----- ALGEBRA MATRICIALE -----
+
+    def _op_matmul(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(matrix_mul(a, b))
+
+    def _op_transpose(self, arg):
+        self.stack.append(matrix_transpose(self.stack.pop()))
+
+    def _op_madd(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(matrix_elementwise(operator.add, a, b, 'madd'))
+
+    def _op_msub(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(matrix_elementwise(operator.sub, a, b, 'msub'))
+
+    def _op_mscale(self, arg):
+        k = self.stack.pop(); a = self.stack.pop()
+        if not isinstance(k, (int, float)):
+            raise AscensionException(f"mscale: fattore non numerico '{k}'", "TypeError")
+        self.stack.append(matrix_elementwise(operator.mul, a, k, 'mscale'))
+
+    def _op_hadamard(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(matrix_elementwise(operator.mul, a, b, 'hadamard'))
+
+    def _op_mapply(self, arg):
+        fname = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(matrix_apply(a, fname))
+
+    # ----- RETI NEURALI -----
+
+    def _op_nn_create(self, arg):
+        self.stack.append(nn_create(self.stack.pop()))
+
+    def _op_nn_forward(self, arg):
+        # Un campione (array di input) -> array delle uscite
+        x = self.stack.pop(); net = self.stack.pop()
+        _nn_check(net, 'nn_forward')
+        row = _nn_rows(net, x, net.sizes[0], 'nn_forward')
+        if len(row) != 1:
+            raise AscensionException("nn_forward: un solo campione, usa nn_predict_batch", "MathError")
+        self.stack.append(AscArray(_nn_forward(net, row[0])[-1]))
+
+    def _op_nn_train(self, arg):
+        batch = self.stack.pop(); lr = self.stack.pop(); epochs = self.stack.pop()
+        Y = self.stack.pop(); X = self.stack.pop(); net = self.stack.pop()
+        self.stack.append(nn_train(net, X, Y, epochs, lr, batch))
+
+    def _op_nn_predict_batch(self, arg):
+        X = self.stack.pop(); net = self.stack.pop()
+        self.stack.append(nn_predict_batch(net, X))
+
+    def _op_nn_weights(self, arg):
+        # Copia dei pesi del layer l come matrice neuroni x input
+        l = int(self.stack.pop()); net = self.stack.pop()
+        _nn_check(net, 'nn_weights')
+        if not 0 <= l < len(net.weights):
+            raise AscensionException(f"nn_weights: layer {l} inesistente in {net!r}", "IndexError")
+        W = net.weights[l]
+        self.stack.append(matrix_from(len(W), net.sizes[l], [w for row in W for w in row]))
+
+    def _op_nn_bias(self, arg):
+        l = int(self.stack.pop()); net = self.stack.pop()
+        _nn_check(net, 'nn_bias')
+        if not 0 <= l < len(net.biases):
+            raise AscensionException(f"nn_bias: layer {l} inesistente in {net!r}", "IndexError")
+        self.stack.append(AscArray(net.biases[l]))
+
+    # ----- CHIAMATE A FUNZIONE -----
+
+    def _op_call(self, arg):
+        # Il frame viene creato da ENTER all'ingresso della funzione
+        self.call_stack.append((self.ip, len(self.local_frames)))
+        self.ip = arg
+
+    def _op_enter(self, arg):
+        # arg = (numero parametri, numero slot): i parametri passano
+        # dallo stack ai primi slot, gli altri locali partono UNSET
+        nparams, nslots = arg
+        if nparams:
+            frame = self.stack[-nparams:]
+            del self.stack[-nparams:]
+            frame.extend([UNSET] * (nslots - nparams))
+        else:
+            frame = [UNSET] * nslots
+        self.local_frames.append(frame)
+
+    def _op_call_name(self, arg):
+        # Chiamata a una funzione non ancora definita quando è stata caricata
+        if arg not in self.labels:
+            raise AscensionException(f"Funzione non definita: '{arg}'", "LinkerError")
+        target = self.labels[arg]
+        self._patch_call(self.ip - 1, target)
+        self._op_call(target)
+
+    def _op_tail_call(self, arg):
+        # return f(...): il frame corrente viene scartato prima di saltare,
+        # ENTER di f ne crea uno nuovo e il suo RET torna al nostro chiamante
+        self.local_frames.pop()
+        self.ip = arg
+
+    def _op_memo_enter(self, arg):
+        # Prologo di una funzione memo: se la tupla degli argomenti è in
+        # cache ritorna subito il risultato come farebbe RET_VAL
+        nparams, nslots, name = arg
+        cache = self.memo_caches.get(name)
+        if cache is None: cache = self.memo_caches[name] = MemoCache()
+        key = tuple(self.stack[-nparams:]) if nparams else ()
+        if all(type(v) in MEMO_KEY_TYPES for v in key): val = cache.get(key)
+        else:
+            # Argomenti mutabili (array, struct, string builder, ...): nessuna memoizzazione
+            key = None; val = UNSET
+        if val is UNSET:
+            self._op_enter((nparams, nslots))
+            # La chiave viaggia nell'ultimo slot del frame fino a MEMO_RET
+            self.local_frames[-1].append(key)
+            return
+        if nparams: del self.stack[-nparams:]
+        if self.call_stack:
+            ret_ip, _ = self.call_stack.pop()
+            self.stack.append(val)
+            self.ip = ret_ip
+        else:
+            self.return_value = val
+            raise VMHalt()
+
+    def _op_memo_ret(self, arg):
+        # return <expr> in una funzione memo: memorizza e poi RET_VAL
+        key = self.local_frames[-1][-1]
+        if key is not None: self.memo_caches[arg].put(key, self.stack[-1] if self.stack else 0)
+        self._op_ret_val(None)
+
+    def _op_tail_call_name(self, arg):
+        if arg not in self.labels:
+            raise AscensionException(f"Funzione non definita: '{arg}'", "LinkerError")
+        target = self.labels[arg]
+        self._patch_call(self.ip - 1, target)
+        self._op_tail_call(target)
+
+    def _op_ret(self, arg):
+        if self.call_stack:
+            ret_ip, _ = self.call_stack.pop()
+            self.local_frames.pop()
+            self.ip = ret_ip
+        else: raise VMHalt()
+
+    def _op_ret_val(self, arg):
+        ret_val = self.stack.pop() if self.stack else 0
+        if self.call_stack:
+            ret_ip, _ = self.call_stack.pop()
+            self.local_frames.pop()
+            self.stack.append(ret_val)
+            self.ip = ret_ip
+        else:
+            self.return_value = ret_val
+            raise VMHalt()
+
+    # ----- INPUT/OUTPUT E FUNZIONI BUILT-IN -----
+
+    def _op_read(self, arg):
+        try: self.stack.append(input("INPUT > "))
+        except EOFError: self.stack.append("")
+
+    def _op_len(self, arg):
+        target = self.stack.pop()
+        length = 0
+        if type(target) is AscArray: length = array_len(target)
+        # Una matrice conta le sue celle (il vecchio dict-matrice contava
+        # anche le chiavi __matrix__, __rows__ e __cols__)
+        elif type(target) is Matrix: length = target.rows * target.cols
+        elif type(target) is StringBuilder: length = target.length
+        elif isinstance(target, TYPED_ARRAYS): length = len(target)
+        elif isinstance(target, str): length = len(target)
+        elif isinstance(target, (dict, StructInstance)): length = len([k for k in target if k != '__type__'])
+        self.stack.append(length)
+
+    def _op_keys(self, arg):
+        container = self.stack.pop()
+        if isinstance(container, AscArray):
+            # Forma densa: le chiavi sono già 0..n-1
+            if container.sparse is None:
+                self.stack.append(AscArray(range(len(container)))); return
+            container = container.sparse
+        if isinstance(container, TYPED_ARRAYS):
+            self.stack.append(AscArray(range(len(container)))); return
+        if type(container) is Matrix:
+            self.stack.append(AscArray(f"{r},{c}" for r in range(container.rows) for c in range(container.cols)))
+        elif not isinstance(container, (dict, StructInstance)): self.stack.append(AscArray())
+        else:
+            self.stack.append(AscArray(sorted_keys(k for k in container if k != '__type__')))
+
+    def _op_iter_init(self, arg):
+        # foreach: arg vale 1 per "in sorted ..." (chiavi ordinate come keys())
+        self.stack.append(iter_pairs(self.stack.pop(), arg))
+
+    def _op_iter_next(self, arg):
+        # Consuma l'iteratore caricato dalla variabile nascosta del ciclo e
+        # lascia chiave e valore sullo stack, oppure salta alla fine
+        try: pair = next(self.stack.pop(), None)
+        except RuntimeError:
+            raise AscensionException("Contenitore modificato durante il foreach", "RuntimeError")
+        if pair is None: self.ip = arg
+        else: self.stack.extend(pair)
+
+    # ----- STRING BUILDER -----
+
+    def _op_sb_new(self, arg):
+        init = self.stack.pop() if arg else ""
+        self.stack.append(StringBuilder(init if isinstance(init, str) else str(init)))
+
+    def _op_sb_append(self, arg):
+        # sb_append(sb, a, b, ...): arg è il numero di valori da accodare
+        values = self.stack[-arg:] if arg else []
+        if arg: del self.stack[-arg:]
+        sb = self.stack.pop()
+        if type(sb) is not StringBuilder:
+            raise AscensionException("sb_append richiede un builder creato con sb_new", "TypeError")
+        for v in values: sb.append(as_text(v))
+        self.stack.append(sb)
+
+    def _op_sb_str(self, arg):
+        self.stack.append(str(self.stack.pop()))
+
+    # ----- STRINGHE NATIVE -----
+
+    def _op_find(self, arg):
+        # find(s, sub, start): indice della prima occorrenza da start, -1 se assente
+        start = self.stack.pop(); sub = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(as_text(text).find(as_text(sub), max(0, int(start))))
+
+    def _op_rfind(self, arg):
+        sub = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(as_text(text).rfind(as_text(sub)))
+
+    def _op_split(self, arg):
+        # split(s) divide sugli spazi, split(s, "") nei singoli caratteri
+        sep = self.stack.pop(); text = as_text(self.stack.pop())
+        if sep is None: parts = text.split()
+        elif sep == "": parts = list(text)
+        else: parts = text.split(as_text(sep))
+        self.stack.append(AscArray(parts))
+
+    def _op_join(self, arg):
+        sep = self.stack.pop(); items = self.stack.pop()
+        if type(items) is AscArray: items = array_dict(items).values() if items.sparse is not None else items
+        elif isinstance(items, TYPED_ARRAYS): items = items.tolist()
+        elif isinstance(items, dict): items = [v for k, v in items.items() if k != '__type__']
+        else:
+            raise AscensionException(f"join richiede un array, non '{items}'", "TypeError")
+        self.stack.append(as_text(sep).join(map(as_text, items)))
+
+    def _op_replace(self, arg):
+        new = self.stack.pop(); old = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(as_text(text).replace(as_text(old), as_text(new)))
+
+    def _op_trim(self, arg):
+        self.stack.append(as_text(self.stack.pop()).strip())
+
+    def _op_upper(self, arg):
+        self.stack.append(as_text(self.stack.pop()).upper())
+
+    def _op_lower(self, arg):
+        self.stack.append(as_text(self.stack.pop()).lower())
+
+    def _op_starts_with(self, arg):
+        prefix = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(1 if as_text(text).startswith(as_text(prefix)) else 0)
+
+    def _op_ends_with(self, arg):
+        suffix = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(1 if as_text(text).endswith(as_text(suffix)) else 0)
+
+    def _op_repeat(self, arg):
+        n = self.stack.pop(); text = self.stack.pop()
+        self.stack.append(as_text(text) * max(0, int(n)))
+
+    # ----- ESPRESSIONI REGOLARI -----
+
+    def _regex(self, pattern, flags):
+        """Pattern compilato, dalla cache LRU se già visto con gli stessi flag."""
+        key = (as_text(pattern), as_text(flags))
+        compiled = self.regex_cache.get(key)
+        if compiled is UNSET:
+            bits = 0
+            for f in key[1]:
+                if f not in REGEX_FLAGS:
+                    raise AscensionException(f"Flag di espressione regolare sconosciuto: '{f}'", "RegexError")
+                bits |= REGEX_FLAGS[f]
+            try: compiled = re.compile(key[0], bits)
+            except re.error as e:
+                raise AscensionException(f"Espressione regolare non valida '{pattern}': {e}", "RegexError")
+            self.regex_cache.put(key, compiled)
+        return compiled
+
+    @staticmethod
+    def _match_dict(m):
+        # Corrispondenza trovata: testo, posizione, gruppi (anche per nome)
+        if m is None: return 0
+        result = {'match': m.group(0), 'start': m.start(), 'end': m.end(),
+                  'groups': AscArray("" if g is None else g for g in m.groups())}
+        for name, g in m.groupdict().items(): result[name] = "" if g is None else g
+        return result
 
-    def _exec_opcode(self, opcode):
-        """Esegue un singolo opcode - estratto da run() per riuso nei callback"""
-        op = opcode[0]
+    def _op_re_match(self, arg):
+        # re_match(pattern, s[, flag]): solo all'inizio di s; 0 se non corrisponde
+        flags = self.stack.pop(); text = self.stack.pop(); pattern = self.stack.pop()
+        self.stack.append(self._match_dict(self._regex(pattern, flags).match(as_text(text))))
+
+    def _op_re_search(self, arg):
+        flags = self.stack.pop(); text = self.stack.pop(); pattern = self.stack.pop()
+        self.stack.append(self._match_dict(self._regex(pattern, flags).search(as_text(text))))
+
+    def _op_re_findall(self, arg):
+        # Senza gruppi: le corrispondenze; con più gruppi un array per corrispondenza
+        flags = self.stack.pop(); text = self.stack.pop(); pattern = self.stack.pop()
+        found = self._regex(pattern, flags).findall(as_text(text))
+        self.stack.append(AscArray(AscArray(x) if type(x) is tuple else x for x in found))
+
+    def _op_re_sub(self, arg):
+        flags = self.stack.pop(); text = self.stack.pop(); repl = self.stack.pop(); pattern = self.stack.pop()
+        try: self.stack.append(self._regex(pattern, flags).sub(as_text(repl), as_text(text)))
+        except re.error as e:
+            raise AscensionException(f"Sostituzione non valida '{repl}': {e}", "RegexError")
+
+    def _op_re_split(self, arg):
+        flags = self.stack.pop(); text = self.stack.pop(); pattern = self.stack.pop()
+        parts = self._regex(pattern, flags).split(as_text(text))
+        self.stack.append(AscArray("" if p is None else p for p in parts))
+
+    # ----- ORDINAMENTO -----
+
+    def _sort(self, arr, name, key=None, reverse=False):
+        # Ordina sul posto: l'array sparso torna denso con indici 0..n-1
+        if type(arr) is AscArray:
+            if arr.sparse is not None:
+                values = list(arr.sparse.values())
+                arr.sparse = None
+                arr[:] = values
+            sort_values(arr, key, reverse)
+        elif isinstance(arr, TYPED_ARRAYS):
+            arr[:] = py_array.array(typed_kind(arr), sorted(arr.tolist(), reverse=reverse))
+        else:
+            raise AscensionException(f"{name} richiede un array, non '{arr}'", "TypeError")
+        self.stack.append(arr)
+
+    def _op_sort(self, arg):
+        self._sort(self.stack.pop(), 'sort')
+
+    def _op_sort_desc(self, arg):
+        self._sort(self.stack.pop(), 'sort_desc', reverse=True)
+
+    def _op_sort_by(self, arg):
+        # sort_by(arr, "campo"[, desc]): array di struct o dict, ordinamento stabile
+        desc = self.stack.pop(); field = self.stack.pop(); arr = self.stack.pop()
+        def key(item):
+            if isinstance(item, StructInstance): return struct_get(item, field)
+            if isinstance(item, dict): return item.get(field, 0)
+            return item
+        self._sort(arr, 'sort_by', key, bool(desc))
+
+    def _op_bsearch(self, arg):
+        # bsearch(arr, x): indice di x in un array ordinato, -1 se assente
+        x = self.stack.pop(); arr = self.stack.pop()
+        if type(arr) is AscArray and arr.sparse is not None:
+            arr = [arr.sparse[k] for k in sorted_keys(arr.sparse)]
+        if not isinstance(arr, (list,) + TYPED_ARRAYS):
+            raise AscensionException("bsearch richiede un array ordinato", "TypeError")
+        try: i = bisect.bisect_left(arr, x)
+        except TypeError: i = bisect.bisect_left(arr, sort_key(x), key=sort_key)
+        self.stack.append(i if i < len(arr) and arr[i] == x else -1)
+
+    def _op_add_store(self, arg):
+        # s = s + a + b ...: gli operandi a destra di s sono già sullo stack
+        ref, n = arg
+        operands = self.stack[-n:]
+        del self.stack[-n:]
+        val = self.load_ref(ref)
+        if type(val) is str and None not in operands:
+            # Tolto dalla variabile, val è l'unico riferimento alla stringa
+            # e += la estende sul posto invece di copiarla
+            self.store_ref(ref, None)
+            for x in operands: val += x if type(x) is str else str(x)
+        else:
+            for x in operands:
+                if type(val) is int and type(x) is int: val = val + x
+                else:
+                    self.stack.append(val); self.stack.append(x)
+                    self._op_add(None)
+                    val = self.stack.pop()
+        self.store_ref(ref, val)
 
-        # --- STACK OPS ---
-        if op == 'PUSH':
-            val = opcode[1]
+    def _op_to_int(self, arg):
+        val = self.stack.pop()
+        try:
             if isinstance(val, str):
-                if val.startswith('"'):
-                    val = val[1:-1]
-                    # Processa escape sequences
-                    val = val.replace('\\n', '\n')
-                    val = val.replace('\\t', '\t')
-                    val = val.replace('\\r', '\r')
-                    val = val.replace('\\"', '"')
-                    val = val.replace('\\\\', '\\')
-                elif val.replace('.','',1).lstrip('-').isdigit():
-                    val = float(val) if '.' in val else int(val)
-            self.stack.append(val)
+                if val.lstrip('-').replace('.','',1).isdigit(): self.stack.append(int(float(val)))
+                elif len(val) == 1: self.stack.append(ord(val))
+                else: raise ValueError
+            else: self.stack.append(int(float(val)))
+        except: raise AscensionException(f"Impossibile convertire '{val}' in intero.", "ConversionError")
+
+    def _op_to_float(self, arg):
+        val = self.stack.pop()
+        try: self.stack.append(float(val))
+        except: raise AscensionException(f"Impossibile convertire '{val}' in float.", "ConversionError")
+
+    def _op_substr(self, arg):
+        # substr(string, start, length) - estrae sottostringa
+        length = int(self.stack.pop())
+        start = int(self.stack.pop())
+        string = self.stack.pop()
+        if isinstance(string, str):
+            if start < 0: start = 0
+            if start >= len(string):
+                self.stack.append("")
+            else:
+                end = start + length
+                if end > len(string): end = len(string)
+                self.stack.append(string[start:end])
+        else:
+            self.stack.append("")
 
-        elif op == 'POP':
-            if self.stack: self.stack.pop()
+    def _op_chr(self, arg):
+        # chr(code) - converte codice ASCII in carattere
+        code = int(self.stack.pop())
+        try:
+            if 0 <= code <= 127:
+                self.stack.append(chr(code))
+            else:
+                self.stack.append("")
+        except:
+            self.stack.append("")
+
+    # ----- MEMOIZZAZIONE -----
+
+    def _op_memo_clear(self, arg):
+        name = self.stack.pop()
+        cache = self.memo_caches.get(name)
+        if cache: cache.clear()
+        self.stack.append(1 if cache else 0)
+
+    def _op_memo_size(self, arg):
+        # Numero di risultati attualmente in cache
+        name = self.stack.pop()
+        cache = self.memo_caches.get(name)
+        self.stack.append(len(cache.entries) if cache else 0)
+
+    def _op_memo_resize(self, arg):
+        capacity = int(self.stack.pop()); name = self.stack.pop()
+        cache = self.memo_caches.get(name)
+        if cache is None: cache = self.memo_caches[name] = MemoCache(capacity)
+        cache.resize(capacity)
+        self.stack.append(len(cache.entries))
+
+    def _op_memo_stats(self, arg):
+        name = self.stack.pop()
+        cache = self.memo_caches.get(name) or MemoCache()
+        self.stack.append({'hits': cache.hits, 'misses': cache.misses,
+                           'size': len(cache.entries), 'capacity': cache.capacity})
+
+    # ----- SYSTEM COMMANDS (v12.4) -----
+
+    def _op_system(self, arg):
+        # Esegue comando shell, ritorna exit code
+        cmd = self.stack.pop()
+        try:
+            result = subprocess.run(cmd, shell=True)
+            self.stack.append(result.returncode)
+        except Exception as e:
+            self.stack.append(-1)
 
-        elif op == 'DUP':
-            if self.stack: self.stack.append(self.stack[-1])
+    def _op_exec(self, arg):
+        # Esegue comando shell, ritorna output come stringa
+        cmd = self.stack.pop()
+        try:
+            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            self.stack.append(result.stdout)
+        except Exception as e:
+            self.stack.append("")
 
-        elif op == 'PUSH_DICT':
-            self.stack.append({})
+    # ----- FILE I/O -----
 
-        elif op == 'DICT_SET':
-            key = self.stack.pop()
-            val = self.stack.pop()
-            d = self.stack[-1]
-            if isinstance(key, str) and key.startswith('"') and key.endswith('"'):
-                key = key[1:-1]
-            if isinstance(d, dict):
-                d[key] = val
-
-        # --- MEMORIA ---
-        elif op == 'LOAD':
-            var_name = opcode[1]
-            self.stack.append(self.get_var(var_name))
-
-        elif op == 'STORE':
-            var_name = opcode[1]
-            self.set_var(var_name, self.stack.pop())
-
-        elif op == 'STORE_GLOBAL':
-            var_name = opcode[1]
-            self.set_var(var_name, self.stack.pop(), force_global=True)
-
-        elif op == 'LOAD_GLOBAL':
-            var_name = opcode[1]
-            self.stack.append(self.global_memory.get(var_name, 0))
-
-        # --- STRUCT ---
-        elif op == 'NEW_STRUCT':
-            name = opcode[1]
-            inst = {'__type__': name}
-            for f in self.structs.get(name, []): inst[f] = 0
-            self.stack.append(inst)
-
-        elif op == 'GET_ATTR':
-            field = opcode[1]; obj = self.stack.pop()
-            self.stack.append(obj.get(field, 0) if isinstance(obj, dict) else 0)
+    def _op_file_open(self, arg):
+        mode = self.stack.pop(); filename = self.stack.pop()
+        try:
+            f = open(filename, mode); hid = id(f); self.file_handles[hid] = f; self.stack.append(hid)
+        except: self.stack.append(None)  # NULL se fallisce
+
+    def _op_file_write(self, arg):
+        content = self.stack.pop(); hid = self.stack.pop()
+        if hid is not None and hid in self.file_handles:
+            try: self.file_handles[hid].write(str(content)); self.file_handles[hid].flush(); self.stack.append(1)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_file_readline(self, arg):
+        hid = self.stack.pop()
+        if hid is not None and hid in self.file_handles:
+            try: self.stack.append(self.file_handles[hid].readline())
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_file_readall(self, arg):
+        hid = self.stack.pop()
+        if hid is not None and hid in self.file_handles:
+            try: self.stack.append(self.file_handles[hid].read())
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_file_close(self, arg):
+        hid = self.stack.pop()
+        if hid is not None and hid in self.file_handles:
+            try: self.file_handles.pop(hid).close(); self.stack.append(1)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    # ----- CURSES (TUI) -----
+
+    def _op_curses_init(self, arg):
+        try:
+            if curses is None: raise ImportError
+            self.current_screen = curses.initscr()
+            curses.noecho(); curses.cbreak(); self.current_screen.keypad(True); self.stack.append(1)
+        except: self.stack.append(0)
+
+    def _op_curses_end(self, arg):
+        if self.current_screen:
+            try: curses.nocbreak(); curses.echo(); curses.endwin(); self.current_screen = None; self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_curses_clear(self, arg):
+        if self.current_screen: self.current_screen.clear(); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_curses_refresh(self, arg):
+        if self.current_screen: self.current_screen.refresh(); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_curses_move(self, arg):
+        x = int(self.stack.pop()); y = int(self.stack.pop())
+        if self.current_screen: self.current_screen.move(y, x); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_curses_write(self, arg):
+        s = str(self.stack.pop())
+        if self.current_screen: self.current_screen.addstr(s); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_curses_read_key(self, arg):
+        if self.current_screen:
+            try: self.stack.append(self.current_screen.getch())
+            except: self.stack.append(-1)
+        else: self.stack.append(-1)
+
+    # --- NETWORK (HTTP) ---
+
+    def _op_http_get(self, arg):
+        url = str(self.stack.pop())
+        if requests:
+            try:
+                r = requests.get(url, timeout=10)
+                self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
+            except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
+        else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
+
+    def _op_http_post(self, arg):
+        data = as_dict(self.stack.pop()); url = str(self.stack.pop())
+        payload = {k:v for k,v in data.items() if k!='__type__'} if isinstance(data, dict) else str(data)
+        if requests:
+            try:
+                r = requests.post(url, data=payload, timeout=10)
+                self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
+            except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
+        else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
+
+    def _op_resp_status(self, arg):
+        r = self.stack.pop(); self.stack.append(r.get('status', 0) if isinstance(r, dict) else 0)
+
+    def _op_resp_body(self, arg):
+        r = self.stack.pop(); self.stack.append(r.get('body', "") if isinstance(r, dict) else "")
+
+    # --- TKINTER GUI (v11.0) ---
+
+    def _op_tk_root(self, arg):
+        if tk is None: raise AscensionException("Tkinter missing")
+        title = self.stack.pop()
+        if not self.tk_root:
+            self.tk_root = tk.Tk(); self.tk_root.title(str(title))
+            self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = self.tk_root
+            self.stack.append(self.tk_ref_counter)
+        else: self.stack.append(1)
+
+    def _op_tk_widget(self, arg):
+        config = as_dict(self.stack.pop()); w_type = self.stack.pop(); parent_id = self.stack.pop()
+        if not isinstance(config, dict): config = {}
+        clean_conf = {k:v for k,v in config.items() if k!='__type__'}
+        if 'command' in clean_conf: del clean_conf['command']
+        # Converti parent_id a int se è float
+        if isinstance(parent_id, float):
+            parent_id = int(parent_id)
+        if parent_id in self.tk_refs:
+            try:
+                cls = getattr(tk, str(w_type))
+                w = cls(self.tk_refs[parent_id], **clean_conf)
+                self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = w
+                self.stack.append(self.tk_ref_counter)
+            except Exception as e:
+                self.stack.append(0)
+        else:
+            self.stack.append(0)
+
+    def _op_tk_pack(self, arg):
+        config = as_dict(self.stack.pop()); wid = self.stack.pop()
+        clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
+        if wid in self.tk_refs: self.tk_refs[wid].pack(**clean_conf); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_grid(self, arg):
+        config = as_dict(self.stack.pop()); wid = self.stack.pop()
+        clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
+        if wid in self.tk_refs: self.tk_refs[wid].grid(**clean_conf); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_config(self, arg):
+        config = as_dict(self.stack.pop()); wid = self.stack.pop()
+        clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
+        if wid in self.tk_refs: self.tk_refs[wid].config(**clean_conf); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_get(self, arg):
+        wid = self.stack.pop()
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].get())
+            except: self.stack.append("")
+        else: self.stack.append("")
+
+    def _op_tk_msgbox(self, arg):
+        msg = self.stack.pop(); title = self.stack.pop()
+        if tk: messagebox.showinfo(str(title), str(msg)); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_mainloop(self, arg):
+        if self.tk_root:
+            try: self.tk_root.mainloop(); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    # --- TKINTER EXTENDED (v11.2) ---
+
+    def _op_tk_command(self, arg):
+        func_name = str(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            callback = self._make_tk_callback(func_name)
+            self.tk_refs[wid].config(command=callback)
+            self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_bind(self, arg):
+        func_name = str(self.stack.pop())
+        event = str(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            callback = self._make_tk_event_callback(func_name)
+            self.tk_refs[wid].bind(event, callback)
+            self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_after(self, arg):
+        func_name = str(self.stack.pop())
+        ms = int(self.stack.pop())
+        if self.tk_root:
+            callback = self._make_tk_callback(func_name)
+            after_id = self.tk_root.after(ms, callback)
+            self.tk_after_counter += 1
+            self.tk_after_ids[self.tk_after_counter] = after_id
+            self.stack.append(self.tk_after_counter)
+        else: self.stack.append(0)
+
+    def _op_tk_after_cancel(self, arg):
+        aid = int(self.stack.pop())
+        if aid in self.tk_after_ids and self.tk_root:
+            self.tk_root.after_cancel(self.tk_after_ids[aid])
+            del self.tk_after_ids[aid]
+            self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_update(self, arg):
+        if self.tk_root:
+            self.tk_root.update()
+            self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_destroy(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try:
+                self.tk_refs[wid].destroy()
+                del self.tk_refs[wid]
+                self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_set(self, arg):
+        value = str(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            w = self.tk_refs[wid]
+            try:
+                if isinstance(w, tk.Entry):
+                    w.delete(0, tk.END); w.insert(0, value)
+                elif isinstance(w, tk.Text):
+                    w.delete('1.0', tk.END); w.insert('1.0', value)
+                self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
 
-        elif op == 'SET_ATTR':
-            field = opcode[1]; obj = self.stack.pop(); val = self.stack.pop()
-            if isinstance(obj, dict): obj[field] = val
-
-        # --- ARRAY ---
-        elif op == 'STORE_IDX':
-            idx = self.stack.pop(); name = opcode[1]; val = self.stack.pop()
-            arr_ref = None
-            # Prima cerca nel frame locale corrente
-            if name in self.local_frames[-1]:
-                arr_ref = self.local_frames[-1]
-            # Poi cerca in global_memory
-            elif name in self.global_memory:
-                arr_ref = self.global_memory
-            else:
-                # Se siamo nel main (un solo frame), crea in global_memory
-                # Altrimenti crea nel frame locale
-                if len(self.local_frames) == 1:
-                    arr_ref = self.global_memory
-                else:
-                    arr_ref = self.local_frames[-1]
-                arr_ref[name] = {}
+    def _op_tk_clear(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            w = self.tk_refs[wid]
+            try:
+                if isinstance(w, tk.Entry): w.delete(0, tk.END)
+                elif isinstance(w, tk.Text): w.delete('1.0', tk.END)
+                elif isinstance(w, tk.Listbox): w.delete(0, tk.END)
+                self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_focus(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            self.tk_refs[wid].focus_set()
+            self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_geometry(self, arg):
+        geom = str(self.stack.pop())
+        if self.tk_root:
+            self.tk_root.geometry(geom); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_title(self, arg):
+        title = str(self.stack.pop())
+        if self.tk_root:
+            self.tk_root.title(title); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_resizable(self, arg):
+        h = int(self.stack.pop()); w = int(self.stack.pop())
+        if self.tk_root:
+            self.tk_root.resizable(w, h); self.stack.append(1)
+        else: self.stack.append(0)
+
+    def _op_tk_text_get(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].get('1.0', tk.END).rstrip('\n'))
+            except: self.stack.append("")
+        else: self.stack.append("")
+
+    def _op_tk_text_insert(self, arg):
+        text = str(self.stack.pop())
+        pos = str(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.tk_refs[wid].insert(pos, text); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_listbox_add(self, arg):
+        item = str(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.tk_refs[wid].insert(tk.END, item); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_listbox_get(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try:
+                sel = self.tk_refs[wid].curselection()
+                self.stack.append(self.tk_refs[wid].get(sel[0]) if sel else "")
+            except: self.stack.append("")
+        else: self.stack.append("")
+
+    def _op_tk_listbox_index(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try:
+                sel = self.tk_refs[wid].curselection()
+                self.stack.append(sel[0] if sel else -1)
+            except: self.stack.append(-1)
+        else: self.stack.append(-1)
+
+    def _op_tk_filedialog_open(self, arg):
+        title = str(self.stack.pop())
+        if filedialog:
+            path = filedialog.askopenfilename(title=title)
+            self.stack.append(path if path else "")
+        else: self.stack.append("")
+
+    def _op_tk_filedialog_save(self, arg):
+        title = str(self.stack.pop())
+        if filedialog:
+            path = filedialog.asksaveasfilename(title=title)
+            self.stack.append(path if path else "")
+        else: self.stack.append("")
+
+    def _op_tk_askstring(self, arg):
+        prompt = str(self.stack.pop())
+        title = str(self.stack.pop())
+        if simpledialog:
+            result = simpledialog.askstring(title, prompt)
+            self.stack.append(result if result else "")
+        else: self.stack.append("")
+
+    def _op_tk_askyesno(self, arg):
+        msg = str(self.stack.pop())
+        title = str(self.stack.pop())
+        if messagebox:
+            result = messagebox.askyesno(title, msg)
+            self.stack.append(1 if result else 0)
+        else: self.stack.append(0)
+
+    # --- CANVAS (v11.2) ---
+
+    def _op_tk_canvas_line(self, arg):
+        color = str(self.stack.pop())
+        y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
+        y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].create_line(x1,y1,x2,y2,fill=color))
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_rect(self, arg):
+        color = str(self.stack.pop())
+        y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
+        y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].create_rectangle(x1,y1,x2,y2,fill=color))
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_oval(self, arg):
+        color = str(self.stack.pop())
+        y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
+        y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].create_oval(x1,y1,x2,y2,fill=color))
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_text(self, arg):
+        color = str(self.stack.pop())
+        text = str(self.stack.pop())
+        y = int(self.stack.pop()); x = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.stack.append(self.tk_refs[wid].create_text(x,y,text=text,fill=color))
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_clear(self, arg):
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.tk_refs[wid].delete("all"); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_delete(self, arg):
+        item_id = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.tk_refs[wid].delete(item_id); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    def _op_tk_canvas_move(self, arg):
+        dy = int(self.stack.pop()); dx = int(self.stack.pop())
+        item_id = int(self.stack.pop())
+        wid = int(self.stack.pop())
+        if wid in self.tk_refs:
+            try: self.tk_refs[wid].move(item_id, dx, dy); self.stack.append(1)
+            except: self.stack.append(0)
+        else: self.stack.append(0)
+
+    # --- NEW: DNS Resolution (GET_IP) v11.1 ---
+
+    def _op_get_ip(self, arg):
+        hostname = str(self.stack.pop())
+        try:
+            ip_addr = socket.gethostbyname(hostname)
+            self.stack.append(ip_addr)
+        except:
+            # Restituisce stringa vuota in caso di errore di risoluzione
+            self.stack.append("")
 
-            arr = arr_ref.get(name)
-            if not isinstance(arr, dict):
-                arr_ref[name] = {}
-                arr = arr_ref[name]
-            arr[idx] = val
+    # --- SOCKETS (TCP/IP) v11.0 ---
 
-        elif op == 'LOAD_IDX':
-            idx = self.stack.pop(); name = opcode[1]
-            arr = self.get_var(name)
-            if isinstance(arr, str):
-                try:
-                    idx = int(idx)
-                    if 0 <= idx < len(arr): self.stack.append(arr[idx])
-                    else: self.stack.append("")
-                except: self.stack.append("")
-            elif isinstance(arr, dict):
-                self.stack.append(arr.get(idx, 0))
-            else:
-                self.stack.append(0)
+    def _op_socket_open(self, arg):
+        proto = str(self.stack.pop()); sock_type = str(self.stack.pop())
+        try:
+            family = socket.AF_INET
+            type_map = {"TCP": socket.SOCK_STREAM, "UDP": socket.SOCK_DGRAM}
+            if sock_type not in type_map: raise ValueError("Invalid socket type")
+            s = socket.socket(family, type_map[sock_type])
+            self.socket_id_counter += 1
+            hid = self.socket_id_counter
+            self.socket_handles[hid] = s
+            self.stack.append(hid)
+        except Exception as e:
+            self.stack.append(None)  # NULL se fallisce
 
-        # --- FUNZIONI ---
-        elif op == 'CALL':
-            if opcode[1] not in self.labels:
-                raise AscensionException(f"Funzione non definita: '{opcode[1]}'", "LinkerError")
-            self.call_stack.append((self.ip + 1, len(self.local_frames)))
-            self.local_frames.append({})
-            self.ip = self.labels[opcode[1]] - 1  # -1 perché incrementiamo dopo
-
-        elif op == 'LABEL':
-            pass  # No-op
-
-        # --- I/O & Built-in ---
-        elif op == 'READ':
-            try: self.stack.append(input("INPUT > "))
-            except EOFError: self.stack.append("")
-
-        elif op == 'LEN':
-            target = self.stack.pop()
-            length = 0
-            if isinstance(target, str): length = len(target)
-            elif isinstance(target, dict): length = len([k for k in target if k != '__type__'])
-            self.stack.append(length)
-
-        elif op == 'KEYS':
-            container = self.stack.pop()
-            if not isinstance(container, dict): self.stack.append({})
-            else:
-                keys_list = [k for k in container if k != '__type__']
-                try: keys_list.sort()
-                except: keys_list.sort(key=str)
-                result_array = {i: key for i, key in enumerate(keys_list)}
-                self.stack.append(result_array)
+    def _op_socket_bind(self, arg):
+        port = int(self.stack.pop()); ip = str(self.stack.pop()); sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                self.socket_handles[sid].bind((ip, port))
+                self.stack.append(1)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
 
-        elif op == 'TO_INT':
-            val = self.stack.pop()
+    def _op_socket_listen(self, arg):
+        backlog = int(self.stack.pop()); sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
             try:
-                if isinstance(val, str):
-                    if val.lstrip('-').replace('.','',1).isdigit(): self.stack.append(int(float(val)))
-                    elif len(val) == 1: self.stack.append(ord(val))
-                    else: raise ValueError
-                else: self.stack.append(int(float(val)))
-            except: raise AscensionException(f"Impossibile convertire '{val}' in intero.", "ConversionError")
-
-        elif op == 'TO_FLOAT':
-            val = self.stack.pop()
-            try: self.stack.append(float(val))
-            except: raise AscensionException(f"Impossibile convertire '{val}' in float.", "ConversionError")
-
-        # --- PRINT ---
-        elif op == 'PRINT':
-            count = opcode[1]; args = []
-            for _ in range(count):
-                val = self.stack.pop()
-                if isinstance(val, str) and val.startswith('"') and val.endswith('"'):
-                    val = val[1:-1]
-                args.append(val)
-            print(*reversed(args))
-
-        # --- MATH ---
-        elif op in ['ADD', 'SUB', 'MUL', 'DIV', 'MOD', 'GT', 'LT', 'EQ', 'NEQ', 'GTE', 'LTE', 'AND', 'OR']:
-            b = self.stack.pop(); a = self.stack.pop()
-            if op == 'ADD' and (isinstance(a, str) or isinstance(b, str)): self.stack.append(str(a) + str(b))
-            elif op == 'EQ': self.stack.append(1 if a == b else 0)
-            elif op == 'NEQ': self.stack.append(1 if a != b else 0)
-            elif op == 'AND': self.stack.append(1 if a and b else 0)
-            elif op == 'OR': self.stack.append(1 if a or b else 0)
-            else:
-                try: a = float(a); b = float(b)
-                except: raise AscensionException(f"Op illegale: {a} {op} {b}", "TypeError")
-                if op == 'ADD': r = a + b
-                elif op == 'SUB': r = a - b
-                elif op == 'MUL': r = a * b
-                elif op == 'DIV':
-                    if b==0: raise AscensionException("DivZero")
-                    r = a / b
-                elif op == 'MOD': r = a % b
-                elif op == 'GT': r = 1 if a > b else 0
-                elif op == 'LT': r = 1 if a < b else 0
-                elif op == 'GTE': r = 1 if a >= b else 0
-                elif op == 'LTE': r = 1 if a <= b else 0
-                if isinstance(r, float) and r.is_integer(): r = int(r)
-                self.stack.append(r)
-
-        elif op == 'NOT': self.stack.append(1 if not self.stack.pop() else 0)
-
-        # --- FLUSSO ---
-        elif op == 'JMP': self.ip = self.labels[opcode[1]] - 1
-        elif op == 'JZ':
-            if self.stack.pop() == 0: self.ip = self.labels[opcode[1]] - 1
-        elif op == 'JNZ':
-            if self.stack.pop() != 0: self.ip = self.labels[opcode[1]] - 1
-
-        # --- TKINTER BASE ---
-        elif op == 'TK_ROOT':
-            if tk is None: raise AscensionException("Tkinter missing")
-            title = self.stack.pop()
-            if not self.tk_root:
-                self.tk_root = tk.Tk(); self.tk_root.title(str(title))
-                self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = self.tk_root
-                self.stack.append(self.tk_ref_counter)
-            else: self.stack.append(1)
-
-        elif op == 'TK_WIDGET':
-            config = self.stack.pop(); w_type = self.stack.pop(); parent_id = self.stack.pop()
-            if not isinstance(config, dict): config = {}
-            clean_conf = {k:v for k,v in config.items() if k!='__type__'}
-            if 'command' in clean_conf: del clean_conf['command']
-            if parent_id in self.tk_refs:
-                try:
-                    cls = getattr(tk, str(w_type))
-                    w = cls(self.tk_refs[parent_id], **clean_conf)
-                    self.tk_ref_counter += 1; self.tk_refs[self.tk_ref_counter] = w
-                    self.stack.append(self.tk_ref_counter)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+                self.socket_handles[sid].listen(backlog)
+                self.stack.append(1)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
 
-        elif op == 'TK_PACK':
-            config = self.stack.pop(); wid = self.stack.pop()
-            clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-            if wid in self.tk_refs: self.tk_refs[wid].pack(**clean_conf); self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_socket_accept(self, arg):
+        sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                conn, addr = self.socket_handles[int(sid)].accept()
+                self.socket_id_counter += 1
+                new_sid = self.socket_id_counter
+                self.socket_handles[new_sid] = conn
+                self.stack.append(new_sid)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_socket_connect(self, arg):
+        port = int(self.stack.pop()); ip = str(self.stack.pop()); sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                # Aggiungiamo un timeout per evitare che socket_connect blocchi il VM indefinitamente
+                self.socket_handles[int(sid)].settimeout(5)
+                self.socket_handles[int(sid)].connect((ip, port))
+                self.stack.append(1)
+            except:
+                self.stack.append(None)
+            finally:
+                 # Resetta il timeout per il socket
+                 if sid in self.socket_handles: self.socket_handles[int(sid)].settimeout(None)
+        else: self.stack.append(None)
+
+    def _op_socket_send(self, arg):
+        data = str(self.stack.pop()); sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                sent = self.socket_handles[int(sid)].send(data.encode('utf-8'))
+                self.stack.append(sent)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_socket_recv(self, arg):
+        max_b = int(self.stack.pop()); sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                data = self.socket_handles[int(sid)].recv(max_b)
+                self.stack.append(data.decode('utf-8'))
+            except: self.stack.append(None)
+        else: self.stack.append(None)
+
+    def _op_socket_close(self, arg):
+        sid = self.stack.pop()
+        if sid is not None and sid in self.socket_handles:
+            try:
+                self.socket_handles.pop(int(sid)).close()
+                self.stack.append(1)
+            except: self.stack.append(None)
+        else: self.stack.append(None)
 
-        elif op == 'TK_GRID':
-            config = self.stack.pop(); wid = self.stack.pop()
-            clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-            if wid in self.tk_refs: self.tk_refs[wid].grid(**clean_conf); self.stack.append(1)
-            else: self.stack.append(0)
+    # --- TRY / CATCH ---
 
-        elif op == 'TK_CONFIG':
-            config = self.stack.pop(); wid = self.stack.pop()
-            clean_conf = {k:v for k,v in config.items() if k!='__type__'} if isinstance(config, dict) else {}
-            if wid in self.tk_refs: self.tk_refs[wid].config(**clean_conf); self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_try_start(self, arg):
+        self.try_stack.append((arg, len(self.local_frames), len(self.call_stack)))
 
-        elif op == 'TK_GET':
-            wid = self.stack.pop()
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].get())
-                except: self.stack.append("")
-            else: self.stack.append("")
+    def _op_try_end(self, arg):
+        if self.try_stack: self.try_stack.pop()
+        self.ip = arg
 
-        elif op == 'TK_MSGBOX':
-            msg = self.stack.pop(); title = self.stack.pop()
-            if tk: messagebox.showinfo(str(title), str(msg)); self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_throw(self, arg):
+        msg = self.stack.pop() if self.stack else "Unknown error"
+        raise AscensionException(str(msg))
 
-        elif op == 'TK_MAINLOOP':
-            if self.tk_root:
-                try: self.tk_root.mainloop(); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    # --- MATH ---
 
-        # --- TKINTER EXTENDED (v11.2) ---
-        elif op == 'TK_COMMAND':
-            func_name = str(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                callback = self._make_tk_callback(func_name)
-                self.tk_refs[wid].config(command=callback)
-                self.stack.append(1)
-            else: self.stack.append(0)
+    def _numeric_operands(self, a, b, op):
+        """
+        Converte gli operandi in float per le operazioni aritmetiche.
+        Due interi restano interi, così il risultato è esatto anche oltre 2**53.
+        """
+        if type(a) is int and type(b) is int: return a, b
+        try: return float(a), float(b)
+        except: raise AscensionException(f"Op illegale: {a} {op} {b}", "TypeError")
+
+    def _ordered_operands(self, a, b, op):
+        """Operandi di un confronto ordinato: il confronto è numerico anche
+        tra stringhe numeriche ("10" > "9"); solo due stringhe di cui una non
+        è un numero si confrontano in ordine lessicografico."""
+        if type(a) is str and type(b) is str:
+            try: return float(a), float(b)
+            except ValueError: return a, b
+        return self._numeric_operands(a, b, op)
+
+    def _push_number(self, r):
+        """Pusha un risultato numerico, riportando a int i float interi."""
+        self.stack.append(int(r) if type(r) is float and r.is_integer() else r)
+
+    @staticmethod
+    def _true_div(a, b):
+        """
+        a / b con gli errori di Python tradotti in AscensionException, così
+        DIV generico e varianti specializzate falliscono allo stesso modo
+        (interi troppo grandi per un float compresi).
+        """
+        try: return a / b
+        except ZeroDivisionError: raise AscensionException("DivZero")
+        except OverflowError: raise AscensionException("Overflow: risultato della divisione troppo grande", "MathError")
 
-        elif op == 'TK_BIND':
-            func_name = str(self.stack.pop())
-            event = str(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                callback = self._make_tk_event_callback(func_name)
-                self.tk_refs[wid].bind(event, callback)
-                self.stack.append(1)
-            else: self.stack.append(0)
+    def _specialize(self, idx, op, a, b):
+        """
+        Quickening: riscrive l'istruzione idx nella variante di op
+        specializzata per il tipo degli operandi. Se i tipi non hanno una
+        variante (misti, NULL, ...) l'istruzione resta generica per sempre.
+        """
+        t = type(a)
+        special = SPECIALIZED.get((op, t)) if type(b) is t else None
+        self.code[idx] = (OP[special], idx) if special else (OP[op], None)
+
+    def _despecialize(self, idx, op, a, b):
+        """Guardia fallita: torna all'operatore generico e lo esegue."""
+        self.code[idx] = (OP[op], None)
+        self.stack.append(a); self.stack.append(b)
+        self.handlers[OP[op]](None)
+
+    # Gli handler generici ricevono arg = indice dell'istruzione solo finché
+    # sono adattivi; INC e LOAD_LOAD_OP li richiamano con arg None.
+
+    def _op_add(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if arg is not None: self._specialize(arg, 'ADD', a, b)
+        # Operazioni matematiche con NULL danno NULL
+        if a is None or b is None: self.stack.append(None)
+        elif isinstance(a, str) or isinstance(b, str): self.stack.append(str(a) + str(b))
+        else:
+            a, b = self._numeric_operands(a, b, 'ADD')
+            self._push_number(a + b)
 
-        elif op == 'TK_AFTER':
-            func_name = str(self.stack.pop())
-            ms = int(self.stack.pop())
-            if self.tk_root:
-                callback = self._make_tk_callback(func_name)
-                after_id = self.tk_root.after(ms, callback)
-                self.tk_after_counter += 1
-                self.tk_after_ids[self.tk_after_counter] = after_id
-                self.stack.append(self.tk_after_counter)
-            else: self.stack.append(0)
+    def _op_sub(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if arg is not None: self._specialize(arg, 'SUB', a, b)
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._numeric_operands(a, b, 'SUB')
+            self._push_number(a - b)
+
+    def _op_mul(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if arg is not None: self._specialize(arg, 'MUL', a, b)
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._numeric_operands(a, b, 'MUL')
+            self._push_number(a * b)
+
+    def _op_div(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if arg is not None: self._specialize(arg, 'DIV', a, b)
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._numeric_operands(a, b, 'DIV')
+            if b==0: raise AscensionException("DivZero")
+            # Divisione esatta tra interi: niente passaggio per float
+            if type(a) is int and a % b == 0: self.stack.append(a // b)
+            else: self._push_number(self._true_div(a, b))
+
+    def _op_mod(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if arg is not None: self._specialize(arg, 'MOD', a, b)
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._numeric_operands(a, b, 'MOD')
+            self._push_number(a % b)
 
-        elif op == 'TK_AFTER_CANCEL':
-            aid = int(self.stack.pop())
-            if aid in self.tk_after_ids and self.tk_root:
-                self.tk_root.after_cancel(self.tk_after_ids[aid])
-                del self.tk_after_ids[aid]
-                self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_gt(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._ordered_operands(a, b, 'GT')
+            self.stack.append(1 if a > b else 0)
 
-        elif op == 'TK_UPDATE':
-            if self.tk_root:
-                self.tk_root.update()
-                self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_lt(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._ordered_operands(a, b, 'LT')
+            self.stack.append(1 if a < b else 0)
 
-        elif op == 'TK_DESTROY':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try:
-                    self.tk_refs[wid].destroy()
-                    del self.tk_refs[wid]
-                    self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    def _op_eq(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(1 if a == b else 0)
 
-        elif op == 'TK_SET':
-            value = str(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                w = self.tk_refs[wid]
-                try:
-                    if isinstance(w, tk.Entry):
-                        w.delete(0, tk.END); w.insert(0, value)
-                    elif isinstance(w, tk.Text):
-                        w.delete('1.0', tk.END); w.insert('1.0', value)
-                    self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    def _op_neq(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(1 if a != b else 0)
 
-        elif op == 'TK_CLEAR':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                w = self.tk_refs[wid]
-                try:
-                    if isinstance(w, tk.Entry): w.delete(0, tk.END)
-                    elif isinstance(w, tk.Text): w.delete('1.0', tk.END)
-                    elif isinstance(w, tk.Listbox): w.delete(0, tk.END)
-                    self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    def _op_gte(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._ordered_operands(a, b, 'GTE')
+            self.stack.append(1 if a >= b else 0)
 
-        elif op == 'TK_FOCUS':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                self.tk_refs[wid].focus_set()
-                self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_lte(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a is None or b is None: self.stack.append(None)
+        else:
+            a, b = self._ordered_operands(a, b, 'LTE')
+            self.stack.append(1 if a <= b else 0)
+
+    def _op_and(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        # NULL è considerato falsy
+        self.stack.append(1 if a and b else 0)
+
+    def _op_or(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        self.stack.append(1 if a or b else 0)
+
+    def _op_not(self, arg):
+        val = self.stack.pop()
+        # NULL è considerato falsy, quindi !NULL = 1
+        self.stack.append(1 if not val else 0)
+
+    # ----- ARITMETICA SPECIALIZZATA (QUICKENING) -----
+    # Varianti scelte da _specialize: una guardia sul tipo protegge il
+    # percorso veloce, altrimenti l'istruzione torna generica.
+
+    def _op_add_int(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is int and type(b) is int: self.stack.append(a + b)
+        else: self._despecialize(arg, 'ADD', a, b)
+
+    def _op_add_float(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is float and type(b) is float:
+            r = a + b
+            self.stack.append(int(r) if r.is_integer() else r)
+        else: self._despecialize(arg, 'ADD', a, b)
+
+    def _op_add_str(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is str and type(b) is str: self.stack.append(a + b)
+        else: self._despecialize(arg, 'ADD', a, b)
+
+    def _op_sub_int(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is int and type(b) is int: self.stack.append(a - b)
+        else: self._despecialize(arg, 'SUB', a, b)
+
+    def _op_sub_float(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is float and type(b) is float:
+            r = a - b
+            self.stack.append(int(r) if r.is_integer() else r)
+        else: self._despecialize(arg, 'SUB', a, b)
+
+    def _op_mul_int(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is int and type(b) is int: self.stack.append(a * b)
+        else: self._despecialize(arg, 'MUL', a, b)
+
+    def _op_mul_float(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is float and type(b) is float:
+            r = a * b
+            self.stack.append(int(r) if r.is_integer() else r)
+        else: self._despecialize(arg, 'MUL', a, b)
+
+    def _op_div_int(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is int and type(b) is int and b != 0:
+            if a % b == 0: self.stack.append(a // b)
+            else: self._push_number(self._true_div(a, b))
+        else: self._despecialize(arg, 'DIV', a, b)
+
+    def _op_div_float(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is float and type(b) is float and b != 0:
+            r = self._true_div(a, b)
+            self.stack.append(int(r) if r.is_integer() else r)
+        else: self._despecialize(arg, 'DIV', a, b)
+
+    def _op_mod_int(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if type(a) is int and type(b) is int and b != 0: self.stack.append(a % b)
+        else: self._despecialize(arg, 'MOD', a, b)
+
+    # ----- FUNZIONI MATEMATICHE (v12.7) -----
+
+    def _op_random(self, arg):
+        # Nessun argomento: float tra 0.0 e 1.0
+        self.stack.append(py_random.random())
+
+    def _op_random_max(self, arg):
+        # Un argomento: int tra 0 e max-1
+        max_val = int(self.stack.pop())
+        self.stack.append(py_random.randint(0, max_val - 1))
+
+    def _op_random_range(self, arg):
+        # Due argomenti: int tra min e max-1
+        max_val = int(self.stack.pop())
+        min_val = int(self.stack.pop())
+        self.stack.append(py_random.randint(min_val, max_val - 1))
+
+    def _op_sqrt(self, arg):
+        val = float(self.stack.pop())
+        if val < 0:
+            raise AscensionException("sqrt di numero negativo", "MathError")
+        self.stack.append(math.sqrt(val))
+
+    def _op_pow(self, arg):
+        exp = float(self.stack.pop())
+        base = float(self.stack.pop())
+        self.stack.append(math.pow(base, exp))
+
+    def _op_exp(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(math.exp(val))
+
+    def _op_log(self, arg):
+        val = float(self.stack.pop())
+        if val <= 0:
+            raise AscensionException("log di numero non positivo", "MathError")
+        self.stack.append(math.log(val))
+
+    def _op_abs(self, arg):
+        val = self.stack.pop()
+        if isinstance(val, (int, float)):
+            self.stack.append(abs(val))
+        else:
+            self.stack.append(abs(float(val)))
+
+    def _op_floor(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(int(math.floor(val)))
+
+    def _op_ceil(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(int(math.ceil(val)))
+
+    def _op_sin(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(math.sin(val))
+
+    def _op_cos(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(math.cos(val))
+
+    def _op_tan(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(math.tan(val))
+
+    def _op_asin(self, arg):
+        val = float(self.stack.pop())
+        if val < -1 or val > 1:
+            raise AscensionException("asin fuori range [-1, 1]", "MathError")
+        self.stack.append(math.asin(val))
+
+    def _op_acos(self, arg):
+        val = float(self.stack.pop())
+        if val < -1 or val > 1:
+            raise AscensionException("acos fuori range [-1, 1]", "MathError")
+        self.stack.append(math.acos(val))
+
+    def _op_atan(self, arg):
+        val = float(self.stack.pop())
+        self.stack.append(math.atan(val))
+
+    def _op_atan2(self, arg):
+        x = float(self.stack.pop())
+        y = float(self.stack.pop())
+        self.stack.append(math.atan2(y, x))
+
+    # ----- CONTROLLO DI FLUSSO -----
+
+    def _op_jmp(self, arg):
+        self.ip = arg
+
+    def _op_jz(self, arg):
+        val = self.stack.pop()
+        # NULL è considerato come 0 (falsy) per i salti condizionali
+        if val == 0 or val is None: self.ip = arg
+
+    def _op_jnz(self, arg):
+        val = self.stack.pop()
+        if val != 0 and val is not None: self.ip = arg
+
+    def _op_print(self, arg):
+        count = arg; args = []
+        for _ in range(count):
+            val = self.stack.pop()
+            if val is None:
+                args.append("NULL")
+            elif isinstance(val, float) and val.is_integer():
+                args.append(str(int(val)))
+            elif isinstance(val, TYPED_ARRAYS):
+                args.append(str(val.tolist()))
+            else:
+                args.append(str(val))
+        print("OUTPUT > " + " ".join(reversed(args)))
 
-        elif op == 'TK_GEOMETRY':
-            geom = str(self.stack.pop())
-            if self.tk_root:
-                self.tk_root.geometry(geom); self.stack.append(1)
-            else: self.stack.append(0)
 
-        elif op == 'TK_TITLE':
-            title = str(self.stack.pop())
-            if self.tk_root:
-                self.tk_root.title(title); self.stack.append(1)
-            else: self.stack.append(0)
+    # ----- SUPERISTRUZIONI -----
+    # Sequenze frequenti fuse dal compilatore in un solo dispatch.
 
-        elif op == 'TK_RESIZABLE':
-            h = int(self.stack.pop()); w = int(self.stack.pop())
-            if self.tk_root:
-                self.tk_root.resizable(w, h); self.stack.append(1)
-            else: self.stack.append(0)
+    def _op_inc(self, arg):
+        # LOAD x; PUSH c; ADD/SUB; STORE x  (c costante numerica)
+        ref, c, op = arg
+        a = self.load_ref(ref)
+        if type(a) is int and type(c) is int:
+            self.store_ref(ref, a + c if op == 'ADD' else a - c)
+        else:
+            # Tipi generici: stesso handler (ed errori) dell'operatore originale
+            self.stack.append(a); self.stack.append(c)
+            (self._op_add if op == 'ADD' else self._op_sub)(None)
+            self.store_ref(ref, self.stack.pop())
+
+    def _op_load_load_op(self, arg):
+        # LOAD a; LOAD b; <op binario>
+        a, b, op = arg
+        self.stack.append(self.load_ref(a))
+        self.stack.append(self.load_ref(b))
+        self.handlers[op](None)
+
+    def _op_store_load(self, arg):
+        # STORE x; LOAD x  -> il valore resta sullo stack
+        self.store_ref(arg, self.stack[-1])
+
+    def _compare_operands(self, op):
+        """Estrae gli operandi di un confronto ordinato; None se c'è un NULL."""
+        b = self.stack.pop(); a = self.stack.pop()
+        if a is None or b is None: return None
+        if type(a) is int and type(b) is int: return a, b
+        return self._ordered_operands(a, b, op)
+
+    def _op_jz_eq(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a != b: self.ip = arg
+
+    def _op_jz_neq(self, arg):
+        b = self.stack.pop(); a = self.stack.pop()
+        if a == b: self.ip = arg
+
+    def _op_jz_gt(self, arg):
+        ab = self._compare_operands('GT')
+        if ab is None or not ab[0] > ab[1]: self.ip = arg
+
+    def _op_jz_lt(self, arg):
+        ab = self._compare_operands('LT')
+        if ab is None or not ab[0] < ab[1]: self.ip = arg
+
+    def _op_jz_gte(self, arg):
+        ab = self._compare_operands('GTE')
+        if ab is None or not ab[0] >= ab[1]: self.ip = arg
+
+    def _op_jz_lte(self, arg):
+        ab = self._compare_operands('LTE')
+        if ab is None or not ab[0] <= ab[1]: self.ip = arg
+
+    def _op_halt(self, arg):
+        # Sentinella in coda al programma
+        raise VMHalt()
 
-        elif op == 'TK_TEXT_GET':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].get('1.0', tk.END).rstrip('\n'))
-                except: self.stack.append("")
-            else: self.stack.append("")
-
-        elif op == 'TK_TEXT_INSERT':
-            text = str(self.stack.pop())
-            pos = str(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.tk_refs[wid].insert(pos, text); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
 
-        elif op == 'TK_LISTBOX_ADD':
-            item = str(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.tk_refs[wid].insert(tk.END, item); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    # --- CALLBACK HELPERS (v11.2) ---
+    def _make_tk_callback(self, func_name):
+        """Crea closure per callback senza argomenti (bottoni, after)"""
+        vm = self
+        def callback():
+            vm._call_ascension_func(func_name, [])
+        return callback
 
-        elif op == 'TK_LISTBOX_GET':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try:
-                    sel = self.tk_refs[wid].curselection()
-                    self.stack.append(self.tk_refs[wid].get(sel[0]) if sel else "")
-                except: self.stack.append("")
-            else: self.stack.append("")
-
-        elif op == 'TK_LISTBOX_INDEX':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try:
-                    sel = self.tk_refs[wid].curselection()
-                    self.stack.append(sel[0] if sel else -1)
-                except: self.stack.append(-1)
-            else: self.stack.append(-1)
-
-        elif op == 'TK_FILEDIALOG_OPEN':
-            title = str(self.stack.pop())
-            if filedialog:
-                path = filedialog.askopenfilename(title=title)
-                self.stack.append(path if path else "")
-            else: self.stack.append("")
-
-        elif op == 'TK_FILEDIALOG_SAVE':
-            title = str(self.stack.pop())
-            if filedialog:
-                path = filedialog.asksaveasfilename(title=title)
-                self.stack.append(path if path else "")
-            else: self.stack.append("")
-
-        elif op == 'TK_ASKSTRING':
-            prompt = str(self.stack.pop())
-            title = str(self.stack.pop())
-            if simpledialog:
-                result = simpledialog.askstring(title, prompt)
-                self.stack.append(result if result else "")
-            else: self.stack.append("")
-
-        elif op == 'TK_ASKYESNO':
-            msg = str(self.stack.pop())
-            title = str(self.stack.pop())
-            if messagebox:
-                result = messagebox.askyesno(title, msg)
-                self.stack.append(1 if result else 0)
-            else: self.stack.append(0)
+    def _make_tk_event_callback(self, func_name):
+        """Crea closure per callback con evento (bind)"""
+        vm = self
+        def callback(event):
+            event_dict = {
+                '__type__': 'EVENT',
+                'x': getattr(event, 'x', 0),
+                'y': getattr(event, 'y', 0),
+                'key': getattr(event, 'keysym', ''),
+                'keycode': getattr(event, 'keycode', 0),
+                'char': getattr(event, 'char', ''),
+                'button': getattr(event, 'num', 0),
+            }
+            vm._call_ascension_func(func_name, [event_dict])
+        return callback
 
-        # --- CANVAS (v11.2) ---
-        elif op == 'TK_CANVAS_LINE':
-            color = str(self.stack.pop())
-            y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-            y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].create_line(x1,y1,x2,y2,fill=color))
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+    def _call_ascension_func(self, func_name, args):
+        """
+        Chiama una funzione Ascension dal codice Python (callback).
+        Rientra nello stesso motore di run(): la funzione viene invocata con
+        come indirizzo di ritorno la sentinella HALT in coda al programma,
+        così il RET finale restituisce il controllo a Python.
+        """
+        if func_name not in self.labels:
+            print(f"Warning: Callback function '{func_name}' not defined")
+            return
 
-        elif op == 'TK_CANVAS_RECT':
-            color = str(self.stack.pop())
-            y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-            y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].create_rectangle(x1,y1,x2,y2,fill=color))
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+        # Stato dell'esecuzione interrotta (es. il loop sospeso in tk_mainloop)
+        saved_ip = self.ip
+        stack_depth = len(self.stack)
+        frame_depth = len(self.local_frames)
+        call_depth = len(self.call_stack)
+        try_depth = len(self.try_stack)
 
-        elif op == 'TK_CANVAS_OVAL':
-            color = str(self.stack.pop())
-            y2 = int(self.stack.pop()); x2 = int(self.stack.pop())
-            y1 = int(self.stack.pop()); x1 = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].create_oval(x1,y1,x2,y2,fill=color))
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+        for arg in args:
+            self.stack.append(arg)
+        self.call_stack.append((len(self.code) - 1, frame_depth))
+        self.ip = self.labels[func_name]
 
-        elif op == 'TK_CANVAS_TEXT':
-            color = str(self.stack.pop())
-            text = str(self.stack.pop())
-            y = int(self.stack.pop()); x = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.stack.append(self.tk_refs[wid].create_text(x,y,text=text,fill=color))
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+        if not self._execute(try_base=try_depth):
+            print(f"Error in callback '{func_name}'")
 
-        elif op == 'TK_CANVAS_CLEAR':
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.tk_refs[wid].delete("all"); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+        # Scarta valore di ritorno ed eventuali frame lasciati da un errore
+        del self.stack[stack_depth:]
+        del self.local_frames[frame_depth:]
+        del self.call_stack[call_depth:]
+        del self.try_stack[try_depth:]
+        self.ip = saved_ip
 
-        elif op == 'TK_CANVAS_DELETE':
-            item_id = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.tk_refs[wid].delete(item_id); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
 
-        elif op == 'TK_CANVAS_MOVE':
-            dy = int(self.stack.pop()); dx = int(self.stack.pop())
-            item_id = int(self.stack.pop())
-            wid = int(self.stack.pop())
-            if wid in self.tk_refs:
-                try: self.tk_refs[wid].move(item_id, dx, dy); self.stack.append(1)
-                except: self.stack.append(0)
-            else: self.stack.append(0)
+# =============================================================================
+#                    ESPRESSIONI: LEXER E PARSER A PRECEDENZA
+# =============================================================================
 
-        # ----- HTTP (NETWORKING) -----
-        elif op == 'HTTP_GET':
-            url = str(self.stack.pop())
-            if requests:
-                try:
-                    r = requests.get(url, timeout=10)
-                    self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
-                except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
-            else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
-
-        elif op == 'HTTP_POST':
-            data = self.stack.pop(); url = str(self.stack.pop())
-            payload = {k:v for k,v in data.items() if k!='__type__'} if isinstance(data, dict) else str(data)
-            if requests:
-                try:
-                    r = requests.post(url, data=payload, timeout=10)
-                    self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': r.status_code, 'body': r.text})
-                except Exception as e: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': str(e)})
-            else: self.stack.append({'__type__': 'HTTP_RESPONSE', 'status': 0, 'body': "No requests lib"})
-
-        elif op == 'RESP_STATUS':
-            r = self.stack.pop(); self.stack.append(r.get('status', 0) if isinstance(r, dict) else 0)
-        elif op == 'RESP_BODY':
-            r = self.stack.pop(); self.stack.append(r.get('body', "") if isinstance(r, dict) else "")
-
-        # Default: opcode non gestito in _exec_opcode
-        else:
-            pass  # Alcuni opcode sono gestiti solo in run()
+# Caratteri significativi per lo split degli statement e dei blocchi
+SPLIT_MARKS = re.compile(r'["{}();]')
+BRACE_MARKS = re.compile(r'["{}]')
+ELSE_IF_HEADER = re.compile(r'else\s+if\s*\((.*?)\)\s*\{')
+ELSE_HEADER = re.compile(r'else\s*\{')
+
+# Un token per match, spazi iniziali ignorati: stringa "..." (con escape),
+# numero, nome, operatore
+EXPR_TOKEN = re.compile(
+    r'\s*(?:(?P<str>"(?:[^"\\]|\\.)*")|(?P<num>\d+(?:\.\d*)?|\.\d+)|(?P<name>[A-Za-z_]\w*)'
+    r'|(?P<op>&&|\|\||==|!=|>=|<=|[-+*/%<>!()\[\]{},.:]))')
+
+# Operatori binari: token -> (precedenza, opcode), tutti associativi a
+# sinistra tranne && e ||. Ogni operatore ha un livello proprio (&& lega meno
+# di ||, + meno di -, * meno di /), come il parser a scansione delle versioni
+# precedenti: gli script esistenti producono lo stesso bytecode.
+BINARY_PRECEDENCE = {
+    '&&': (1, 'AND'), '||': (2, 'OR'),
+    '==': (3, 'EQ'), '!=': (4, 'NEQ'), '>=': (5, 'GTE'), '<=': (6, 'LTE'), '>': (7, 'GT'), '<': (8, 'LT'),
+    '+': (9, 'ADD'), '-': (10, 'SUB'), '*': (11, 'MUL'), '/': (12, 'DIV'), '%': (13, 'MOD'),
+}
+RIGHT_ASSOC = ('&&', '||')
+NOT_PRECEDENCE = 3      # ! nega tutto il suo operando, fino al primo && / ||
+UNARY_PRECEDENCE = 14   # - unario lega più di ogni operatore binario
+
+# Nomi riservati valutati come costanti (NULL diventa PUSH_NULL)
+NAMED_CONSTANTS = {'true': 1, 'false': 0, 'PI': math.pi, 'E': math.e}
+
+# Built-in delle espressioni: nome -> (opcode, argomenti obbligatori,
+# letterali di default per quelli facoltativi). Argomenti None = numero
+# libero, tutti valutati in ordine. Hanno la precedenza sulle funzioni utente.
+EXPR_BUILTINS = {
+    # DNS
+    'get_ip': ('GET_IP', 1, ()),
+    # Tkinter
+    'tk_root': ('TK_ROOT', 1, ()), 'tk_mainloop': ('TK_MAINLOOP', 0, ()),
+    'tk_widget': ('TK_WIDGET', 3, ()), 'tk_pack': ('TK_PACK', 2, ()), 'tk_grid': ('TK_GRID', 2, ()),
+    'tk_config': ('TK_CONFIG', 2, ()), 'tk_msgbox': ('TK_MSGBOX', 2, ()), 'tk_get': ('TK_GET', 1, ()),
+    'tk_command': ('TK_COMMAND', 2, ()), 'tk_bind': ('TK_BIND', 3, ()), 'tk_after': ('TK_AFTER', 2, ()),
+    'tk_after_cancel': ('TK_AFTER_CANCEL', 1, ()), 'tk_update': ('TK_UPDATE', 0, ()),
+    'tk_destroy': ('TK_DESTROY', 1, ()), 'tk_set': ('TK_SET', 2, ()), 'tk_clear': ('TK_CLEAR', 1, ()),
+    'tk_focus': ('TK_FOCUS', 1, ()), 'tk_geometry': ('TK_GEOMETRY', 1, ()), 'tk_title': ('TK_TITLE', 1, ()),
+    'tk_resizable': ('TK_RESIZABLE', 2, ()), 'tk_text_get': ('TK_TEXT_GET', 1, ()),
+    'tk_text_insert': ('TK_TEXT_INSERT', 3, ()), 'tk_listbox_add': ('TK_LISTBOX_ADD', 2, ()),
+    'tk_listbox_get': ('TK_LISTBOX_GET', 1, ()), 'tk_listbox_index': ('TK_LISTBOX_INDEX', 1, ()),
+    'tk_filedialog_open': ('TK_FILEDIALOG_OPEN', 1, ()), 'tk_filedialog_save': ('TK_FILEDIALOG_SAVE', 1, ()),
+    'tk_askstring': ('TK_ASKSTRING', 2, ()), 'tk_askyesno': ('TK_ASKYESNO', 2, ()),
+    'tk_canvas_line': ('TK_CANVAS_LINE', None, ()), 'tk_canvas_rect': ('TK_CANVAS_RECT', None, ()),
+    'tk_canvas_oval': ('TK_CANVAS_OVAL', None, ()), 'tk_canvas_text': ('TK_CANVAS_TEXT', None, ()),
+    'tk_canvas_clear': ('TK_CANVAS_CLEAR', 1, ()), 'tk_canvas_delete': ('TK_CANVAS_DELETE', 2, ()),
+    'tk_canvas_move': ('TK_CANVAS_MOVE', None, ()),
+    # Socket
+    'socket_open': ('SOCKET_OPEN', 2, ()), 'socket_bind': ('SOCKET_BIND', 3, ()),
+    'socket_listen': ('SOCKET_LISTEN', 2, ()), 'socket_accept': ('SOCKET_ACCEPT', 1, ()),
+    'socket_connect': ('SOCKET_CONNECT', 3, ()), 'socket_send': ('SOCKET_SEND', 2, ()),
+    'socket_recv': ('SOCKET_RECV', 2, ()), 'socket_close': ('SOCKET_CLOSE', 1, ()),
+    # Standard
+    'read': ('READ', 0, ()), 'len': ('LEN', 1, ()), 'keys': ('KEYS', 1, ()),
+    'to_int': ('TO_INT', 1, ()), 'to_float': ('TO_FLOAT', 1, ()),
+    'substr': ('SUBSTR', 3, ()), 'chr': ('CHR', 1, ()),
+    # Matrici
+    'matrix': ('CREATE_MATRIX', 2, (0,)), 'rows': ('MATRIX_ROWS', 1, ()),
+    'cols': ('MATRIX_COLS', 1, ()), 'dim': ('MATRIX_DIM', 1, ()),
+    # Matematica
+    'sqrt': ('SQRT', 1, ()), 'pow': ('POW', 2, ()), 'exp': ('EXP', 1, ()), 'log': ('LOG', 1, ()),
+    'abs': ('ABS', 1, ()), 'floor': ('FLOOR', 1, ()), 'ceil': ('CEIL', 1, ()),
+    'sin': ('SIN', 1, ()), 'cos': ('COS', 1, ()), 'tan': ('TAN', 1, ()),
+    'asin': ('ASIN', 1, ()), 'acos': ('ACOS', 1, ()), 'atan': ('ATAN', 1, ()), 'atan2': ('ATAN2', 2, ()),
+    # Sistema
+    'system': ('SYSTEM', 1, ()), 'exec': ('EXEC', 1, ()),
+    # File I/O
+    'open': ('FILE_OPEN', 2, ()), 'write': ('FILE_WRITE', 2, ()), 'read_line': ('FILE_READLINE', 1, ()),
+    'read_all': ('FILE_READALL', 1, ()), 'close': ('FILE_CLOSE', 1, ()),
+    # Curses
+    'curses_init': ('CURSES_INIT', 0, ()), 'curses_end': ('CURSES_END', 0, ()),
+    'curses_clear': ('CURSES_CLEAR', 0, ()), 'curses_refresh': ('CURSES_REFRESH', 0, ()),
+    'curses_move': ('CURSES_MOVE', 2, ()), 'curses_write': ('CURSES_WRITE', 1, ()),
+    'curses_read_key': ('CURSES_READ_KEY', 0, ()),
+    # HTTP
+    'http_get': ('HTTP_GET', 1, ()), 'http_post': ('HTTP_POST', 2, ()),
+    'response_status': ('RESP_STATUS', 1, ()), 'response_body': ('RESP_BODY', 1, ()),
+}
+
+# Built-in con più forme: numero di argomenti -> (opcode, argomento)
+VARIANT_BUILTINS = {
+    'random': {0: ('RANDOM', None), 1: ('RANDOM_MAX', None), 2: ('RANDOM_RANGE', None)},
+}
+
+# Built-in di libreria con più forme: come LIBRARY_BUILTINS, una funzione
+# utente con lo stesso nome ha la precedenza. sb_append(sb, x, ...) accoda
+# un numero libero di valori.
+LIBRARY_VARIANTS = {
+    'memo_size': {1: ('MEMO_SIZE', None), 2: ('MEMO_RESIZE', None)},
+    'sb_new': {0: ('SB_NEW', 0), 1: ('SB_NEW', 1)},
+    'sb_append': {},
+}
+
+
+class ExpressionParser:
+    """
+    Parser delle espressioni: il testo viene tokenizzato una volta sola e
+    l'AST costruito per precedenza (Pratt), in tempo lineare. I nodi sono
+    tuple:
+      ('lit', testo)              letterale numerico o stringa, come nel sorgente
+      ('name', nome)              variabile o costante (NULL, true, PI, ...)
+      ('bin', opcode, a, b)       operatore binario
+      ('not', x) / ('neg', x)     ! e - unari
+      ('call', nome, args)        chiamata (built-in o funzione utente)
+      ('new', struct)             istanza di struct
+      ('index', nome, indici)     nome[i], nome[i, j] o nome[i][j]
+      ('attr', x, campo)          accesso a campo
+      ('array', elementi) / ('dict', [(chiave, valore), ...])
+    """
+    def __init__(self, text):
+        self.text = text
+        self.tokens = self.tokenize(text)
+        self.pos = 0
+
+    def tokenize(self, text):
+        tokens = []; pos = 0
+        for m in EXPR_TOKEN.finditer(text):
+            # Un buco tra due token è un carattere che nessuna regola accetta
+            if m.start() != pos: break
+            kind = m.lastgroup
+            tokens.append((kind, m.group(kind)))
+            pos = m.end()
+        if text[pos:].strip(): self.error(f"carattere inatteso '{text[pos:].lstrip()[0]}'")
+        tokens.append(('end', ''))
+        return tokens
+
+    def error(self, msg):
+        raise AscensionException(f"Espressione non valida ({msg}): {self.text}", "SyntaxError")
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        tok = self.tokens[self.pos]
+        if tok[0] == 'end': self.error("fine inattesa")
+        self.pos += 1
+        return tok
+
+    def expect(self, op):
+        if self.next() != ('op', op): self.error(f"atteso '{op}'")
+
+    def parse(self):
+        node = self.binary(0)
+        if self.peek()[0] != 'end': self.error(f"token inatteso '{self.peek()[1]}'")
+        return node
+
+    def binary(self, min_prec):
+        left = self.unary(min_prec)
+        while True:
+            kind, tok = self.tokens[self.pos]
+            info = BINARY_PRECEDENCE.get(tok) if kind == 'op' else None
+            if info is None or info[0] < min_prec: return left
+            self.pos += 1
+            prec, opcode = info
+            right = self.binary(prec if tok in RIGHT_ASSOC else prec + 1)
+            left = ('bin', opcode, left, right)
+
+    def unary(self, min_prec):
+        tok = self.peek()
+        if tok == ('op', '!'):
+            self.pos += 1
+            return ('not', self.binary(max(min_prec, NOT_PRECEDENCE)))
+        if tok == ('op', '-'):
+            self.pos += 1
+            # -5 resta un unico letterale
+            if self.peek()[0] == 'num': return ('lit', '-' + self.next()[1])
+            return ('neg', self.unary(UNARY_PRECEDENCE))
+        return self.postfix()
+
+    def postfix(self):
+        kind, tok = self.next()
+        if kind in ('str', 'num'): node = ('lit', tok)
+        elif kind == 'name':
+            nxt = self.peek()
+            if tok == 'new' and nxt[0] == 'name':
+                node = ('new', self.next()[1])
+                # new Nome(...): gli argomenti non sono usati
+                if self.peek() == ('op', '('): self.pos += 1; self.sequence(')')
+            elif nxt == ('op', '('):
+                self.pos += 1; node = ('call', tok, self.sequence(')'))
+            elif nxt == ('op', '['):
+                self.pos += 1; idx = self.sequence(']')
+                if len(idx) == 1 and self.peek() == ('op', '['):
+                    self.pos += 1; idx += self.sequence(']')
+                if not 1 <= len(idx) <= 2: self.error(f"indici di '{tok}'")
+                node = ('index', tok, idx)
+            else: node = ('name', tok)
+        elif tok == '(' and kind == 'op':
+            node = self.binary(0); self.expect(')')
+        elif tok == '[' and kind == 'op': node = ('array', self.sequence(']'))
+        elif tok == '{' and kind == 'op': node = ('dict', self.pairs())
+        else: self.error(f"token inatteso '{tok}'")
+        while self.peek() == ('op', '.'):
+            self.pos += 1
+            kind, field = self.next()
+            if kind != 'name': self.error("nome di campo atteso dopo '.'")
+            node = ('attr', node, field)
+        if self.peek() == ('op', '['): self.error("indicizzazione ammessa solo su variabili")
+        return node
+
+    def sequence(self, close):
+        """Elementi separati da virgola fino a close (virgola finale ammessa)."""
+        items = []
+        while self.peek() != ('op', close):
+            items.append(self.binary(0))
+            if self.peek() != ('op', close): self.expect(',')
+        self.pos += 1
+        return items
+
+    def pairs(self):
+        """Coppie chiave: valore di un dict fino a }; le chiavi sono letterali."""
+        pairs = []
+        while self.peek() != ('op', '}'):
+            kind, key = self.next()
+            if kind not in ('str', 'name', 'num'): self.error("chiave di dict non valida")
+            self.expect(':')
+            pairs.append((key[1:-1] if kind == 'str' else key, self.binary(0)))
+            if self.peek() != ('op', '}'): self.expect(',')
+        self.pos += 1
+        return pairs
 
 
 # ==========================================
 #  COMPILER v11.2 (Extended Tkinter)
 # ==========================================
 
+# Statement di primo livello per sorgente, condivisi da tutti i compilatori
+# del processo: la shell crea un compilatore per ogni input e un modulo
+# già incluso non viene riscandito.
+PARSED_SOURCES = MemoCache(256)
+
 # =============================================================================
 #                              COMPILATORE
 # =============================================================================
@@ -1822,29 +3255,6 @@ class AscensionCompiler:
     - Parsa le definizioni di struct e funzioni
     - Genera bytecode per ogni istruzione
     """
-    def extract_balanced_arg(self, expr, func_name):
-        prefix = func_name + '('
-        if not expr.startswith(prefix): return None
-        paren_depth = 0
-        brace_depth = 0
-        in_string = False
-        start = len(prefix)
-        for i, c in enumerate(expr[start:], start):
-            if c == '"' and (i == 0 or expr[i-1] != '\\'):
-                in_string = not in_string
-            if not in_string:
-                if c == '(': paren_depth += 1
-                elif c == ')':
-                    if paren_depth == 0 and brace_depth == 0:
-                        if i == len(expr) - 1:
-                            return expr[start:i]
-                        else:
-                            return None
-                    paren_depth -= 1
-                elif c == '{': brace_depth += 1
-                elif c == '}': brace_depth -= 1
-        return None
-
     def extract_braced_block(self, text, start_pos):
         """
         Estrae un blocco tra graffe bilanciate.
@@ -1853,14 +3263,15 @@ class AscensionCompiler:
         """
         if start_pos >= len(text) or text[start_pos] != '{': return None, -1
         depth = 0; in_string = False
-        for i in range(start_pos, len(text)):
-            c = text[i]
-            if c == '"' and (i == 0 or text[i-1] != '\\'): in_string = not in_string
-            if not in_string:
-                if c == '{': depth += 1
-                elif c == '}':
-                    depth -= 1
-                    if depth == 0: return text[start_pos+1:i], i + 1
+        for m in BRACE_MARKS.finditer(text, start_pos):
+            i = m.start(); c = text[i]
+            if c == '"':
+                if i == 0 or text[i-1] != '\\': in_string = not in_string
+            elif in_string: continue
+            elif c == '{': depth += 1
+            else:
+                depth -= 1
+                if depth == 0: return text[start_pos+1:i], i + 1
         return None, -1
 
     def __init__(self):
@@ -1868,18 +3279,40 @@ class AscensionCompiler:
         self.structs = {}
         self.label_counter = 0
         self.in_function = False
+        self.try_depth = 0  # blocchi try aperti: niente chiamate in coda
+        self.memo_function = None  # funzione memo in compilazione
         self.loop_stack = []
         self.base_dir = "."
         # NEW v12.4: Prototipi funzione (forward declarations)
         self.function_prototypes = {}  # nome -> lista parametri
         self.function_defined = set()  # funzioni con corpo definito
+        self.includes = {}  # file incluso (relativo a base_dir) -> hash del contenuto
+        self.modules = set()  # percorsi reali dei moduli già compilati nel programma
+        self.module_sources = {}  # percorso reale -> sorgente, letto una volta sola
         self.builtin_keywords = [
-            'if', 'while', 'for', 'print', 'switch', 'try', 'throw', 'return',
+            'if', 'while', 'for', 'foreach', 'print', 'switch', 'try', 'throw', 'return',
             'read', 'len', 'keys', 'to_int', 'to_float',
             # NEW: DNS
             'get_ip',
             # NEW v12.4: System commands
             'system', 'exec',
+            # Memoizzazione
+            'memo_clear', 'memo_size', 'memo_stats',
+            # Array tipizzati
+            'farray', 'iarray', 'aview', 'afill',
+            # Algebra matriciale
+            'matmul', 'transpose', 'madd', 'msub', 'mscale', 'hadamard', 'mapply',
+            # Reti neurali
+            'nn_create', 'nn_forward', 'nn_train', 'nn_predict_batch', 'nn_weights', 'nn_bias',
+            # String builder
+            'sb_new', 'sb_append', 'sb_str',
+            # Stringhe native
+            'find', 'rfind', 'split', 'join', 'replace', 'trim', 'upper', 'lower',
+            'starts_with', 'ends_with', 'repeat',
+            # Espressioni regolari
+            're_match', 're_search', 're_findall', 're_sub', 're_split',
+            # Ordinamento
+            'sort', 'sort_desc', 'sort_by', 'bsearch',
             # NEW v12.7: Math functions
             'random', 'sqrt', 'pow', 'exp', 'log', 'abs', 'floor', 'ceil',
             'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2',
@@ -1909,16 +3342,14 @@ class AscensionCompiler:
         self.label_counter += 1
         return f"L{self.label_counter}_{s}"
 
-    def collect_prototypes(self, source):
+    def collect_prototypes(self, source, visited):
         """
         Prima passata: raccoglie tutti i prototipi e definizioni di funzione.
         Supporta sia prototipi (func nome(args);) che definizioni complete.
-        Gestisce anche file inclusi ricorsivamente.
+        Gestisce anche file inclusi ricorsivamente, visitando ogni modulo una
+        volta sola (visited: percorsi reali già visti, anche con include ciclici).
         """
-        cleaned = self.clean_source(source)
-        statements = self.smart_split(cleaned)
-        
-        for line in statements:
+        for line in self.preprocess(source):
             line = line.strip()
             if not line:
                 continue
@@ -1927,10 +3358,10 @@ class AscensionCompiler:
             if line.startswith('include '):
                 m = re.search(r'include\s+"([^"]+)"', line)
                 if m:
-                    filepath = os.path.join(self.base_dir, m.group(1))
-                    if os.path.exists(filepath):
-                        with open(filepath, 'r') as f:
-                            self.collect_prototypes(f.read())
+                    path, source = self.read_include(m.group(1))
+                    if source is not None and path not in visited:
+                        visited.add(path)
+                        self.collect_prototypes(source, visited)
                 continue
             
             # Prototipo: func nome(args);  (senza corpo)
@@ -1963,6 +3394,19 @@ class AscensionCompiler:
                 self.function_prototypes[func_name] = args
                 self.function_defined.add(func_name)
 
+    def preprocess(self, source):
+        """
+        Pulizia e split di un sorgente completo (file principale o include).
+        Il risultato è condiviso tra raccolta dei prototipi e compilazione
+        (e tra compilatori, vedi PARSED_SOURCES), così ogni file viene
+        scandito una volta sola.
+        """
+        statements = PARSED_SOURCES.get(source)
+        if statements is UNSET:
+            statements = self.smart_split(self.clean_source(source))
+            PARSED_SOURCES.put(source, statements)
+        return statements
+
     def clean_source(self, source):
         """
         Pulisce il codice sorgente.
@@ -1992,35 +3436,64 @@ class AscensionCompiler:
         return " ".join(cleaned)
 
     def smart_split(self, source):
-        statements = []; current = ""; brace = 0; paren = 0; quote = False; i = 0
-        while i < len(source):
-            char = source[i]
-            if char == '"': quote = not quote
-            if not quote:
-                if char == '{': brace += 1
-                elif char == '}':
-                    brace -= 1; current += char
-                    # Solo splitta se NON siamo dentro parentesi
-                    if brace == 0 and paren == 0:
-                        rest = source[i+1:].lstrip()
-                        if rest and not rest.startswith('else') and not rest.startswith('catch'):
-                            if current.strip(): statements.append(current.strip())
-                            current = ""
-                    i += 1; continue
-                elif char == '(': paren += 1
-                elif char == ')': paren -= 1
-            if char == ';' and brace == 0 and paren == 0 and not quote:
-                if current.strip(): statements.append(current.strip())
-                current = ""
-            else: current += char
-            i += 1
-        if current.strip(): statements.append(current.strip())
+        """
+        Divide il sorgente ripulito negli statement di primo livello: ';' fuori
+        da graffe, parentesi e stringhe, oppure la '}' che chiude un blocco
+        (salvo un else/catch che lo prosegue). Un solo passaggio: si esaminano
+        solo i caratteri significativi e gli statement sono fette del sorgente.
+        """
+        statements = []; start = 0; brace = 0; paren = 0; quote = False; n = len(source)
+        for m in SPLIT_MARKS.finditer(source):
+            i = m.start(); char = source[i]
+            if char == '"':
+                if i == 0 or source[i-1] != '\\': quote = not quote
+            elif quote: continue
+            elif char == '{': brace += 1
+            elif char == '}':
+                brace -= 1
+                # Solo splitta se NON siamo dentro parentesi
+                if brace == 0 and paren == 0:
+                    j = i + 1
+                    while j < n and source[j].isspace(): j += 1
+                    if j < n and not source.startswith('else', j) and not source.startswith('catch', j):
+                        stmt = source[start:i+1].strip()
+                        if stmt: statements.append(stmt)
+                        start = i + 1
+            elif char == '(': paren += 1
+            elif char == ')': paren -= 1
+            elif brace == 0 and paren == 0:
+                stmt = source[start:i].strip()
+                if stmt: statements.append(stmt)
+                start = i + 1
+        stmt = source[start:].strip()
+        if stmt: statements.append(stmt)
         return statements
 
+    def assignment_operator(self, line):
+        """
+        Operatore di assegnamento di uno statement ('=', '+=', ...) cercato
+        fuori da stringhe e parentesi; None se lo statement non assegna.
+        ==, !=, <= e >= sono confronti, non assegnamenti.
+        """
+        depth = 0; quote = False; i = 0
+        while i < len(line):
+            c = line[i]
+            if c == '"' and (i == 0 or line[i-1] != '\\'): quote = not quote
+            elif not quote:
+                if c in '([{': depth += 1
+                elif c in ')]}': depth -= 1
+                elif c == '=' and depth == 0:
+                    if line[i+1:i+2] == '=': i += 2; continue
+                    prev = line[i-1:i]
+                    if prev in ('!', '<', '>'): i += 1; continue
+                    return prev + '=' if prev and prev in '+-*/%' else '='
+            i += 1
+        return None
+
     def split_args(self, args_str):
         args = []; current = ""; paren = 0; brace = 0; bracket = 0; quote = False
-        for c in args_str:
-            if c == '"': quote = not quote
+        for i, c in enumerate(args_str):
+            if c == '"' and (i == 0 or args_str[i-1] != '\\'): quote = not quote
             if not quote:
                 if c == '(': paren += 1
                 elif c == ')': paren -= 1
@@ -2035,567 +3508,122 @@ class AscensionCompiler:
         if current.strip(): args.append(current.strip())
         return args
 
-    def _split_dict_pairs(self, content):
-        """Splitta il contenuto di un dict in coppie (key, value)"""
-        pairs = []
-        current = ""
-        paren = 0; brace = 0; quote = False
-
-        for c in content:
-            if c == '"': quote = not quote
-            if not quote:
-                if c == '(': paren += 1
-                elif c == ')': paren -= 1
-                elif c == '{': brace += 1
-                elif c == '}': brace -= 1
-            if c == ',' and paren == 0 and brace == 0 and not quote:
-                if current.strip():
-                    pair = current.strip()
-                    if ':' in pair:
-                        # Trova il primo : fuori da stringhe
-                        colon_idx = self._find_colon(pair)
-                        if colon_idx > 0:
-                            key = pair[:colon_idx].strip()
-                            val = pair[colon_idx+1:].strip()
-                            pairs.append((key, val))
-                current = ""
-            else:
-                current += c
-
-        # Ultimo elemento
-        if current.strip():
-            pair = current.strip()
-            if ':' in pair:
-                colon_idx = self._find_colon(pair)
-                if colon_idx > 0:
-                    key = pair[:colon_idx].strip()
-                    val = pair[colon_idx+1:].strip()
-                    pairs.append((key, val))
-
-        return pairs
-
-    def _find_colon(self, s):
-        """Trova il primo : fuori da stringhe"""
-        quote = False
-        for i, c in enumerate(s):
-            if c == '"': quote = not quote
-            if c == ':' and not quote:
-                return i
-        return -1
-
     def parse_expression(self, expr):
         """
-        Parsa un'espressione e genera bytecode.
-        Gestisce operatori, chiamate, accessi a struct/array.
+        Compila un'espressione in bytecode: tokenizzazione in un solo
+        passaggio, AST per precedenza (ExpressionParser), poi emissione.
         """
         expr = expr.strip()
         if not expr: return
-        # Controlla se è una stringa semplice (una sola stringa, non "a" + "b")
-        if expr.startswith('"') and expr.endswith('"'):
-            # Verifica che ci sia una sola stringa contando le virgolette non escaped
-            quote_count = 0
-            i = 0
-            while i < len(expr):
-                if expr[i] == '"' and (i == 0 or expr[i-1] != '\\'):
-                    quote_count += 1
-                i += 1
-            # Se ci sono esattamente 2 virgolette, è una stringa semplice
-            if quote_count == 2:
-                self.ops.append(('PUSH', expr))
-                return
-
-        # --- NEW: DNS Binding (v11.1) ---
-        arg = self.extract_balanced_arg(expr, 'get_ip');
-        if arg: self.parse_expression(arg); self.ops.append(('GET_IP', None)); return
-
-        # --- TKINTER BINDINGS (v11.0) ---
-        arg = self.extract_balanced_arg(expr, 'tk_root');
-        if arg is not None: self.parse_expression(arg); self.ops.append(('TK_ROOT', None)); return
-
-        if re.match(r'^tk_mainloop\s*\(\s*\)$', expr): self.ops.append(('TK_MAINLOOP', None)); return
-
-        arg_str = self.extract_balanced_arg(expr, 'tk_widget');
-        if arg_str is not None:
-            args = self.split_args(arg_str)
-            if len(args) == 3:
-                self.parse_expression(args[0]); self.parse_expression(args[1]); self.parse_expression(args[2])
-                self.ops.append(('TK_WIDGET', None)); return
-
-        arg_str = self.extract_balanced_arg(expr, 'tk_pack');
-        if arg_str is not None:
-            args = self.split_args(arg_str)
-            if len(args) == 2:
-                self.parse_expression(args[0]); self.parse_expression(args[1])
-                self.ops.append(('TK_PACK', None)); return
-
-        arg_str = self.extract_balanced_arg(expr, 'tk_grid');
-        if arg_str is not None:
-            args = self.split_args(arg_str)
-            if len(args) == 2:
-                self.parse_expression(args[0]); self.parse_expression(args[1])
-                self.ops.append(('TK_GRID', None)); return
-
-        arg_str = self.extract_balanced_arg(expr, 'tk_config');
-        if arg_str is not None:
-            args = self.split_args(arg_str)
-            if len(args) == 2:
-                self.parse_expression(args[0]); self.parse_expression(args[1])
-                self.ops.append(('TK_CONFIG', None)); return
-
-        arg_str = self.extract_balanced_arg(expr, 'tk_msgbox');
-        if arg_str is not None:
-            args = self.split_args(arg_str)
-            if len(args) == 2:
-                self.parse_expression(args[0]); self.parse_expression(args[1])
-                self.ops.append(('TK_MSGBOX', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_get');
-        if arg is not None: self.parse_expression(arg); self.ops.append(('TK_GET', None)); return
-
-        # --- TKINTER EXTENDED BINDINGS (v11.2) ---
-        arg = self.extract_balanced_arg(expr, 'tk_command');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_COMMAND', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_bind');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.parse_expression(a[2]); self.ops.append(('TK_BIND', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_after');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_AFTER', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_after_cancel');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_AFTER_CANCEL', None)); return
-
-        if re.match(r'^tk_update\s*\(\s*\)$', expr): self.ops.append(('TK_UPDATE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_destroy');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_DESTROY', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_set');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_SET', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_clear');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_CLEAR', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_focus');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_FOCUS', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_geometry');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_GEOMETRY', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_title');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_TITLE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_resizable');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_RESIZABLE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_text_get');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_TEXT_GET', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_text_insert');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.parse_expression(a[2]); self.ops.append(('TK_TEXT_INSERT', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_listbox_add');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_LISTBOX_ADD', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_listbox_get');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_LISTBOX_GET', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_listbox_index');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_LISTBOX_INDEX', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_filedialog_open');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_FILEDIALOG_OPEN', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_filedialog_save');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_FILEDIALOG_SAVE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_askstring');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_ASKSTRING', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_askyesno');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_ASKYESNO', None)); return
-
-        # Canvas
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_line');
-        if arg: a=self.split_args(arg); [self.parse_expression(x) for x in a]; self.ops.append(('TK_CANVAS_LINE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_rect');
-        if arg: a=self.split_args(arg); [self.parse_expression(x) for x in a]; self.ops.append(('TK_CANVAS_RECT', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_oval');
-        if arg: a=self.split_args(arg); [self.parse_expression(x) for x in a]; self.ops.append(('TK_CANVAS_OVAL', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_text');
-        if arg: a=self.split_args(arg); [self.parse_expression(x) for x in a]; self.ops.append(('TK_CANVAS_TEXT', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_clear');
-        if arg: self.parse_expression(arg); self.ops.append(('TK_CANVAS_CLEAR', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_delete');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('TK_CANVAS_DELETE', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'tk_canvas_move');
-        if arg: a=self.split_args(arg); [self.parse_expression(x) for x in a]; self.ops.append(('TK_CANVAS_MOVE', None)); return
-
-        # --- SOCKETS BINDINGS (v11.0) ---
-        arg = self.extract_balanced_arg(expr, 'socket_open');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('SOCKET_OPEN', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_bind');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.parse_expression(a[2]); self.ops.append(('SOCKET_BIND', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_listen');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('SOCKET_LISTEN', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_accept');
-        if arg: self.parse_expression(arg); self.ops.append(('SOCKET_ACCEPT', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_connect');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.parse_expression(a[2]); self.ops.append(('SOCKET_CONNECT', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_send');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('SOCKET_SEND', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_recv');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('SOCKET_RECV', None)); return
-
-        arg = self.extract_balanced_arg(expr, 'socket_close');
-        if arg: self.parse_expression(arg); self.ops.append(('SOCKET_CLOSE', None)); return
-
-
-        # --- BUILT-IN STANDARD (v10.2) ---
-        if re.match(r'^read\s*\(\s*\)$', expr): self.ops.append(('READ', None)); return
-        arg = self.extract_balanced_arg(expr, 'len');
-        if arg: self.parse_expression(arg); self.ops.append(('LEN', None)); return
-        arg = self.extract_balanced_arg(expr, 'keys');
-        if arg: self.parse_expression(arg); self.ops.append(('KEYS', None)); return
-        arg = self.extract_balanced_arg(expr, 'to_int');
-        if arg: self.parse_expression(arg); self.ops.append(('TO_INT', None)); return
-        arg = self.extract_balanced_arg(expr, 'to_float');
-        if arg: self.parse_expression(arg); self.ops.append(('TO_FLOAT', None)); return
-
-        # --- SUBSTR (v12.5) ---
-        arg = self.extract_balanced_arg(expr, 'substr');
-        if arg:
-            a = self.split_args(arg)
-            self.parse_expression(a[0])  # string
-            self.parse_expression(a[1])  # start
-            self.parse_expression(a[2])  # length
-            self.ops.append(('SUBSTR', None))
-            return
+        self.emit_expression(ExpressionParser(expr).parse())
+
+    def emit_expression(self, node):
+        """Genera il bytecode di un nodo dell'AST delle espressioni."""
+        kind = node[0]
+        if kind == 'lit': self.ops.append(('PUSH', node[1]))
+        elif kind == 'name':
+            name = node[1]
+            if name == 'NULL': self.ops.append(('PUSH_NULL', None))
+            elif name in NAMED_CONSTANTS: self.ops.append(('PUSH', NAMED_CONSTANTS[name]))
+            else: self.ops.append(('LOAD', name))
+        elif kind == 'bin':
+            # Catena a sinistra (a + b + c ...) emessa senza ricorsione
+            chain = []
+            while node[0] == 'bin': chain.append(node); node = node[2]
+            self.emit_expression(node)
+            for _, opcode, _, right in reversed(chain):
+                self.emit_expression(right); self.ops.append((opcode, None))
+        elif kind == 'not': self.emit_expression(node[1]); self.ops.append(('NOT', None))
+        elif kind == 'neg':
+            self.ops.append(('PUSH', 0)); self.emit_expression(node[1]); self.ops.append(('SUB', None))
+        elif kind == 'call': self.emit_call(node[1], node[2])
+        elif kind == 'new': self.ops.append(('NEW_STRUCT', node[1]))
+        elif kind == 'index':
+            for idx in node[2]: self.emit_index(idx)
+            self.ops.append(('LOAD_IDX' if len(node[2]) == 1 else 'LOAD_IDX_2D', node[1]))
+        elif kind == 'attr': self.emit_expression(node[1]); self.ops.append(('GET_ATTR', node[2]))
+        elif kind == 'array':
+            for item in node[1]: self.emit_expression(item)
+            self.ops.append(('BUILD_ARRAY', len(node[1])))
+        elif kind == 'dict':
+            self.ops.append(('PUSH_DICT', None))
+            for key, val in node[1]:
+                self.emit_expression(val)
+                self.ops.append(('PUSH', f'"{key}"'))
+                self.ops.append(('DICT_SET', None))
 
-        # --- CHR (v12.5) ---
-        arg = self.extract_balanced_arg(expr, 'chr');
-        if arg:
-            self.parse_expression(arg)  # code
-            self.ops.append(('CHR', None))
-            return
+    def emit_index(self, node):
+        """Indice di array: un intero letterale va nel bytecode già convertito."""
+        if node[0] == 'lit' and node[1].lstrip('-').isdigit(): self.ops.append(('PUSH', int(node[1])))
+        else: self.emit_expression(node)
 
-        # --- MATRIX BUILT-IN (v12.3) ---
-        # matrix(rows, cols, init_value) - crea matrice inizializzata
-        arg = self.extract_balanced_arg(expr, 'matrix');
-        if arg:
-            a = self.split_args(arg)
-            if len(a) >= 2:
-                self.parse_expression(a[0])  # rows
-                self.parse_expression(a[1])  # cols
-                if len(a) >= 3:
-                    self.parse_expression(a[2])  # init value
-                else:
-                    self.ops.append(('PUSH', 0))  # default init = 0
-                self.ops.append(('CREATE_MATRIX', None))
-                return
-        
-        # rows(matrix) - ritorna numero righe
-        arg = self.extract_balanced_arg(expr, 'rows');
-        if arg: self.parse_expression(arg); self.ops.append(('MATRIX_ROWS', None)); return
-        
-        # cols(matrix) - ritorna numero colonne
-        arg = self.extract_balanced_arg(expr, 'cols');
-        if arg: self.parse_expression(arg); self.ops.append(('MATRIX_COLS', None)); return
-        
-        # dim(array) - ritorna dimensionalità (1 o 2)
-        arg = self.extract_balanced_arg(expr, 'dim');
-        if arg: self.parse_expression(arg); self.ops.append(('MATRIX_DIM', None)); return
-
-        # --- MATH FUNCTIONS (v12.7) ---
-        # random() - float tra 0.0 e 1.0
-        # random(max) - int tra 0 e max-1
-        # random(min, max) - int tra min e max-1
-        if re.match(r'^random\s*\(\s*\)$', expr):
-            self.ops.append(('RANDOM', None)); return
-        arg = self.extract_balanced_arg(expr, 'random');
-        if arg:
-            a = self.split_args(arg)
-            if len(a) == 1:
-                self.parse_expression(a[0])
-                self.ops.append(('RANDOM_MAX', None))
-            elif len(a) == 2:
-                self.parse_expression(a[0])
-                self.parse_expression(a[1])
-                self.ops.append(('RANDOM_RANGE', None))
-            return
-        
-        # sqrt(x) - radice quadrata
-        arg = self.extract_balanced_arg(expr, 'sqrt');
-        if arg: self.parse_expression(arg); self.ops.append(('SQRT', None)); return
-        
-        # pow(base, exp) - potenza
-        arg = self.extract_balanced_arg(expr, 'pow');
-        if arg:
-            a = self.split_args(arg)
-            self.parse_expression(a[0])
-            self.parse_expression(a[1])
-            self.ops.append(('POW', None))
+    def emit_call(self, name, args):
+        """
+        Chiamata: built-in (EXPR_BUILTINS, VARIANT_BUILTINS), poi built-in
+        di libreria (LIBRARY_BUILTINS, LIBRARY_VARIANTS) se il programma non
+        definisce una funzione omonima, infine CALL della funzione utente.
+        """
+        user = name in self.function_prototypes
+        spec = EXPR_BUILTINS.get(name)
+        if spec is None and name in LIBRARY_BUILTINS and not user:
+            spec = (name.upper(),) + LIBRARY_BUILTINS[name]
+        if spec is not None:
+            opcode, nmin, defaults = spec
+            if nmin is not None and not nmin <= len(args) <= nmin + len(defaults):
+                raise AscensionException(f"{name}: numero di argomenti errato ({len(args)})", "SyntaxError")
+            for arg in args: self.emit_expression(arg)
+            if nmin is not None:
+                for default in defaults[len(args) - nmin:]: self.ops.append(('PUSH', default))
+            self.ops.append((opcode, None))
             return
-        
-        # exp(x) - e^x
-        arg = self.extract_balanced_arg(expr, 'exp');
-        if arg: self.parse_expression(arg); self.ops.append(('EXP', None)); return
-        
-        # log(x) - logaritmo naturale
-        arg = self.extract_balanced_arg(expr, 'log');
-        if arg: self.parse_expression(arg); self.ops.append(('LOG', None)); return
-        
-        # abs(x) - valore assoluto
-        arg = self.extract_balanced_arg(expr, 'abs');
-        if arg: self.parse_expression(arg); self.ops.append(('ABS', None)); return
-        
-        # floor(x) - arrotonda per difetto
-        arg = self.extract_balanced_arg(expr, 'floor');
-        if arg: self.parse_expression(arg); self.ops.append(('FLOOR', None)); return
-        
-        # ceil(x) - arrotonda per eccesso
-        arg = self.extract_balanced_arg(expr, 'ceil');
-        if arg: self.parse_expression(arg); self.ops.append(('CEIL', None)); return
-        
-        # sin(x), cos(x), tan(x) - trigonometriche
-        arg = self.extract_balanced_arg(expr, 'sin');
-        if arg: self.parse_expression(arg); self.ops.append(('SIN', None)); return
-        arg = self.extract_balanced_arg(expr, 'cos');
-        if arg: self.parse_expression(arg); self.ops.append(('COS', None)); return
-        arg = self.extract_balanced_arg(expr, 'tan');
-        if arg: self.parse_expression(arg); self.ops.append(('TAN', None)); return
-        
-        # asin(x), acos(x), atan(x) - trigonometriche inverse
-        arg = self.extract_balanced_arg(expr, 'asin');
-        if arg: self.parse_expression(arg); self.ops.append(('ASIN', None)); return
-        arg = self.extract_balanced_arg(expr, 'acos');
-        if arg: self.parse_expression(arg); self.ops.append(('ACOS', None)); return
-        arg = self.extract_balanced_arg(expr, 'atan');
-        if arg: self.parse_expression(arg); self.ops.append(('ATAN', None)); return
-        
-        # atan2(y, x) - arcotangente a due argomenti
-        arg = self.extract_balanced_arg(expr, 'atan2');
-        if arg:
-            a = self.split_args(arg)
-            self.parse_expression(a[0])
-            self.parse_expression(a[1])
-            self.ops.append(('ATAN2', None))
+        variants = VARIANT_BUILTINS.get(name)
+        if variants is None and name in LIBRARY_VARIANTS and not user: variants = LIBRARY_VARIANTS[name]
+        if variants is not None:
+            # sb_append(sb, x, ...): l'argomento è il numero di valori accodati
+            op = ('SB_APPEND', len(args) - 1) if name == 'sb_append' and args else variants.get(len(args))
+            if op is None:
+                raise AscensionException(f"{name}: numero di argomenti errato ({len(args)})", "SyntaxError")
+            for arg in args: self.emit_expression(arg)
+            self.ops.append(op)
             return
-        
-        # PI e E come costanti
-        if expr == 'PI': self.ops.append(('PUSH', math.pi)); return
-        if expr == 'E': self.ops.append(('PUSH', math.e)); return
-
-        # --- SYSTEM COMMANDS (v12.4) ---
-        arg = self.extract_balanced_arg(expr, 'system');
-        if arg: self.parse_expression(arg); self.ops.append(('SYSTEM', None)); return
-        arg = self.extract_balanced_arg(expr, 'exec');
-        if arg: self.parse_expression(arg); self.ops.append(('EXEC', None)); return
-
-        # --- FILE I/O ---
-        arg = self.extract_balanced_arg(expr, 'open');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('FILE_OPEN', None)); return
-        arg = self.extract_balanced_arg(expr, 'write');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('FILE_WRITE', None)); return
-        arg = self.extract_balanced_arg(expr, 'read_line');
-        if arg: self.parse_expression(arg); self.ops.append(('FILE_READLINE', None)); return
-        arg = self.extract_balanced_arg(expr, 'read_all');
-        if arg: self.parse_expression(arg); self.ops.append(('FILE_READALL', None)); return
-        arg = self.extract_balanced_arg(expr, 'close');
-        if arg: self.parse_expression(arg); self.ops.append(('FILE_CLOSE', None)); return
-
-        # --- CURSES ---
-        if re.match(r'^curses_init\(\)$', expr): self.ops.append(('CURSES_INIT', None)); return
-        if re.match(r'^curses_end\(\)$', expr): self.ops.append(('CURSES_END', None)); return
-        if re.match(r'^curses_clear\(\)$', expr): self.ops.append(('CURSES_CLEAR', None)); return
-        if re.match(r'^curses_refresh\(\)$', expr): self.ops.append(('CURSES_REFRESH', None)); return
-        arg = self.extract_balanced_arg(expr, 'curses_move');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('CURSES_MOVE', None)); return
-        arg = self.extract_balanced_arg(expr, 'curses_write');
-        if arg: self.parse_expression(arg); self.ops.append(('CURSES_WRITE', None)); return
-        if re.match(r'^curses_read_key\(\)$', expr): self.ops.append(('CURSES_READ_KEY', None)); return
-
-        # --- NETWORKING (HTTP) ---
-        arg = self.extract_balanced_arg(expr, 'http_get');
-        if arg: self.parse_expression(arg); self.ops.append(('HTTP_GET', None)); return
-        arg = self.extract_balanced_arg(expr, 'http_post');
-        if arg: a=self.split_args(arg); self.parse_expression(a[0]); self.parse_expression(a[1]); self.ops.append(('HTTP_POST', None)); return
-        arg = self.extract_balanced_arg(expr, 'response_status');
-        if arg: self.parse_expression(arg); self.ops.append(('RESP_STATUS', None)); return
-        arg = self.extract_balanced_arg(expr, 'response_body');
-        if arg: self.parse_expression(arg); self.ops.append(('RESP_BODY', None)); return
-
-        if expr.startswith('new '): self.ops.append(('NEW_STRUCT', expr.split()[1].split('(')[0])); return
-
-        # --- LOGIC/MATH/PRECEDENCE (v10.2 Logic) ---
-        # IMPORTANTE: Questo deve venire PRIMA del check delle chiamate a funzione
-        # per gestire correttamente espressioni come: func(a) + func(b)
-        if ' && ' in expr: p=expr.split(' && ', 1); self.parse_expression(p[0]); self.parse_expression(p[1]); self.ops.append(('AND', None)); return
-        if ' || ' in expr: p=expr.split(' || ', 1); self.parse_expression(p[0]); self.parse_expression(p[1]); self.ops.append(('OR', None)); return
-        if expr.startswith('!') and not expr.startswith('!='): self.parse_expression(expr[1:]); self.ops.append(('NOT', None)); return
-
-        op_precedence = [('==','EQ'),('!=','NEQ'),('>=','GTE'),('<=','LTE'),('>','GT'),('<','LT'),('+', 'ADD'),('-','SUB'),('*','MUL'),('/','DIV'),('%','MOD')]
-        paren_depth = 0; bracket_depth = 0
-        for op_str, op_name in op_precedence:
-
-            paren_depth = 0; bracket_depth = 0; in_string = False; i = len(expr) - 1
-            while i >= 0:
-                c = expr[i]
-                if c == '"' and (i==0 or expr[i-1]!='\\'): in_string = not in_string
-                if not in_string:
-                    if c == ')': paren_depth += 1
-                    elif c == '(': paren_depth -= 1
-                    elif c == ']': bracket_depth += 1
-                    elif c == '[': bracket_depth -= 1
-                    if paren_depth == 0 and bracket_depth == 0 and i >= len(op_str) - 1:
-                        if expr[i-len(op_str)+1:i+1] == op_str:
-                            if op_str in ['>','<'] and i+1<len(expr) and expr[i+1]=='=': i-=1; continue
-                            if op_str == '-' and i==0: i-=1; continue
-                            left = expr[:i-len(op_str)+1].strip(); right = expr[i+1:].strip()
-                            if left and right: self.parse_expression(left); self.parse_expression(right); self.ops.append((op_name, None)); return
-                i -= 1
-
-        # --- FUNCTION CALL ---
-        # Ora viene DOPO il check degli operatori binari
-        func_match = re.match(r'^([a-zA-Z_]\w*)\s*\((.*)\)$', expr)
-        if func_match:
-            func_name = func_match.group(1)
-            if func_name not in self.builtin_keywords:
-                args = self.split_args(func_match.group(2))
-                for arg in args: self.parse_expression(arg)
-                self.ops.append(('CALL', func_name))
-                return
-
-        if expr.startswith('(') and expr.endswith(')'):
-            d=0; b=True
-            for i,c in enumerate(expr):
-                if c=='(': d+=1
-                elif c==')': d-=1
-                if d==0 and i<len(expr)-1: b=False; break
-            if b: self.parse_expression(expr[1:-1]); return
-
-        # --- VARS / LITERALS / IDX ---
-        # NULL, true, false come valori nativi (v12.4)
-        if expr == 'NULL': self.ops.append(('PUSH_NULL', None)); return
-        if expr == 'true': self.ops.append(('PUSH', 1)); return
-        if expr == 'false': self.ops.append(('PUSH', 0)); return
-        
-        if expr.startswith('"'): self.ops.append(('PUSH', expr))
-        elif expr == '{}': self.ops.append(('PUSH_DICT', None))
-        # Dict con contenuto: {"key": value, ...}
-        elif expr.startswith('{') and expr.endswith('}'):
-            self.ops.append(('PUSH_DICT', None))
-            content = expr[1:-1].strip()
-            if content:
-                # Parse key:value pairs
-                pairs = self._split_dict_pairs(content)
-                for key, val in pairs:
-                    # Push value
-                    self.parse_expression(val)
-                    # Push key (rimuovi quotes se presenti)
-                    clean_key = key.strip()
-                    if clean_key.startswith('"') and clean_key.endswith('"'):
-                        clean_key = clean_key[1:-1]
-                    self.ops.append(('PUSH', f'"{clean_key}"'))
-                    # Set attribute
-                    self.ops.append(('DICT_SET', None))
-        elif expr.replace('.','',1).lstrip('-').isdigit(): self.ops.append(('PUSH', expr))
-        elif '[' in expr:
-            bracket_start = expr.index('[')
-            arr_name = expr[:bracket_start]
-            
-            # Trova la fine della prima parentesi quadra
-            depth = 0; bracket_end = -1
-            for i in range(bracket_start, len(expr)):
-                if expr[i] == '[': depth += 1
-                elif expr[i] == ']':
-                    depth -= 1
-                    if depth == 0: bracket_end = i; break
-            
-            idx_content = expr[bracket_start+1:bracket_end]
-            rem = expr[bracket_end+1:]
-            
-            # Check per sintassi comma: arr[i,j]
-            if ',' in idx_content and not idx_content.startswith('"'):
-                # Sintassi arr[row, col]
-                parts = idx_content.split(',', 1)
-                row_idx = parts[0].strip()
-                col_idx = parts[1].strip()
-                # Push row index
-                if row_idx.lstrip('-').isdigit():
-                    self.ops.append(('PUSH', int(row_idx)))
-                else:
-                    self.parse_expression(row_idx)
-                # Push col index
-                if col_idx.lstrip('-').isdigit():
-                    self.ops.append(('PUSH', int(col_idx)))
-                else:
-                    self.parse_expression(col_idx)
-                self.ops.append(('LOAD_IDX_2D', arr_name))
-            # Check per sintassi C-style: arr[i][j]
-            elif rem.startswith('['):
-                # Trova la fine della seconda parentesi quadra
-                depth2 = 0; bracket_end2 = -1
-                for i in range(len(rem)):
-                    if rem[i] == '[': depth2 += 1
-                    elif rem[i] == ']':
-                        depth2 -= 1
-                        if depth2 == 0: bracket_end2 = i; break
-                
-                col_idx = rem[1:bracket_end2]
-                # Push row index (primo indice)
-                if idx_content.lstrip('-').isdigit():
-                    self.ops.append(('PUSH', int(idx_content)))
-                else:
-                    self.parse_expression(idx_content)
-                # Push col index (secondo indice)
-                if col_idx.lstrip('-').isdigit():
-                    self.ops.append(('PUSH', int(col_idx)))
-                else:
-                    self.parse_expression(col_idx)
-                self.ops.append(('LOAD_IDX_2D', arr_name))
-                rem = rem[bracket_end2+1:]  # Aggiorna remainder
-            else:
-                # Array 1D normale
-                if idx_content.lstrip('-').isdigit():
-                    self.ops.append(('PUSH', int(idx_content)))
-                else:
-                    self.parse_expression(idx_content)
-                self.ops.append(('LOAD_IDX', arr_name))
-            
-            # Gestisci accesso a campo dopo array (es: arr[i].campo)
-            if rem.startswith('.'):
-                field = rem[1:].split('[')[0].split('.')[0]  # Prendi solo il nome del campo
-                self.ops.append(('GET_ATTR', field))
-        elif '.' in expr and not expr.replace('.','',1).isdigit():
-            p = expr.split('.'); self.ops.append(('LOAD', p[0])); self.ops.append(('GET_ATTR', p[1]))
-        else: self.ops.append(('LOAD', expr))
+        # Una funzione utente può riusare il nome di un built-in di libreria
+        if name in self.builtin_keywords and name not in self.function_prototypes:
+            raise AscensionException(f"'{name}' non è utilizzabile in un'espressione", "SyntaxError")
+        for arg in args: self.emit_expression(arg)
+        self.ops.append(('CALL', name))
 
+    def read_include(self, filename):
+        """
+        Legge un file incluso e ne registra l'hash: la cache del bytecode resta
+        valida solo finché gli include non cambiano. Ritorna (percorso reale,
+        sorgente), con sorgente None se il file non esiste.
+        """
+        path = os.path.realpath(os.path.join(self.base_dir, filename))
+        source = self.module_sources.get(path)
+        if source is None:
+            if not os.path.exists(path): return path, None
+            with open(path, 'r') as f: source = self.module_sources[path] = f.read()
+        self.includes[filename] = content_hash(source)
+        return path, source
 
     def load_and_compile_file(self, filename):
-        filepath = os.path.join(self.base_dir, filename)
-        if not os.path.exists(filepath): raise FileNotFoundError(f"Errore include: '{filepath}'")
-        with open(filepath, 'r') as f: source = f.read()
+        """
+        Include-once: un modulo è compilato alla prima inclusione, quelle
+        successive (diamanti, cicli, ripetizioni) non emettono nulla.
+        """
+        path, source = self.read_include(filename)
+        if source is None: raise FileNotFoundError(f"Errore include: '{os.path.join(self.base_dir, filename)}'")
+        if path in self.modules: return
+        self.modules.add(path)
         self._compile_internal(source)
 
-    def _compile_internal(self, source):
+    def _compile_internal(self, source, nested=False):
         """
         Compila il codice sorgente in bytecode.
-        Metodo principale di compilazione ricorsivo.
+        Metodo principale di compilazione ricorsivo: con nested=True source è
+        il corpo di un blocco, già ripulito, e va solo diviso in statement.
         """
-        statements = self.smart_split(self.clean_source(source))
+        statements = self.smart_split(source) if nested else self.preprocess(source)
         for line in statements:
             line = line.strip()
             if not line: continue
@@ -2608,6 +3636,9 @@ class AscensionCompiler:
             if line.startswith('struct '):
                 m = re.search(r'struct\s+(\w+)\s*\{(.*?)\}', line)
                 if m: self.structs[m.group(1)] = [x.strip() for x in m.group(2).split(',') if x.strip()]; continue
+            # memo func nome(args) { ... }: risultati in cache per argomenti
+            memo = line.startswith('memo func ')
+            if memo: line = line[5:]
             if line.startswith('func '):
                 # Prototipo senza corpo: func nome(args); - già raccolto, skip
                 proto_match = re.match(r'func\s+(\w+)\s*\((.*?)\)\s*;?\s*$', line)
@@ -2631,12 +3662,23 @@ class AscensionCompiler:
                     
                     lbl_skip = self.get_label("skip"); self.ops.append(('JMP', lbl_skip)); self.ops.append(('LABEL', func_name))
                     old_in = self.in_function; self.in_function = True
+                    old_try = self.try_depth; self.try_depth = 0
+                    old_memo = self.memo_function; self.memo_function = func_name if memo else None
                     args = [x.strip() for x in m.group(2).split(',') if x.strip()]
-                    for a in reversed(args): self.ops.append(('STORE', a))
-                    self._compile_internal(m.group(3)); self.ops.append(('RET', None)); self.ops.append(('LABEL', lbl_skip))
-                    self.in_function = old_in; continue
+                    body_start = len(self.ops)
+                    self._compile_internal(m.group(3), nested=True); self.ops.append(('RET', None))
+                    self.ops[body_start:] = self.resolve_locals(self.ops[body_start:], args)
+                    if memo: self.ops[body_start] = ('MEMO_ENTER', self.ops[body_start][1] + (func_name,))
+                    self.ops.append(('LABEL', lbl_skip))
+                    self.in_function = old_in; self.try_depth = old_try
+                    self.memo_function = old_memo; continue
             if line.startswith('return'):
-                e = line[6:].strip(); self.parse_expression(e) if e else None; self.ops.append(('RET_VAL' if e else 'RET', None)); continue
+                e = line[6:].strip(); self.parse_expression(e) if e else None
+                # return f(...) dentro una funzione e fuori da try: chiamata in coda
+                if e and self.in_function and not self.try_depth and not self.memo_function and self.ops[-1][0] == 'CALL':
+                    self.ops[-1] = ('TAIL_CALL', self.ops[-1][1]); continue
+                if e and self.memo_function: self.ops.append(('MEMO_RET', self.memo_function)); continue
+                self.ops.append(('RET_VAL' if e else 'RET', None)); continue
             if line.startswith('throw '): self.parse_expression(line[6:].strip()); self.ops.append(('THROW', None)); continue
 
             # --- TRY / CATCH ---
@@ -2645,20 +3687,23 @@ class AscensionCompiler:
                 m = re.search(r'try\s*\{(.*?)\}\s*catch\s*\((\w+)\)\s*\{(.*?)\}', line)
                 if m:
                     lc=self.get_label("c"); le=self.get_label("e"); tb=m.group(1); ev=m.group(2); cb=m.group(3)
-                    self.ops.append(('TRY_START', lc)); self._compile_internal(tb); self.ops.append(('TRY_END', le))
+                    self.ops.append(('TRY_START', lc)); self.try_depth += 1; self._compile_internal(tb, nested=True); self.try_depth -= 1; self.ops.append(('TRY_END', le))
                     self.ops.append(('LABEL', lc)); self.ops.append(('CATCH_START', None)); self.ops.append(('STORE', ev))
-                    self._compile_internal(cb); self.ops.append(('CATCH_END', None)); self.ops.append(('LABEL', le)); continue
+                    self._compile_internal(cb, nested=True); self.ops.append(('CATCH_END', None)); self.ops.append(('LABEL', le)); continue
                 # Try con catch senza parametro: catch { }
                 m = re.search(r'try\s*\{(.*?)\}\s*catch\s*\{(.*?)\}', line)
                 if m:
                     lc=self.get_label("c"); le=self.get_label("e"); tb=m.group(1); cb=m.group(2)
-                    self.ops.append(('TRY_START', lc)); self._compile_internal(tb); self.ops.append(('TRY_END', le))
+                    self.ops.append(('TRY_START', lc)); self.try_depth += 1; self._compile_internal(tb, nested=True); self.try_depth -= 1; self.ops.append(('TRY_END', le))
                     self.ops.append(('LABEL', lc)); self.ops.append(('CATCH_START', None)); self.ops.append(('POP', None))
-                    self._compile_internal(cb); self.ops.append(('CATCH_END', None)); self.ops.append(('LABEL', le)); continue
+                    self._compile_internal(cb, nested=True); self.ops.append(('CATCH_END', None)); self.ops.append(('LABEL', le)); continue
 
             if line.startswith('global '):
                 m = re.match(r'global\s+(\w+)\s*=\s*(.+)', line)
                 if m: self.parse_expression(m.group(2)); self.ops.append(('STORE_GLOBAL', m.group(1))); continue
+                # Dichiarazione senza assegnamento: il nome resta globale nella funzione
+                m = re.match(r'global\s+(\w+)\s*$', line)
+                if m: self.ops.append(('GLOBAL_DECL', m.group(1))); continue
 
             if line.startswith('print('):
                 arg_s = re.search(r'print\((.*)\)', line).group(1)
@@ -2675,10 +3720,42 @@ class AscensionCompiler:
                     self.loop_stack.append((None, les))
                     for cv, cb in cases:
                         lnc=self.get_label("nc"); self.ops.append(('DUP', None)); self.parse_expression(cv); self.ops.append(('EQ', None)); self.ops.append(('JZ', lnc))
-                        self._compile_internal(cb); self.ops.append(('JMP', les)); self.ops.append(('LABEL', lnc))
-                    if df: self._compile_internal(df.group(1))
+                        self._compile_internal(cb, nested=True); self.ops.append(('JMP', les)); self.ops.append(('LABEL', lnc))
+                    if df: self._compile_internal(df.group(1), nested=True)
                     self.ops.append(('LABEL', les)); self.ops.append(('POP', None)); self.loop_stack.pop(); continue
 
+            # ----- COMPILAZIONE FOREACH -----
+            # foreach (k, v in c) { ... } oppure foreach (v in c) { ... };
+            # "in sorted c" visita dict e struct in ordine di chiave.
+            # L'iteratore sta in una variabile nascosta (locale nelle funzioni),
+            # così break e return non lasciano residui sullo stack.
+            if line.startswith('foreach'):
+                m_header = re.match(r'foreach\s*\(\s*(\w+)(?:\s*,\s*(\w+))?\s+in\s+(sorted\s+)?(.*?)\)\s*\{', line)
+                if m_header:
+                    brace_start = m_header.end() - 1
+                    b, after_body = self.extract_braced_block(line, brace_start)
+                    if b is not None:
+                        ls = self.get_label("is"); le = self.get_label("ie")
+                        it = "__iter_" + ls
+                        self.parse_expression(m_header.group(4).strip())
+                        self.ops.append(('ITER_INIT', 1 if m_header.group(3) else 0))
+                        self.ops.append(('STORE', it))
+                        self.loop_stack.append((ls, le))
+                        self.ops.append(('LABEL', ls))
+                        self.ops.append(('LOAD', it))
+                        self.ops.append(('ITER_NEXT', le))
+                        if m_header.group(2):
+                            self.ops.append(('STORE', m_header.group(2)))
+                            self.ops.append(('STORE', m_header.group(1)))
+                        else:
+                            self.ops.append(('STORE', m_header.group(1)))
+                            self.ops.append(('POP', None))
+                        self._compile_internal(b, nested=True)
+                        self.ops.append(('JMP', ls))
+                        self.ops.append(('LABEL', le))
+                        self.loop_stack.pop()
+                        continue
+
             # ----- COMPILAZIONE LOOP (FOR/WHILE) -----
             if line.startswith('for'):
                 # Usa extract_braced_block per gestire loop annidati correttamente
@@ -2692,12 +3769,12 @@ class AscensionCompiler:
                         if len(p) == 3:
                             ls = self.get_label("fs"); le = self.get_label("fe")
                             self.loop_stack.append((ls, le))
-                            self._compile_internal(p[0].strip() + ";")
+                            self._compile_internal(p[0].strip() + ";", nested=True)
                             self.ops.append(('LABEL', ls))
                             self.parse_expression(p[1].strip())
                             self.ops.append(('JZ', le))
-                            self._compile_internal(b)
-                            self._compile_internal(p[2].strip() + ";")
+                            self._compile_internal(b, nested=True)
+                            self._compile_internal(p[2].strip() + ";", nested=True)
                             self.ops.append(('JMP', ls))
                             self.ops.append(('LABEL', le))
                             self.loop_stack.pop()
@@ -2715,7 +3792,7 @@ class AscensionCompiler:
                         self.ops.append(('LABEL', ls))
                         self.parse_expression(cond)
                         self.ops.append(('JZ', le))
-                        self._compile_internal(b)
+                        self._compile_internal(b, nested=True)
                         self.ops.append(('JMP', ls))
                         self.ops.append(('LABEL', le))
                         self.loop_stack.pop()
@@ -2736,40 +3813,42 @@ class AscensionCompiler:
                         # 1. Compile Main IF
                         self.parse_expression(cond)
                         self.ops.append(('JZ', lbl_next_check))
-                        self._compile_internal(body)
+                        self._compile_internal(body, nested=True)
                         self.ops.append(('JMP', lbl_end_chain))
                         self.ops.append(('LABEL', lbl_next_check))
 
                         # 2. Check Chain (else if / else)
-                        rem = line[after_body:].strip()
+                        # pos scorre la riga: nessuna copia del resto per ogni ramo
+                        pos = after_body
 
                         while True:
+                            while pos < len(line) and line[pos].isspace(): pos += 1
                             # Handle "else if"
-                            if rem.startswith('else if'):
-                                m_elif = re.match(r'else\s+if\s*\((.*?)\)\s*\{', rem)
+                            if line.startswith('else if', pos):
+                                m_elif = ELSE_IF_HEADER.match(line, pos)
                                 if m_elif:
                                     cond_elif = m_elif.group(1)
                                     bs_elif = m_elif.end() - 1
-                                    body_elif, ab_elif = self.extract_braced_block(rem, bs_elif)
+                                    body_elif, ab_elif = self.extract_braced_block(line, bs_elif)
 
                                     lbl_next_elif = self.get_label("elif_next")
 
                                     self.parse_expression(cond_elif)
                                     self.ops.append(('JZ', lbl_next_elif))
-                                    self._compile_internal(body_elif)
+                                    self._compile_internal(body_elif, nested=True)
                                     self.ops.append(('JMP', lbl_end_chain))
                                     self.ops.append(('LABEL', lbl_next_elif))
 
-                                    rem = rem[ab_elif:].strip()
+                                    pos = ab_elif
                                     continue
 
                             # Handle "else"
-                            elif rem.startswith('else'):
-                                m_else = re.match(r'else\s*\{', rem)
+                            elif line.startswith('else', pos):
+                                m_else = ELSE_HEADER.match(line, pos)
                                 if m_else:
                                     bs_else = m_else.end() - 1
-                                    body_else, ab_else = self.extract_braced_block(rem, bs_else)
-                                    self._compile_internal(body_else)
+                                    body_else, ab_else = self.extract_braced_block(line, bs_else)
+                                    self._compile_internal(body_else, nested=True)
                                     # Else is terminal
                                 break
 
@@ -2781,8 +3860,9 @@ class AscensionCompiler:
 
             # ----- ASSEGNAZIONI SHORTHAND (+=, -= ecc.) -----
             shorthand_ops = {'+=': 'ADD', '-=': 'SUB', '*=': 'MUL', '/=': 'DIV', '%=': 'MOD'}; sm = False
+            assign_op = self.assignment_operator(line)
             for op_str, op_code in shorthand_ops.items():
-                if op_str in line and not any(line.startswith(x) for x in ['if','while','for','global','print']):
+                if op_str == assign_op and not any(line.startswith(x) for x in ['if','while','for','global','print']):
                     p = line.split(op_str, 1);
                     if len(p) == 2:
                         tgt = p[0].strip(); exp = p[1].strip()
@@ -2860,7 +3940,7 @@ class AscensionCompiler:
             if sm: continue
 
             # ----- ASSEGNAZIONI E CHIAMATE -----
-            if '=' in line and not any(line.startswith(x) for x in ['if','while','for','global','print']):
+            if assign_op == '=' and not any(line.startswith(x) for x in ['if','while','for','global','print']):
                 p = line.split('=', 1); tgt=p[0].strip(); exp=p[1].strip()
                 if '.' in tgt and '[' not in tgt:
                     o,f = tgt.split('.')
@@ -2946,11 +4026,13 @@ class AscensionCompiler:
 
         return self.ops
 
-    def compile(self, source, base_dir=None):
+    def compile(self, source, base_dir=None, path=None, optimize=False):
         if base_dir: self.base_dir = base_dir
+        # Lo script principale conta come modulo: un include che torna a lui non lo ricompila
+        if path: self.modules.add(os.path.realpath(path))
         
         # PASS 1: Raccoglie tutti i prototipi e definizioni di funzione
-        self.collect_prototypes(source)
+        self.collect_prototypes(source, set(self.modules))
         
         # PASS 2: Compilazione effettiva
         result = self._compile_internal(source)
@@ -2963,13 +4045,279 @@ class AscensionCompiler:
                 "LinkerError"
             )
         
-        return result
+        # PASS 4: Il codice fuori dalle funzioni usa solo variabili globali
+        result = self.resolve_locals(result)
+
+        # PASS 5: Costanti calcolate e propagate a tempo di compilazione (-O)
+        if optimize: result = self.fold_constants(result)
+
+        # PASS 6: Superistruzioni
+        return self.fuse_superinstructions(result)
+
+    def resolve_locals(self, ops, params=None):
+        """
+        Risolve i nomi di variabile del corpo di una funzione in slot del
+        frame locale. Sono locali i parametri e i nomi assegnati nel corpo
+        (salvo `global x;`); gli altri nomi restano globali.
+        - LOAD/STORE x        -> LOAD_FAST/STORE_FAST (slot, x) oppure
+                                 LOAD_GLOBAL/STORE_GLOBAL x
+        - STORE_IDX x e simili -> argomento (slot, x), slot None se globale
+        Il corpo riceve in testa il prologo ENTER (n. parametri, n. slot).
+        Con params=None (codice del main) tutti i nomi sono globali.
+        Le funzioni annidate sono già risolte e non vengono toccate.
+        """
+        slots = {}
+        if params is not None:
+            declared = {arg for name, arg in ops if name == 'GLOBAL_DECL'}
+            for p in params: slots.setdefault(p, len(slots))
+            for name, arg in ops:
+                if name == 'STORE' or (name in VAR_REF_OPCODES and isinstance(arg, str)):
+                    if arg not in declared and arg not in slots: slots[arg] = len(slots)
+        resolved = []
+        if params is not None: resolved.append(('ENTER', (len(params), len(slots))))
+        for name, arg in ops:
+            if name == 'GLOBAL_DECL': continue
+            if name in ('LOAD', 'STORE'):
+                if arg in slots: resolved.append((name + '_FAST', (slots[arg], arg)))
+                else: resolved.append((name + '_GLOBAL', arg))
+            elif name in VAR_REF_OPCODES and isinstance(arg, str):
+                resolved.append((name, (slots.get(arg), arg)))
+            else:
+                resolved.append((name, arg))
+        return resolved
+
+    def fold_constants(self, ops):
+        """
+        Ottimizzazione -O sul bytecode risolto:
+        - PUSH a; PUSH b; <op puro>  -> PUSH risultato (vedi FOLDABLE_OPCODES)
+        - LOAD_GLOBAL x              -> PUSH c, se x è un globale costante
+                                        (vedi _constant_globals)
+        Propagare un globale può rendere costanti altre espressioni, quindi
+        le due trasformazioni si ripetono finché non emergono nuovi globali.
+        """
+        vm = AscensionVM()
+        ops = self._fold_literals(ops, vm)
+        propagated = set()
+        while True:
+            consts = {name: val for name, val in self._constant_globals(ops).items() if name not in propagated}
+            if not consts: return ops
+            propagated.update(consts)
+            ops = self._fold_literals([('PUSH', consts[op[1]]) if op[0] == 'LOAD_GLOBAL' and op[1] in consts else op
+                                       for op in ops], vm)
+
+    @staticmethod
+    def _fold_literals(ops, vm):
+        """
+        Valuta gli opcode puri i cui operandi sono tutti PUSH consecutivi.
+        Il calcolo passa per gli handler della VM di appoggio vm, quindi il
+        risultato è esattamente quello del runtime; un'operazione che fallisce
+        (divisione per zero, sqrt di un negativo, ...) o che non dà un numero
+        resta nel bytecode e si comporta a runtime come prima.
+        """
+        folded = []
+        for op in ops:
+            n = FOLDABLE_OPCODES.get(op[0])
+            if n and len(folded) >= n and all(o[0] == 'PUSH' for o in folded[-n:]):
+                operands = [AscensionVM.decode_literal(o[1]) for o in folded[-n:]]
+                if all(type(v) in (int, float, str) for v in operands):
+                    vm.stack = operands
+                    try: vm.handlers[OP[op[0]]](None)
+                    except Exception: vm.stack = []
+                    if len(vm.stack) == 1 and type(vm.stack[0]) in (int, float):
+                        del folded[-n:]
+                        folded.append(('PUSH', vm.stack[0]))
+                        continue
+            folded.append(op)
+        return folded
+
+    @staticmethod
+    def _constant_globals(ops):
+        """
+        Globali costanti: nome -> argomento del PUSH assegnato. Lo è x se
+        - in tutto il programma c'è un solo STORE su x (anche uno STORE_FAST
+          conta: un locale non ancora assegnato scrive il globale omonimo)
+          e assegna un letterale;
+        - lo STORE è nel main e viene sempre eseguito: nessun salto che lo
+          precede finisce oltre (if, cicli, try);
+        - prima dello STORE il main non legge x e non esegue codice utente
+          (USER_CODE_OPCODES), così nessuna lettura vede x non assegnato.
+        I corpi delle funzioni (JMP skip; LABEL f; ENTER ...; LABEL skip)
+        contano solo per gli STORE.
+        """
+        labels = {op[1]: i for i, op in enumerate(ops) if op[0] == 'LABEL'}
+        writes = {}
+        for name, arg in ops:
+            if name.startswith('STORE'):
+                target = arg[1] if isinstance(arg, tuple) else arg
+                writes[target] = writes.get(target, 0) + 1
+        consts = {}
+        reach = -1; user_code = False; read = set()
+        i = 0; n = len(ops)
+        while i < n:
+            name, arg = ops[i]
+            if (name == 'JMP' and i + 2 < n and ops[i+1][0] == 'LABEL'
+                    and ops[i+2][0] in ('ENTER', 'MEMO_ENTER')):
+                i = labels[arg] + 1; continue
+            if name in JUMP_OPCODES: reach = max(reach, labels.get(arg, n))
+            elif name in USER_CODE_OPCODES: user_code = True
+            elif name == 'LOAD_GLOBAL': read.add(arg)
+            elif (name == 'STORE_GLOBAL' and writes[arg] == 1 and ops[i-1][0] == 'PUSH'
+                    and reach < i and not user_code and arg not in read):
+                consts[arg] = ops[i-1][1]
+            i += 1
+        return consts
+
+    @staticmethod
+    def _var_ref(op, kind):
+        """Riferimento (slot, nome) di un LOAD/STORE risolto, None altrimenti."""
+        if op[0] == kind + '_FAST': return op[1]
+        if op[0] == kind + '_GLOBAL': return (None, op[1])
+        return None
+
+    def _add_store_operands(self, ops, i, ref):
+        """
+        Riconosce s = s + a + b ... a partire dal LOAD s in ops[i].
+        Ritorna (indice dello STORE s, bytecode degli operandi senza gli ADD,
+        numero di operandi) oppure None. Gli operandi devono essere fatti di
+        soli opcode in PURE_STACK_EFFECT: valutarli tutti prima di leggere s
+        non cambia il risultato, e a runtime una stringa in s può crescere
+        sul posto anziché essere copiata a ogni concatenazione.
+        """
+        depth = 1; body = []; count = 0
+        for j in range(i + 1, len(ops)):
+            name = ops[j][0]
+            if name == 'ADD' and depth == 2:
+                depth = 1; count += 1
+                continue
+            if depth == 1 and count and self._var_ref(ops[j], 'STORE') == ref:
+                return j, body, count
+            effect = PURE_STACK_EFFECT.get(name)
+            if effect is None: return None
+            depth += effect
+            if depth < 2: return None
+            body.append(ops[j])
+        return None
+
+    def fuse_superinstructions(self, ops):
+        """
+        Fonde le sequenze di bytecode più frequenti in un'unica istruzione:
+        - LOAD x; PUSH c; ADD/SUB; STORE x   -> INC (x, c, ADD/SUB)
+        - LOAD a; LOAD b; <op binario>       -> LOAD_LOAD_OP (a, b, op)
+        - <confronto>; JZ L                  -> JZ_<confronto> L
+        - STORE x; LOAD x                    -> STORE_LOAD x
+        - LOAD s; a; ADD; b; ADD ...; STORE s -> a; b; ...; ADD_STORE (s, n)
+        LOAD/STORE sono le varianti _FAST o _GLOBAL prodotte da
+        resolve_locals; le variabili fuse diventano riferimenti (slot, nome).
+        Le LABEL restano nel flusso, quindi nessuna fusione scavalca
+        il bersaglio di un salto.
+        """
+        var_ref = self._var_ref
+        fused = []
+        i = 0; n = len(ops)
+        while i < n:
+            op = ops[i]
+            name = op[0]
+            nxt = ops[i+1][0] if i + 1 < n else None
+            ref = var_ref(op, 'LOAD')
+
+            if (ref and i + 3 < n and nxt == 'PUSH'
+                    and ops[i+2][0] in ('ADD', 'SUB') and var_ref(ops[i+3], 'STORE') == ref):
+                c = AscensionVM.decode_literal(ops[i+1][1])
+                if type(c) in (int, float):
+                    fused.append(('INC', (ref, c, ops[i+2][0])))
+                    i += 4; continue
+
+            match = self._add_store_operands(ops, i, ref) if ref else None
+            if match:
+                end, operand_ops, count = match
+                fused.extend(self.fuse_superinstructions(operand_ops))
+                fused.append(('ADD_STORE', (ref, count)))
+                i = end + 1; continue
+
+            if ref and i + 2 < n and var_ref(ops[i+1], 'LOAD') and ops[i+2][0] in BINARY_OPCODES:
+                fused.append(('LOAD_LOAD_OP', (ref, var_ref(ops[i+1], 'LOAD'), ops[i+2][0])))
+                i += 3; continue
+
+            if name in COMPARE_BRANCH and nxt == 'JZ':
+                fused.append((COMPARE_BRANCH[name], ops[i+1][1]))
+                i += 2; continue
+
+            ref = var_ref(op, 'STORE')
+            if ref and i + 1 < n and var_ref(ops[i+1], 'LOAD') == ref:
+                fused.append(('STORE_LOAD', ref))
+                i += 2; continue
+
+            fused.append(op)
+            i += 1
+        return fused
 
 
 # ==========================================
 #  MAIN EXECUTION
 # ==========================================
 
+# =============================================================================
+#                         CACHE DEL BYTECODE (.ascc)
+# =============================================================================
+
+# Lo script foo.asc salva accanto a sé foo.ascc con bytecode e struct
+# compilati. La cache vale finché non cambiano lo script, uno degli include
+# (anche indiretti) o l'interprete. Formato marshal: solo tipi nativi,
+# nessun codice eseguito al caricamento.
+BYTECODE_CACHE_MAGIC = 'ASCC1'
+
+def content_hash(text):
+    """Hash SHA-256 del contenuto di un sorgente."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def interpreter_hash():
+    """Impronta dell'interprete e di Python: un compilatore diverso invalida la cache."""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read() + sys.version.encode()).hexdigest()
+
+def cache_path(script, optimize=False):
+    """Percorso della cache di uno script: foo.asc -> foo.ascc (foo.O.ascc con -O)"""
+    return os.path.splitext(script)[0] + ('.O.ascc' if optimize else '.ascc')
+
+def load_bytecode_cache(script, source, base_dir, optimize=False):
+    """
+    Legge la cache di uno script. Ritorna (bytecode, structs, None) se è
+    valida, altrimenti (None, None, motivo del miss).
+    """
+    try:
+        with open(cache_path(script, optimize), 'rb') as f:
+            magic, interp, src_hash, includes, bytecode, structs = marshal.load(f)
+    except FileNotFoundError: return None, None, "cache assente"
+    except (OSError, EOFError, ValueError, TypeError): return None, None, "cache illeggibile"
+    if magic != BYTECODE_CACHE_MAGIC or interp != interpreter_hash():
+        return None, None, "interprete cambiato"
+    if src_hash != content_hash(source): return None, None, "sorgente modificato"
+    for filename, digest in includes:
+        try:
+            with open(os.path.join(base_dir, filename), 'r') as f: current = content_hash(f.read())
+        except OSError: current = None
+        if current != digest: return None, None, f"include modificato: {filename}"
+    return bytecode, structs, None
+
+def save_bytecode_cache(script, source, compiler, bytecode, optimize=False):
+    """
+    Scrive la cache di uno script compilato. Passa da un file temporaneo,
+    così un'esecuzione concorrente non legge mai una cache a metà.
+    Ritorna False se la scrittura non riesce.
+    """
+    path = cache_path(script, optimize); tmp = f"{path}.{os.getpid()}.tmp"
+    data = (BYTECODE_CACHE_MAGIC, interpreter_hash(), content_hash(source),
+            list(compiler.includes.items()), bytecode, compiler.structs)
+    try:
+        with open(tmp, 'wb') as f: marshal.dump(data, f)
+        os.replace(tmp, path)
+        return True
+    except (OSError, ValueError):
+        try: os.remove(tmp)
+        except OSError: pass
+        return False
+
+
 # =============================================================================
 #                              ESECUZIONE PRINCIPALE
 # =============================================================================
@@ -2984,9 +4332,17 @@ def print_bytecode(ops):
 
 if __name__ == "__main__":
     # Punto di ingresso principale
-    # Uso: python ascension.py script.asc [-debug]
-    if len(sys.argv) < 2: print("Uso: python ascension.py script.asc [-debug]"); exit()
-    debug = '-debug' in sys.argv
+    # Uso: python ascension.py script.asc [-debug] [-O] [-engine=fast|legacy] [-no-cache]
+    # (le opzioni si possono scrivere anche con --)
+    if len(sys.argv) < 2: print("Uso: python ascension.py script.asc [-debug] [-O] [-engine=fast|legacy] [-no-cache]"); exit()
+    options = [a.lstrip('-') for a in sys.argv[2:]]
+    debug = 'debug' in options
+    use_cache = 'no-cache' not in options
+    optimize = 'O' in options
+    engine = 'fast'
+    for a in options:
+        if a.startswith('engine='): engine = a.split('=', 1)[1]
+    if engine not in ('fast', 'legacy'): print(f"Engine sconosciuto: '{engine}' (usa fast o legacy)"); exit()
     input_file = sys.argv[1]
     base_dir = os.path.dirname(os.path.abspath(input_file)) or '.'
 
@@ -2994,9 +4350,16 @@ if __name__ == "__main__":
     try:
         with open(input_file, 'r') as f: src = f.read()
         print(f"--- Ascension v12.7 (Math Edition): {input_file} ---")
-        c = AscensionCompiler(); bc = c.compile(src, base_dir)
+        bc = None
+        if use_cache: bc, structs, reason = load_bytecode_cache(input_file, src, base_dir, optimize)
+        if bc is None:
+            c = AscensionCompiler(); bc = c.compile(src, base_dir, input_file, optimize); structs = c.structs
+            if use_cache:
+                saved = save_bytecode_cache(input_file, src, c, bc, optimize)
+                print(f"[cache] miss {cache_path(input_file, optimize)}: {reason}" + ("" if saved else ", cache non salvata"), file=sys.stderr)
+        else: print(f"[cache] hit {cache_path(input_file, optimize)}", file=sys.stderr)
         if debug: print_bytecode(bc)
-        v = AscensionVM(); v.load_program(bc, c.structs); v.run()
+        v = AscensionVM(engine); v.load_program(bc, structs); v.run()
         print("\n--- Fine ---")
     except FileNotFoundError as e: print(f"Errore: File non trovato: {e}")
     except Exception as e:
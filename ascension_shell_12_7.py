@@ -84,7 +84,7 @@ class AscensionShell:
         # Autocompletamento base - aggiornato v12.7 Math Edition
         keywords = [
             # Parole chiave
-            'if', 'else', 'while', 'for', 'func', 'return', 'struct',
+            'if', 'else', 'while', 'for', 'foreach', 'func', 'memo', 'return', 'struct',
             'global', 'print', 'switch', 'case', 'default', 'try', 'catch', 'throw',
             'break', 'continue', 'include',
             # Built-in standard
@@ -95,6 +95,23 @@ class AscensionShell:
             'matrix', 'rows', 'cols', 'dim',
             # System commands
             'system', 'exec',
+            # Memoizzazione
+            'memo_clear', 'memo_size', 'memo_stats',
+            # Array tipizzati
+            'farray', 'iarray', 'aview', 'afill',
+            # Algebra matriciale
+            'matmul', 'transpose', 'madd', 'msub', 'mscale', 'hadamard', 'mapply',
+            # Reti neurali
+            'nn_create', 'nn_forward', 'nn_train', 'nn_predict_batch', 'nn_weights', 'nn_bias',
+            # String builder
+            'sb_new', 'sb_append', 'sb_str',
+            # Stringhe native
+            'find', 'rfind', 'split', 'join', 'replace', 'trim', 'upper', 'lower',
+            'starts_with', 'ends_with', 'repeat',
+            # Espressioni regolari
+            're_match', 're_search', 're_findall', 're_sub', 're_split',
+            # Ordinamento
+            'sort', 'sort_desc', 'sort_by', 'bsearch',
             # Stringhe (v12.6)
             'substr', 'chr',
             # NUOVO v12.7: Math functions
@@ -293,6 +310,16 @@ ESEMPI:
                         print(f"  {name} = <matrix {rows}x{cols}>")
                     else:
                         print(f"  {name} = {value}")
+                elif hasattr(value, 'rows') and hasattr(value, 'cols'):
+                    # Matrice a lista piatta
+                    print(f"  {name} = <matrix {value.rows}x{value.cols}>")
+                elif hasattr(value, 'tolist'):
+                    # Array tipizzato (array.array o vista memoryview)
+                    kind = getattr(value, 'typecode', None) or value.format
+                    print(f"  {name} = <{'farray' if kind == 'd' else 'iarray'} len={len(value)}>")
+                elif hasattr(type(value), '__fields__'):
+                    # Istanza di struct a slot
+                    print(f"  {name} = <struct {value.__type__}>")
                 elif isinstance(value, list):
                     if len(value) > 5:
                         preview = str(value[:5])[:-1] + ", ...]"
@@ -354,6 +381,8 @@ ESEMPI:
                 rows = value.get('__rows__', '?')
                 cols = value.get('__cols__', '?')
                 matrices[name] = (rows, cols)
+            elif hasattr(value, 'rows') and hasattr(value, 'cols'):
+                matrices[name] = (value.rows, value.cols)
 
         if not matrices:
             print("Nessuna matrice definita.")
@@ -471,6 +500,8 @@ ESEMPI:
             # Preserva prototipi e definizioni già raccolte
             new_compiler.function_prototypes = self.compiler.function_prototypes.copy()
             new_compiler.function_defined = self.compiler.function_defined.copy()
+            # I moduli già inclusi nella sessione non vengono ricompilati
+            new_compiler.modules = self.compiler.modules.copy()
 
             bytecode = new_compiler.compile(code)
             
@@ -478,6 +509,7 @@ ESEMPI:
             # Aggiorna prototipi e definizioni
             self.compiler.function_prototypes.update(new_compiler.function_prototypes)
             self.compiler.function_defined.update(new_compiler.function_defined)
+            self.compiler.modules.update(new_compiler.modules)
 
             if self.debug_mode:
                 print("\n--- BYTECODE ---")
@@ -487,29 +519,15 @@ ESEMPI:
 
             self.compiler.structs.update(new_compiler.structs)
 
-            old_program_len = len(self.vm.program)
+            self.vm.ip = self.vm.extend_program(bytecode, new_compiler.structs)
 
-            for idx, op in enumerate(bytecode):
-                if op[0] == 'LABEL':
-                    self.vm.labels[op[1]] = old_program_len + idx
-
-            self.vm.program.extend(bytecode)
-            self.vm.structs.update(new_compiler.structs)
-
-            self.vm.ip = old_program_len
-
-            if self.vm.local_frames and self.vm.local_frames[0]:
-                self.vm.global_memory.update(self.vm.local_frames[0])
-
-            self.vm.local_frames = [self.vm.global_memory.copy()]
+            # Il codice della shell usa direttamente global_memory
+            self.vm.local_frames = [[]]
             self.vm.call_stack = []
             self.vm.stack = []
 
             self.vm.run()
 
-            if self.vm.local_frames and self.vm.local_frames[0]:
-                self.vm.global_memory.update(self.vm.local_frames[0])
-
             if not from_file:
                 self.session_code.append(code)
 